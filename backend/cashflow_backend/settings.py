@@ -90,6 +90,26 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# Swap in a shared backend (e.g. Redis or Memcached) when running several
+# worker processes so cache invalidation is seen by every worker.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'cashflow',
+    }
+}
+
+# Lifetime in seconds of cached balance and report responses
+CASHFLOW_CACHE_TIMEOUT = 300
+
+# Threads the async views run their concurrent queries on; each keeps one
+# database connection open, so this caps the connections they add
+CASHFLOW_ASYNC_QUERY_WORKERS = 4
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -0,0 +1,185 @@
+"""Async versions of the report and dashboard endpoints, for ASGI deployments.
+
+Django's async ORM methods (``aaggregate``, ``acount`` ...) still run every
+query through ``sync_to_async`` on the one thread that owns the request's
+database connection, so awaiting several of them with ``asyncio.gather``
+runs them one after another. ``gather_queries`` instead runs independent
+queries on a small pool of worker threads, so a report takes about as long
+as its slowest query rather than the sum of all of them. The pool's size
+(``CASHFLOW_ASYNC_QUERY_WORKERS``) bounds how many queries run at once, and
+each worker keeps its database connection between requests instead of
+connecting for every query.
+
+DRF views are synchronous, so ``async_api_view`` does the parts of
+``@api_view`` these endpoints need: authentication with the configured
+classes, the IsAuthenticated check and JSON rendering. The views share their
+names, and so their cache entries, with the sync views in ``tracker.views``.
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from .cache import cached_per_user
+from .dashboard import assemble_dashboard, dashboard_queries, requested_sections
+from .reports import (
+    account_totals, allocated_total, assemble_monthly_report, balance_summary, build_comparison_report,
+    build_yearly_report, income_summary, monthly_report_queries, requested_periods
+)
+
+
+QUERY_WORKERS = getattr(settings, 'CASHFLOW_ASYNC_QUERY_WORKERS', 4)
+_query_pool = ThreadPoolExecutor(max_workers=QUERY_WORKERS, thread_name_prefix='cashflow-query')
+
+
+def _run_query(query):
+    # The worker's connection outlives the request. As Django does at the
+    # start of a request, replace it if a query on it failed and it no
+    # longer answers, or if CONN_HEALTH_CHECKS finds it dead
+    if connection.connection is not None:
+        if connection.errors_occurred:
+            if connection.is_usable():
+                connection.errors_occurred = False
+            else:
+                connection.close()
+        connection.health_check_done = False
+        connection.close_if_health_check_failed()
+    return query()
+
+
+async def gather_queries(queries):
+    """Run a dict of independent query callables concurrently; return their results by name"""
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(*(
+        loop.run_in_executor(_query_pool, _run_query, query) for query in queries.values()
+    ))
+    return dict(zip(queries, results))
+
+
+def close_query_connections():
+    """Close every query worker's database connection, e.g. before the
+    database is dropped at the end of a test run"""
+    # One task per worker, each held until all have started, so every
+    # worker thread runs exactly one of them
+    started = threading.Barrier(QUERY_WORKERS)
+
+    def close():
+        started.wait()
+        connection.close()
+
+    wait([_query_pool.submit(close) for _ in range(QUERY_WORKERS)])
+
+
+def async_api_view(view):
+    """Authenticate the request and render the DRF ``Response`` an async GET view returns"""
+    @require_GET
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        authenticators = [authentication() for authentication in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+        request = Request(request, authenticators=authenticators)
+        headers = {}
+        try:
+            # Authentication looks the user up in the database
+            user = await sync_to_async(lambda: request.user)()
+            if not user.is_authenticated:
+                raise exceptions.NotAuthenticated()
+            response = await view(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            detail = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+            response = Response(detail, status=exc.status_code)
+            if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+                # Same status DRF picks: 401 with a challenge when there is one
+                header = authenticators[0].authenticate_header(request) if authenticators else None
+                if header:
+                    headers['WWW-Authenticate'] = header
+                else:
+                    response.status_code = status.HTTP_403_FORBIDDEN
+
+        return JsonResponse(
+            response.data, status=response.status_code, encoder=JSONEncoder, safe=False, headers=headers
+        )
+
+    return wrapper
+
+
+@async_api_view
+@cached_per_user
+async def balance_view(request):
+    """Get user's current balance and monthly totals"""
+    totals = await sync_to_async(account_totals)(request.user, timezone.localdate())
+
+    return Response(balance_summary(totals))
+
+
+@async_api_view
+@cached_per_user
+async def income_view(request):
+    """Get total income and allocated amounts for envelope budgeting"""
+    user = request.user
+    results = await gather_queries({
+        'totals': lambda: account_totals(user, timezone.localdate()),
+        'allocated': lambda: allocated_total(user),
+    })
+
+    return Response(income_summary(results['totals'], results['allocated']))
+
+
+@async_api_view
+@cached_per_user
+async def dashboard_view(request):
+    """Balance, income, envelope summary, upcoming and overdue recurring
+    transactions and savings goals in one response; ``sections`` (comma
+    separated or repeated) limits it to the ones named"""
+    try:
+        sections = requested_sections(request.GET)
+    except ValueError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    today = timezone.localdate()
+    results = await gather_queries(dashboard_queries(request.user, sections, today))
+    return Response(await sync_to_async(assemble_dashboard)(request, sections, today, results))
+
+
+@async_api_view
+@cached_per_user
+async def monthly_report(request):
+    """Generate monthly financial report"""
+    year = int(request.GET.get('year', timezone.now().year))
+    month = int(request.GET.get('month', timezone.now().month))
+
+    results = await gather_queries(monthly_report_queries(request.user, year, month))
+    return Response(assemble_monthly_report(year, month, **results))
+
+
+@async_api_view
+@cached_per_user
+async def yearly_report(request):
+    """Generate yearly financial report"""
+    year = int(request.GET.get('year', timezone.now().year))
+
+    return Response(await sync_to_async(build_yearly_report)(request.user, year))
+
+
+@async_api_view
+@cached_per_user
+async def comparison_report(request):
+    """Compare the current period with earlier ones, or any date ranges given as
+    ``range=YYYY-MM-DD:YYYY-MM-DD`` (repeatable, oldest first)"""
+    try:
+        period_type, periods = requested_periods(request.GET, timezone.localdate())
+    except ValueError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(await sync_to_async(build_comparison_report)(request.user, period_type, periods))
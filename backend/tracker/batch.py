@@ -0,0 +1,196 @@
+"""Atomic batches of transaction create/update/delete operations.
+
+Every operation is validated first and the envelope budgets are checked
+against a single in-memory tally for the whole batch. Only when every
+operation is valid are the writes applied, with one ``delete``, one
+``bulk_update`` per distinct set of changed fields and one ``bulk_create``,
+all inside one database transaction that holds the affected envelope and
+transaction rows locked from the first read.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from .budgets import EnvelopeBudgets
+from .models import Transaction
+from .serializers import RECURRING_DATE_TAKEN, TransactionSerializer
+
+MAX_OPERATIONS = 1000
+OPERATIONS = ('create', 'update', 'delete')
+
+
+def _transaction_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def check_recurring_dates(planned, reject):
+    """Reject updates moving a generated transaction onto a date its template
+    already has a transaction on, once the batch is applied.
+
+    Rows the batch deletes or moves away free their dates; rows it leaves in
+    place, and earlier operations of the batch, take theirs.
+    """
+    moves = {
+        index: (instance.recurring_id, serializer.validated_data['date'])
+        for index, op, instance, serializer in planned
+        if op == 'update' and instance.recurring_id and 'date' in serializer.validated_data
+    }
+    if not moves:
+        return
+
+    touched = [instance.pk for _, _, instance, _ in planned if instance is not None]
+    taken = set(
+        Transaction.objects.filter(
+            recurring_id__in={recurring_id for recurring_id, _ in moves.values()},
+            date__in={date for _, date in moves.values()},
+        ).exclude(pk__in=touched).values_list('recurring_id', 'date')
+    )
+    taken.update(
+        (instance.recurring_id, instance.date)
+        for index, op, instance, _ in planned
+        if op == 'update' and instance.recurring_id and index not in moves
+    )
+    for index, key in moves.items():
+        if key in taken:
+            reject(index, 'update', {'date': RECURRING_DATE_TAKEN})
+        else:
+            taken.add(key)
+
+
+def run_batch(request, operations):
+    """Validate and apply ``operations``, returning (applied, results)"""
+    user = request.user
+    # The serializer leaves the recurring date check to the whole batch below
+    context = {'request': request, 'batch': True}
+    results = [None] * len(operations)
+
+    def reject(index, op, errors):
+        results[index] = {'index': index, 'op': op, 'status': 'error', 'errors': errors}
+
+    with transaction.atomic():
+        # Lock the envelopes, then the rows being changed, in the same order as
+        # single-transaction writes; the locks are held until the batch commits
+        budgets = EnvelopeBudgets(user, lock=True)
+        ids = [
+            _transaction_id(operation.get('id'))
+            for operation in operations
+            if isinstance(operation, dict) and operation.get('op') in ('update', 'delete')
+        ]
+        existing = (
+            Transaction.objects.filter(user=user, pk__in=[pk for pk in ids if pk is not None])
+            .select_for_update(of=('self',))
+            .in_bulk()
+        )
+
+        planned = []
+        seen_ids = set()
+        for index, operation in enumerate(operations):
+            if not isinstance(operation, dict) or operation.get('op') not in OPERATIONS:
+                reject(index, None, {'op': "Must be one of 'create', 'update' or 'delete'."})
+                continue
+
+            op = operation['op']
+            instance = None
+            if op != 'create':
+                pk = _transaction_id(operation.get('id'))
+                instance = existing.get(pk)
+                if instance is None:
+                    reject(index, op, {'id': 'Transaction not found.'})
+                    continue
+                if pk in seen_ids:
+                    reject(index, op, {'id': 'Transaction appears in more than one operation.'})
+                    continue
+                seen_ids.add(pk)
+
+            serializer = None
+            if op != 'delete':
+                serializer = TransactionSerializer(
+                    instance,
+                    data=operation.get('data', {}),
+                    partial=op == 'update',
+                    context=context
+                )
+                if not serializer.is_valid():
+                    reject(index, op, serializer.errors)
+                    continue
+
+            planned.append((index, op, instance, serializer))
+
+        check_recurring_dates(planned, reject)
+        planned = [plan for plan in planned if results[plan[0]] is None]
+
+        # Envelope check: refund what updates and deletes take out, then
+        # charge every created or updated row against the same tally
+        for index, op, instance, serializer in planned:
+            if instance is not None:
+                budgets.apply(instance.category, instance.transaction_type, -instance.amount, instance.date)
+        for index, op, instance, serializer in planned:
+            if serializer is None:
+                continue
+            values = dict(serializer.validated_data)
+            if instance is not None:
+                for field in ('category', 'transaction_type', 'amount', 'date'):
+                    values.setdefault(field, getattr(instance, field))
+            charge = (values['category'], values['transaction_type'], values['amount'], values.get('date'))
+            error = budgets.check(*charge)
+            if error:
+                reject(index, op, {'amount': error})
+                continue
+            budgets.apply(*charge)
+
+        if any(results):
+            for index, op, instance, serializer in planned:
+                if results[index] is None:
+                    results[index] = {'index': index, 'op': op, 'status': 'not_applied'}
+            return False, results
+
+        deleted = []
+        updated = []
+        created = []
+        # Rows grouped by the fields their own operation changes, so a row is
+        # only written the fields it was sent
+        update_groups = defaultdict(list)
+        now = timezone.now()
+        for index, op, instance, serializer in planned:
+            if op == 'delete':
+                deleted.append((index, instance))
+            elif op == 'update':
+                for field, value in serializer.validated_data.items():
+                    setattr(instance, field, value)
+                instance.updated_at = now
+                update_groups[tuple(sorted({'updated_at', *serializer.validated_data}))].append(instance)
+                updated.append((index, instance))
+            else:
+                values = dict(serializer.validated_data)
+                values.setdefault('date', timezone.localdate())
+                created.append((index, Transaction(user=user, **values)))
+
+        if deleted:
+            Transaction.objects.filter(pk__in=[instance.pk for _, instance in deleted]).delete()
+        for fields, instances in update_groups.items():
+            Transaction.objects.bulk_update(instances, fields)
+        if created:
+            Transaction.objects.bulk_create([instance for _, instance in created])
+
+    for index, instance in deleted:
+        results[index] = {'index': index, 'op': 'delete', 'status': 'deleted', 'id': instance.pk}
+    written = [(index, 'updated', instance) for index, instance in updated]
+    written += [(index, 'created', instance) for index, instance in created]
+    data = TransactionSerializer(
+        [instance for _, _, instance in written],
+        many=True,
+        context={'request': request, 'envelope_remaining': EnvelopeBudgets(user).remaining}
+    ).data
+    for (index, result_status, instance), item in zip(written, data):
+        results[index] = {
+            'index': index,
+            'op': 'update' if result_status == 'updated' else 'create',
+            'status': result_status,
+            'id': instance.pk,
+            'data': item,
+        }
+    return True, results
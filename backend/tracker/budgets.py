@@ -0,0 +1,67 @@
+from django.utils import timezone
+
+from .models import Envelope
+
+
+def lock_envelopes(user):
+    """Lock all of ``user``'s envelope rows in category order.
+
+    Every write path that changes expenses takes these locks before any
+    transaction row lock, and the ledger locks envelopes by (user, category)
+    too, so their lock order is the same.
+    """
+    list(
+        Envelope.objects.filter(user=user).select_for_update(of=('self',)).order_by('category__name')
+        .values_list('pk', flat=True)
+    )
+
+
+class EnvelopeBudgets:
+    """A user's envelope balances, loaded once per month and tallied in memory.
+
+    An expense draws on its envelope's balance for the month of its date:
+    that month's budget plus what the rollover carried in, less what was
+    already spent in the month (see ``Envelope.objects.for_period``).
+    ``remaining`` holds the current month's balances by category.
+
+    Used by endpoints that write many transactions in one request so the
+    envelope check costs one query per month instead of one per row. Pass
+    ``lock=True`` inside an atomic block to hold the envelope rows until the
+    writes commit, so concurrent requests cannot overdraw an envelope.
+    """
+
+    def __init__(self, user, lock=False):
+        self.user = user
+        self.today = timezone.localdate()
+        self.months = {}
+        if lock:
+            # Lock before reading any month's spend, so the reads include
+            # every write that committed while this request waited
+            lock_envelopes(user)
+        self.remaining = self.month(self.today)
+
+    def month(self, day):
+        """Remaining balance by category for the month of ``day``"""
+        period = (day.year, day.month)
+        if period not in self.months:
+            self.months[period] = dict(
+                Envelope.objects.filter(user=self.user).for_period(*period).values_list(
+                    'category__name', 'period_remaining'
+                )
+            )
+        return self.months[period]
+
+    def check(self, category, transaction_type, amount, day=None):
+        """Return an error message if spending ``amount`` on ``day`` would overdraw the envelope"""
+        remaining = self.month(day or self.today)
+        if transaction_type != 'expense' or category not in remaining:
+            return None
+        if remaining[category] - amount < 0:
+            return f'Not enough money left in {category} envelope. Available: VT {remaining[category]}'
+        return None
+
+    def apply(self, category, transaction_type, amount, day=None):
+        """Record ``amount`` as spent (or refunded, if negative) from the envelope on ``day``"""
+        remaining = self.month(day or self.today)
+        if transaction_type == 'expense' and category in remaining:
+            remaining[category] -= amount
@@ -0,0 +1,130 @@
+"""Per-user versioned caching for the read-heavy report and balance endpoints.
+
+Each user has a data version stored in the cache. Cached responses embed the
+version in their key, so bumping it (on any change to the user's
+transactions, envelopes, categories, goals or recurring templates) makes
+every cached response for that user unreachable in O(1). Stale entries then
+simply expire.
+"""
+import asyncio
+import functools
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.response import Response
+
+KEY_PREFIX = 'cashflow'
+
+
+def _version_key(user_id):
+    return f'{KEY_PREFIX}:data-version:{user_id}'
+
+
+def _stats_key(event):
+    return f'{KEY_PREFIX}:stats:{event}'
+
+
+def get_data_version(user_id):
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        # Seed from the clock rather than 1: if the version key is evicted,
+        # entries cached under older numbers can never become reachable again
+        cache.add(_version_key(user_id), time.time_ns(), timeout=None)
+        version = cache.get(_version_key(user_id), 0)
+    return version
+
+
+def bump_data_version(user_id):
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        cache.set(_version_key(user_id), time.time_ns(), timeout=None)
+
+
+def invalidate_user(user_id):
+    """Invalidate cached responses for a user now and again once the write commits"""
+    bump_data_version(user_id)
+    # A read between the bump and the commit would cache pre-commit data
+    # under the new version, so bump a second time after the commit
+    transaction.on_commit(lambda: bump_data_version(user_id))
+
+
+def _record(event):
+    try:
+        cache.incr(_stats_key(event))
+    except ValueError:
+        cache.add(_stats_key(event), 0, timeout=None)
+        cache.incr(_stats_key(event))
+
+
+def cache_stats():
+    hits = cache.get(_stats_key('hits'), 0)
+    misses = cache.get(_stats_key('misses'), 0)
+    lookups = hits + misses
+    return {
+        'backend': settings.CACHES['default']['BACKEND'],
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': (hits / lookups * 100) if lookups else 0,
+    }
+
+
+def reset_cache_stats():
+    cache.delete_many([_stats_key('hits'), _stats_key('misses')])
+
+
+def response_cache_key(view_name, user_id, params):
+    query = urlencode(sorted(params.lists()), doseq=True)
+    digest = hashlib.md5(query.encode(), usedforsecurity=False).hexdigest()
+    # The date is part of the key because "current month" figures roll over daily
+    return ':'.join([
+        KEY_PREFIX, 'view', view_name, str(user_id),
+        str(get_data_version(user_id)), timezone.localdate().isoformat(), digest,
+    ])
+
+
+def cached_per_user(view):
+    """Cache a function view's successful response data per user and query string.
+
+    Apply below ``@api_view``/``@permission_classes`` (or ``@async_api_view``)
+    so the wrapped view receives an authenticated DRF request. Async views
+    share cache entries with the sync view of the same name.
+    """
+    if asyncio.iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            key = await sync_to_async(response_cache_key)(view.__name__, request.user.pk, request.GET)
+            data = await cache.aget(key)
+            if data is not None:
+                await sync_to_async(_record)('hits')
+                return Response(data)
+
+            await sync_to_async(_record)('misses')
+            response = await view(request, *args, **kwargs)
+            if response.status_code == 200:
+                await cache.aset(key, response.data, getattr(settings, 'CASHFLOW_CACHE_TIMEOUT', 300))
+            return response
+
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = response_cache_key(view.__name__, request.user.pk, request.GET)
+        data = cache.get(key)
+        if data is not None:
+            _record('hits')
+            return Response(data)
+
+        _record('misses')
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, getattr(settings, 'CASHFLOW_CACHE_TIMEOUT', 300))
+        return response
+
+    return wrapper
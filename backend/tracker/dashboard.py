@@ -0,0 +1,100 @@
+"""The composite dashboard response.
+
+Everything the app loads on startup (balance, income, envelope summary,
+upcoming and overdue recurring transactions, savings goals) in one request,
+each underlying query run at most once however many sections use it:
+balance and income share one rollup aggregate, income's allocated total is
+summed from the envelope rows, and upcoming and overdue come from one query
+since every overdue template is also due within the upcoming window.
+"""
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import Envelope, RecurringTransaction, SavingsGoal
+from .reports import account_totals, balance_summary, income_summary
+from .serializers import EnvelopeSerializer, RecurringTransactionSerializer, SavingsGoalSerializer
+
+DASHBOARD_SECTIONS = ('balance', 'income', 'envelopes', 'upcoming', 'overdue', 'savings_goals')
+# Days ahead the upcoming section looks
+UPCOMING_DAYS = 30
+
+
+def envelope_summary(envelopes, context):
+    """Summary statistics for envelopes annotated by ``with_spending``"""
+    return {
+        'total_envelopes': len(envelopes),
+        'total_budgeted': sum(envelope.budgeted_amount for envelope in envelopes),
+        'total_spent': sum(envelope.spent for envelope in envelopes),
+        'total_remaining': sum(envelope.remaining for envelope in envelopes),
+        'over_budget_count': sum(1 for envelope in envelopes if envelope.over_budget),
+        'near_limit_count': sum(1 for envelope in envelopes if envelope.near_limit and not envelope.over_budget),
+        'envelopes': EnvelopeSerializer(envelopes, many=True, context=context).data
+    }
+
+
+def requested_sections(params):
+    """The dashboard sections named by ``sections`` (comma separated or
+    repeated), all of them by default; raises ValueError for unknown ones"""
+    requested = [section for value in params.getlist('sections') for section in value.split(',') if section]
+    unknown = sorted(set(requested) - set(DASHBOARD_SECTIONS))
+    if unknown:
+        raise ValueError(f"Unknown sections: {', '.join(unknown)}. Choose from: {', '.join(DASHBOARD_SECTIONS)}")
+    return set(requested or DASHBOARD_SECTIONS)
+
+
+def dashboard_queries(user, sections, today):
+    """The independent queries behind the requested dashboard ``sections``, as
+    callables by name.
+
+    ``build_dashboard`` runs them one after another; the async dashboard view
+    runs them concurrently.
+    """
+    queries = {}
+    if {'balance', 'income'} & sections:
+        queries['totals'] = lambda: account_totals(user, today)
+    if {'envelopes', 'income'} & sections:
+        queries['envelopes'] = lambda: list(
+            Envelope.objects.filter(user=user).select_related('category').with_spending()
+        )
+    if {'upcoming', 'overdue'} & sections:
+        queries['due'] = lambda: list(
+            RecurringTransaction.objects.filter(
+                user=user, status='active', next_occurrence__lte=today + timedelta(days=UPCOMING_DAYS)
+            ).order_by('next_occurrence')
+        )
+    if 'savings_goals' in sections:
+        queries['goals'] = lambda: list(SavingsGoal.objects.filter(user=user))
+    return queries
+
+
+def build_dashboard(request, sections):
+    """The requested ``sections`` of the dashboard for ``request.user``"""
+    today = timezone.localdate()
+    results = {name: query() for name, query in dashboard_queries(request.user, sections, today).items()}
+    return assemble_dashboard(request, sections, today, results)
+
+
+def assemble_dashboard(request, sections, today, results):
+    """The dashboard from the results of ``dashboard_queries``"""
+    context = {'request': request}
+    dashboard = {}
+
+    if 'balance' in sections:
+        dashboard['balance'] = balance_summary(results['totals'])
+    if 'income' in sections:
+        allocated = sum(envelope.budgeted_amount for envelope in results['envelopes'])
+        dashboard['income'] = income_summary(results['totals'], allocated)
+    if 'envelopes' in sections:
+        dashboard['envelopes'] = envelope_summary(results['envelopes'], context)
+
+    if 'upcoming' in sections:
+        dashboard['upcoming'] = RecurringTransactionSerializer(results['due'], many=True, context=context).data
+    if 'overdue' in sections:
+        overdue = [recurring for recurring in results['due'] if recurring.next_occurrence < today]
+        dashboard['overdue'] = RecurringTransactionSerializer(overdue, many=True, context=context).data
+
+    if 'savings_goals' in sections:
+        dashboard['savings_goals'] = SavingsGoalSerializer(results['goals'], many=True, context=context).data
+
+    return dashboard
@@ -0,0 +1,117 @@
+"""Query-parameter filtering shared by the transaction endpoints."""
+from django.db import connection
+from django.db.models import Case, FloatField, Q, Value, When
+from django.db.models.functions import Greatest
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+
+TRANSACTION_TYPES = ('income', 'expense')
+
+# Allowed ``ordering`` values and the full, unique ordering each maps to.
+# Every ordering ends in ``id`` so cursor pagination has a stable tiebreaker.
+TRANSACTION_ORDERINGS = {
+    '-date': ('-date', '-created_at', '-id'),
+    'date': ('date', 'created_at', 'id'),
+    '-amount': ('-amount', '-id'),
+    'amount': ('amount', 'id'),
+    '-created_at': ('-created_at', '-id'),
+    'created_at': ('created_at', 'id'),
+}
+DEFAULT_TRANSACTION_ORDERING = '-date'
+
+
+def date_param(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValidationError({name: 'Enter a valid date in YYYY-MM-DD format.'})
+    return parsed
+
+
+def amount_param(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError({name: 'Enter a whole number of VT.'})
+
+
+def transaction_ordering(params):
+    """Return the ordering tuple selected by the ``ordering`` parameter"""
+    ordering = params.get('ordering') or DEFAULT_TRANSACTION_ORDERING
+    if ordering not in TRANSACTION_ORDERINGS:
+        raise ValidationError({
+            'ordering': f"Ordering must be one of: {', '.join(TRANSACTION_ORDERINGS)}."
+        })
+    return TRANSACTION_ORDERINGS[ordering]
+
+
+def filter_transactions(queryset, params):
+    """Apply the date range, type, category and amount filters from ``params``.
+
+    ``category`` may be repeated to match any of several categories;
+    ``type`` is accepted as an alias of ``transaction_type``.
+    """
+    start_date = date_param(params, 'start_date')
+    end_date = date_param(params, 'end_date')
+    if start_date:
+        queryset = queryset.filter(date__gte=start_date)
+    if end_date:
+        queryset = queryset.filter(date__lte=end_date)
+
+    transaction_type = params.get('transaction_type') or params.get('type')
+    if transaction_type:
+        if transaction_type not in TRANSACTION_TYPES:
+            raise ValidationError({'transaction_type': "Transaction type must be 'income' or 'expense'."})
+        queryset = queryset.filter(transaction_type=transaction_type)
+
+    categories = [category for category in params.getlist('category') if category]
+    if len(categories) == 1:
+        queryset = queryset.filter(category=categories[0])
+    elif categories:
+        queryset = queryset.filter(category__in=categories)
+
+    min_amount = amount_param(params, 'min_amount')
+    max_amount = amount_param(params, 'max_amount')
+    if min_amount is not None:
+        queryset = queryset.filter(amount__gte=min_amount)
+    if max_amount is not None:
+        queryset = queryset.filter(amount__lte=max_amount)
+
+    return queryset
+
+
+def search_transactions(queryset, term):
+    """Filter to transactions matching every word of ``term`` and rank them.
+
+    Each word must appear in the description or the category. Results are
+    annotated with ``search_rank``: trigram similarity on PostgreSQL (where
+    the matching is served by the trigram indexes), and a coarse
+    exact/prefix/substring score elsewhere.
+    """
+    words = term.split()
+    if not words:
+        return queryset
+    for word in words:
+        queryset = queryset.filter(Q(description__icontains=word) | Q(category__icontains=word))
+
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        rank = Greatest(TrigramSimilarity('description', term), TrigramSimilarity('category', term))
+    else:
+        rank = Case(
+            When(Q(description__iexact=term) | Q(category__iexact=term), then=Value(1.0)),
+            When(Q(description__istartswith=term) | Q(category__istartswith=term), then=Value(0.6)),
+            When(Q(description__icontains=term) | Q(category__icontains=term), then=Value(0.3)),
+            default=Value(0.1),
+            output_field=FloatField(),
+        )
+    return queryset.annotate(search_rank=rank)
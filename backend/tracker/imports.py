@@ -0,0 +1,249 @@
+"""Bulk import of transactions from uploaded CSV and OFX statements.
+
+Files are parsed as a stream of rows. Each row is validated, checked against
+an in-memory envelope tally, and inserted with ``bulk_create`` in batches
+inside a single database transaction.
+"""
+import codecs
+import csv
+import re
+from itertools import chain
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils.dateparse import parse_date
+
+from .budgets import EnvelopeBudgets
+from .models import Transaction
+
+BATCH_SIZE = 500
+# Cap on the number of row errors returned in the response
+MAX_REPORTED_ERRORS = 1000
+# Largest value the amount column (a 32-bit integer on PostgreSQL) holds
+MAX_AMOUNT = 2 ** 31 - 1
+
+CSV_COLUMNS = {
+    'date': 'date',
+    'description': 'description',
+    'category': 'category',
+    'amount': 'amount',
+    'type': 'transaction_type',
+    'transaction_type': 'transaction_type',
+}
+
+ofx_transaction_re = re.compile(r'<STMTTRN>(.*?)</STMTTRN>', re.IGNORECASE | re.DOTALL)
+ofx_tag_re = re.compile(r'<(\w+)>([^<\r\n]*)')
+# OFX 1.x "NAME:VALUE" header lines and the OFX 2.x XML declaration
+ofx_header_re = re.compile(r'^\s*(ENCODING|CHARSET):\s*(\S+)', re.IGNORECASE | re.MULTILINE)
+xml_encoding_re = re.compile(r'<\?xml[^>]*\sencoding\s*=\s*["\']([\w.:-]+)["\']', re.IGNORECASE)
+# OFX 1.x CHARSET values Python knows under another name
+OFX_CHARSETS = {'1252': 'cp1252', '8859-1': 'latin-1', 'NONE': 'latin-1'}
+# Bytes read before giving up on finding the end of the OFX header
+OFX_HEADER_LIMIT = 4096
+# Commas are only accepted as thousands separators, as in "1,250"
+thousands_re = re.compile(r'^\d{1,3}(,\d{3})+(\.\d+)?$')
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def read_csv(uploaded_file):
+    """Yield (row number, values) for each data row of a CSV file"""
+    reader = csv.reader(codecs.iterdecode(uploaded_file, 'utf-8-sig'))
+    try:
+        header = next(reader)
+    except StopIteration:
+        raise ImportFormatError('The file is empty.')
+    except UnicodeDecodeError:
+        raise ImportFormatError('The file must be UTF-8 encoded.')
+
+    columns = [CSV_COLUMNS.get(name.strip().lower()) for name in header]
+    missing = {'date', 'description', 'category', 'amount', 'transaction_type'} - set(columns)
+    if missing:
+        raise ImportFormatError(f"Missing column(s): {', '.join(sorted(missing))}.")
+
+    try:
+        for row_number, row in enumerate(reader, start=2):
+            if not any(cell.strip() for cell in row):
+                continue
+            yield row_number, {
+                column: value.strip()
+                for column, value in zip(columns, row)
+                if column
+            }
+    except UnicodeDecodeError:
+        raise ImportFormatError('The file must be UTF-8 encoded.')
+
+
+def ofx_encoding(head):
+    """The text encoding declared at the start of an OFX file.
+
+    OFX 1.x gives it in the ENCODING and CHARSET header lines (UTF-8, or
+    US-ASCII with a code page), OFX 2.x in the XML declaration. Files that
+    declare nothing are read as UTF-8.
+    """
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    text = head.decode('latin-1')
+    match = xml_encoding_re.search(text)
+    if match:
+        name = match.group(1)
+    else:
+        header = {key.upper(): value.upper() for key, value in ofx_header_re.findall(text.split('<', 1)[0])}
+        if header.get('ENCODING') in ('UTF-8', 'UNICODE') or 'CHARSET' not in header:
+            name = 'utf-8'
+        else:
+            name = OFX_CHARSETS.get(header['CHARSET'], header['CHARSET'])
+    try:
+        name = codecs.lookup(name).name
+    except LookupError:
+        raise ImportFormatError(f'Unsupported OFX character set: {name}.')
+    # Drops a byte order mark in front of the header
+    return 'utf-8-sig' if name == 'utf-8' else name
+
+
+def read_ofx(uploaded_file, default_category):
+    """Yield (transaction number, values) for each STMTTRN block of an OFX file.
+
+    Handles both SGML (OFX 1.x, unclosed tags) and XML (OFX 2.x) statements,
+    decoded incrementally in the character set the header declares, so a
+    character split across upload chunks comes through intact. OFX has no
+    categories, so every row gets ``default_category``; negative amounts are
+    expenses.
+    """
+    chunks = uploaded_file.chunks()
+    head = b''
+    for chunk in chunks:
+        head += chunk
+        if b'<OFX' in head.upper() or len(head) >= OFX_HEADER_LIMIT:
+            break
+    decoder = codecs.getincrementaldecoder(ofx_encoding(head))(errors='replace')
+    texts = chain((decoder.decode(chunk) for chunk in chain([head], chunks)), [decoder.decode(b'', final=True)])
+
+    buffer = ''
+    number = 0
+    for text in texts:
+        buffer += text
+        end = 0
+        for match in ofx_transaction_re.finditer(buffer):
+            end = match.end()
+            number += 1
+            tags = {tag.upper(): value.strip() for tag, value in ofx_tag_re.findall(match.group(1))}
+            amount = tags.get('TRNAMT', '')
+            yield number, {
+                'date': tags.get('DTPOSTED', '')[:8],
+                'description': tags.get('NAME') or tags.get('MEMO', ''),
+                'category': default_category,
+                'amount': amount.lstrip('+-'),
+                'transaction_type': 'expense' if amount.startswith('-') else 'income',
+            }
+        buffer = buffer[end:]
+
+
+def parse_row(values):
+    """Validate raw row values, returning (fields, errors)"""
+    errors = {}
+
+    raw_date = values.get('date', '')
+    parsed_date = None
+    try:
+        parsed_date = parse_date(raw_date)
+        if parsed_date is None and len(raw_date) == 8 and raw_date.isdigit():
+            parsed_date = datetime.strptime(raw_date, '%Y%m%d').date()
+    except ValueError:
+        pass
+    if parsed_date is None:
+        errors['date'] = 'Enter a valid date.'
+
+    description = values.get('description', '')
+    if not description:
+        errors['description'] = 'This field may not be blank.'
+    elif len(description) > 255:
+        errors['description'] = 'Ensure this field has no more than 255 characters.'
+
+    category = values.get('category', '')
+    if not category:
+        errors['category'] = 'This field may not be blank.'
+    elif len(category) > 100:
+        errors['category'] = 'Ensure this field has no more than 100 characters.'
+
+    amount = None
+    raw_amount = values.get('amount', '')
+    if thousands_re.match(raw_amount):
+        raw_amount = raw_amount.replace(',', '')
+    try:
+        number = Decimal(raw_amount)
+        # Amounts are whole numbers; "12.00" is fine, "12.7" is an error
+        if number != number.to_integral_value():
+            raise ValueError(raw_amount)
+        amount = int(number)
+    except (InvalidOperation, ValueError, OverflowError):
+        errors['amount'] = 'A valid integer is required.'
+    else:
+        if amount <= 0:
+            errors['amount'] = 'Amount must be positive.'
+        elif amount > MAX_AMOUNT:
+            errors['amount'] = f'Ensure this value is less than or equal to {MAX_AMOUNT}.'
+
+    transaction_type = values.get('transaction_type', '').lower()
+    if transaction_type not in ('income', 'expense'):
+        errors['transaction_type'] = "Transaction type must be 'income' or 'expense'."
+
+    fields = {
+        'date': parsed_date,
+        'description': description,
+        'category': category,
+        'amount': amount,
+        'transaction_type': transaction_type,
+    }
+    return fields, errors
+
+
+def import_transactions(user, rows, dry_run=False, batch_size=BATCH_SIZE):
+    """Validate and insert ``rows`` for ``user``, returning a per-row report"""
+    created = 0
+    error_count = 0
+    errors = []
+
+    def reject(row_number, row_errors):
+        nonlocal error_count
+        error_count += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({'row': row_number, 'errors': row_errors})
+
+    with transaction.atomic():
+        budgets = EnvelopeBudgets(user, lock=True)
+        batch = []
+        for row_number, values in rows:
+            fields, row_errors = parse_row(values)
+            if not row_errors:
+                budget_error = budgets.check(
+                    fields['category'], fields['transaction_type'], fields['amount'], fields['date']
+                )
+                if budget_error:
+                    row_errors['amount'] = budget_error
+            if row_errors:
+                reject(row_number, row_errors)
+                continue
+
+            budgets.apply(fields['category'], fields['transaction_type'], fields['amount'], fields['date'])
+            batch.append(Transaction(user=user, **fields))
+            if len(batch) >= batch_size:
+                if not dry_run:
+                    Transaction.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+
+        if batch and not dry_run:
+            Transaction.objects.bulk_create(batch)
+        created += len(batch)
+
+    return {
+        'created': 0 if dry_run else created,
+        'valid': created,
+        'error_count': error_count,
+        'errors': errors,
+        'dry_run': dry_run,
+    }
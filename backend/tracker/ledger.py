@@ -0,0 +1,302 @@
+"""Maintenance of the tables derived from Transaction rows.
+
+The derived tables are the MonthlyRollup rows, the BalanceCheckpoint rows
+and the spent counter on each Envelope. Every write path on Transaction (``save``, ``delete`` and the bulk
+queryset methods) reports the rows it removed and added as ledger entries,
+tuples in ``LEDGER_FIELDS`` order, and ``apply_ledger_changes`` folds them
+into the derived tables inside the caller's database transaction.
+"""
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import date
+from functools import reduce
+from operator import or_
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import BigIntegerField, Case, Count, F, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+from .cache import invalidate_user
+from .models import BalanceCheckpoint, Envelope, MonthlyRollup, Transaction
+
+ROLLUP_KEY = ('user_id', 'year', 'month', 'category', 'transaction_type')
+
+
+def apply_ledger_changes(removed=(), added=()):
+    """Fold removed/added ledger entries into the derived tables.
+
+    Rows are locked in one order on every write path: envelopes by
+    (user, category), then rollups by primary key, then users by primary
+    key. Each table takes a fixed number of queries however many users and
+    categories the entries span.
+    """
+    deltas = defaultdict(lambda: [0, 0])
+    spent_deltas = defaultdict(int)
+    balance_deltas = defaultdict(lambda: defaultdict(int))
+    user_ids = set()
+    for sign, entries in ((-1, removed), (1, added)):
+        for user_id, entry_date, category, transaction_type, amount in entries:
+            delta = deltas[(user_id, entry_date.year, entry_date.month, category, transaction_type)]
+            delta[0] += sign * amount
+            delta[1] += sign
+            month_start = entry_date.replace(day=1)
+            if transaction_type == 'expense':
+                spent_deltas[(user_id, category)] += sign * amount
+                balance_deltas[user_id][month_start] -= sign * amount
+            else:
+                balance_deltas[user_id][month_start] += sign * amount
+            user_ids.add(user_id)
+
+    _apply_spent_deltas({key: amount for key, amount in spent_deltas.items() if amount})
+    _apply_rollup_deltas({key: delta for key, delta in deltas.items() if delta[0] or delta[1]})
+    _apply_balance_deltas({
+        user_id: {month_start: amount for month_start, amount in months.items() if amount}
+        for user_id, months in balance_deltas.items()
+    })
+
+    for user_id in user_ids:
+        invalidate_user(user_id)
+
+
+def _apply_spent_deltas(deltas):
+    """Add per-(user, category) amounts to the envelope spent counters"""
+    if not deltas:
+        return
+
+    envelopes = Envelope.objects.filter(
+        reduce(or_, (Q(user_id=user_id, category__name=category) for user_id, category in sorted(deltas)))
+    )
+    if len(deltas) > 1:
+        # One UPDATE locks its rows in whatever order it scans them, so lock
+        # them in (user, category) order first, as lock_envelopes does
+        rows = envelopes.select_for_update(of=('self',)).order_by('user_id', 'category__name').values_list(
+            'pk', 'user_id', 'category__name'
+        )
+        by_pk = {pk: deltas[(user_id, category)] for pk, user_id, category in rows}
+        Envelope.objects.filter(pk__in=by_pk).update(
+            spent_total=F('spent_total') + Case(
+                *(When(pk=pk, then=Value(amount)) for pk, amount in by_pk.items()),
+                default=Value(0),
+                output_field=BigIntegerField(),
+            )
+        )
+    else:
+        [amount] = deltas.values()
+        envelopes.update(spent_total=F('spent_total') + amount)
+
+
+def _apply_rollup_deltas(deltas):
+    """Apply per-bucket (amount, count) deltas with a fixed number of queries"""
+    if not deltas:
+        return
+
+    months = {key[:3] for key in deltas}
+    in_months = reduce(or_, (Q(user_id=user_id, year=year, month=month) for user_id, year, month in months))
+    # Locking the existing rows keeps another writer from deleting one between
+    # this read and the update below
+    existing = {
+        tuple(row[1:]): row[0]
+        for row in MonthlyRollup.objects.filter(in_months).select_for_update().order_by('pk').values_list(
+            'pk', *ROLLUP_KEY
+        )
+    }
+
+    updates = {existing[key]: delta for key, delta in deltas.items() if key in existing}
+    if updates:
+        MonthlyRollup.objects.filter(pk__in=updates).update(
+            total=F('total') + _by_pk(updates, 0, BigIntegerField()),
+            count=F('count') + _by_pk(updates, 1, IntegerField()),
+        )
+        if any(count < 0 for _, count in updates.values()):
+            MonthlyRollup.objects.filter(pk__in=updates, count__lte=0).delete()
+
+    # Sorted, so concurrent writers inserting the same new keys wait in one order
+    missing = sorted(key for key in deltas if key not in existing)
+    if missing:
+        try:
+            with transaction.atomic():
+                MonthlyRollup.objects.bulk_create([
+                    MonthlyRollup(**dict(zip(ROLLUP_KEY, key)), total=deltas[key][0], count=deltas[key][1])
+                    for key in missing
+                ])
+        except IntegrityError:
+            # Another writer created some of the rows first
+            for key in missing:
+                _apply_rollup_delta(key, *deltas[key])
+
+
+def _by_pk(updates, index, output_field):
+    return Case(
+        *(When(pk=pk, then=Value(delta[index])) for pk, delta in updates.items()),
+        default=Value(0),
+        output_field=output_field,
+    )
+
+
+def _apply_rollup_delta(key, amount, count):
+    user_id, year, month, category, transaction_type = key
+    rollup = MonthlyRollup.objects.filter(
+        user_id=user_id,
+        year=year,
+        month=month,
+        category=category,
+        transaction_type=transaction_type,
+    )
+
+    updated = rollup.update(total=F('total') + amount, count=F('count') + count)
+    if not updated:
+        try:
+            with transaction.atomic():
+                MonthlyRollup.objects.create(
+                    user_id=user_id,
+                    year=year,
+                    month=month,
+                    category=category,
+                    transaction_type=transaction_type,
+                    total=amount,
+                    count=count,
+                )
+        except IntegrityError:
+            # Another writer created the row first
+            rollup.update(total=F('total') + amount, count=F('count') + count)
+
+    if count < 0:
+        rollup.filter(count__lte=0).delete()
+
+
+def _apply_balance_deltas(deltas):
+    """Shift the closing balance of each changed month and every later one,
+    for every user in ``deltas`` ({user_id: {month_start: amount}})"""
+    months = {user_id: sorted(changes.items()) for user_id, changes in sorted(deltas.items()) if changes}
+    if not months:
+        return
+
+    # Checkpoints are running totals: a writer creating a month's row reads
+    # the previous row while another may be shifting it, so take turns per user.
+    # FOR NO KEY UPDATE, which doesn't conflict with the FOR KEY SHARE lock
+    # every foreign key check on the user row takes. Those checks run at
+    # commit for Django's deferred constraints, but immediately for any that
+    # aren't, and a writer holding that lock would then deadlock with one
+    # waiting here under FOR UPDATE. One statement locks the users in
+    # primary key order.
+    list(User.objects.select_for_update(no_key=True).filter(pk__in=months).order_by('pk').values_list('pk', flat=True))
+
+    changed = {user_id: [month_start for month_start, _ in changes] for user_id, changes in months.items()}
+    existing = set(BalanceCheckpoint.objects.filter(
+        reduce(or_, (Q(user_id=user_id, month_start__in=starts) for user_id, starts in changed.items()))
+    ).values_list('user_id', 'month_start'))
+    missing = {
+        user_id: [month_start for month_start in starts if (user_id, month_start) not in existing]
+        for user_id, starts in changed.items()
+    }
+    missing = {user_id: starts for user_id, starts in missing.items() if starts}
+    if missing:
+        # New rows start from the closing balance before their month and are
+        # then shifted along with everything else
+        earlier = defaultdict(list)
+        for user_id, month_start, balance in BalanceCheckpoint.objects.filter(
+            reduce(or_, (Q(user_id=user_id, month_start__lt=starts[-1]) for user_id, starts in missing.items()))
+        ).order_by('user_id', 'month_start').values_list('user_id', 'month_start', 'balance'):
+            earlier[user_id].append((month_start, balance))
+        created = []
+        for user_id, starts in missing.items():
+            earlier_months = [month_start for month_start, _ in earlier[user_id]]
+            for month_start in starts:
+                index = bisect_left(earlier_months, month_start)
+                created.append(BalanceCheckpoint(
+                    user_id=user_id,
+                    month_start=month_start,
+                    balance=earlier[user_id][index - 1][1] if index else 0,
+                ))
+        BalanceCheckpoint.objects.bulk_create(created)
+
+    # A row's shift is the sum of its user's deltas for every changed month up to it
+    shifts = []
+    for user_id, changes in months.items():
+        running = 0
+        user_shifts = []
+        for month_start, amount in changes:
+            running += amount
+            user_shifts.append(When(user_id=user_id, month_start__gte=month_start, then=Value(running)))
+        shifts += reversed(user_shifts)
+    BalanceCheckpoint.objects.filter(
+        reduce(or_, (Q(user_id=user_id, month_start__gte=starts[0]) for user_id, starts in changed.items()))
+    ).update(balance=F('balance') + Case(*shifts, default=Value(0), output_field=BigIntegerField()))
+
+
+def rebuild_balance_checkpoints(users=None):
+    """Recompute the balance checkpoints from the monthly rollups"""
+    checkpoints = BalanceCheckpoint.objects.all()
+    rollups = MonthlyRollup.objects.all()
+    if users is not None:
+        checkpoints = checkpoints.filter(user__in=users)
+        rollups = rollups.filter(user__in=users)
+
+    nets = rollups.order_by('user_id', 'year', 'month').values('user_id', 'year', 'month').annotate(
+        income=Sum('total', filter=Q(transaction_type='income')),
+        expenses=Sum('total', filter=Q(transaction_type='expense')),
+    )
+
+    created = []
+    balance = 0
+    current_user = None
+    for row in nets:
+        if row['user_id'] != current_user:
+            current_user = row['user_id']
+            balance = 0
+        balance += (row['income'] or 0) - (row['expenses'] or 0)
+        created.append(BalanceCheckpoint(
+            user_id=row['user_id'],
+            month_start=date(row['year'], row['month'], 1),
+            balance=balance,
+        ))
+
+    with transaction.atomic():
+        checkpoints.delete()
+        BalanceCheckpoint.objects.bulk_create(created, batch_size=1000)
+    return len(created)
+
+
+def rebuild_monthly_rollups(users=None, batch_size=1000):
+    """Recompute the monthly rollups, balance checkpoints and envelope spent
+    counters from scratch, optionally for some users only"""
+    rollups = MonthlyRollup.objects.all()
+    transactions = Transaction.objects.all()
+    envelopes = Envelope.objects.all()
+    if users is not None:
+        rollups = rollups.filter(user__in=users)
+        transactions = transactions.filter(user__in=users)
+        envelopes = envelopes.filter(user__in=users)
+
+    buckets = transactions.annotate(
+        year=ExtractYear('date'),
+        month=ExtractMonth('date'),
+    ).order_by().values(
+        'user_id', 'year', 'month', 'category', 'transaction_type'
+    ).annotate(
+        total=Sum('amount'),
+        count=Count('id'),
+    )
+
+    created = 0
+    with transaction.atomic():
+        rollups.delete()
+        batch = []
+        for bucket in buckets.iterator(chunk_size=batch_size):
+            batch.append(MonthlyRollup(**bucket))
+            if len(batch) >= batch_size:
+                MonthlyRollup.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        if batch:
+            MonthlyRollup.objects.bulk_create(batch)
+            created += len(batch)
+        envelopes.refresh_spent_totals()
+        rebuild_balance_checkpoints(users)
+
+    if users is None:
+        users = User.objects.all()
+    for user_id in users.values_list('pk', flat=True):
+        invalidate_user(user_id)
+    return created
@@ -0,0 +1,117 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+# (sync endpoint, async endpoint) URL names
+ENDPOINTS = {
+    'balance': ('balance', 'balance_async'),
+    'income': ('income', 'income_async'),
+    'dashboard': ('dashboard', 'dashboard_async'),
+    'monthly': ('monthly_report', 'monthly_report_async'),
+    'yearly': ('yearly_report', 'yearly_report_async'),
+    'comparison': ('comparison_report', 'comparison_report_async'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the throughput of the sync report views through the WSGI handler "
+        "with the async ones through the ASGI handler, under concurrent clients"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', required=True, help='Username or id to request the reports as')
+        parser.add_argument(
+            '--endpoint',
+            action='append',
+            choices=sorted(ENDPOINTS),
+            help='Endpoint to benchmark (repeatable, default all)',
+        )
+        parser.add_argument('--clients', type=int, default=20, help='Concurrent clients')
+        parser.add_argument('--requests', type=int, default=10, help='Requests per client and endpoint')
+        parser.add_argument(
+            '--cached',
+            action='store_true',
+            help='Leave the response cache on (by default every request runs its queries)',
+        )
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        headers = {'authorization': f'Bearer {AccessToken.for_user(user)}'}
+        clients, requests = options['clients'], options['requests']
+        if clients < 1 or requests < 1:
+            raise CommandError('--clients and --requests must be positive')
+
+        overrides = {'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver']}
+        if not options['cached']:
+            overrides['CASHFLOW_CACHE_TIMEOUT'] = 0
+        with override_settings(**overrides):
+            for name in options['endpoint'] or ENDPOINTS:
+                sync_name, async_name = ENDPOINTS[name]
+                wsgi = self.run_wsgi(reverse(sync_name), headers, clients, requests)
+                asgi = asyncio.run(self.run_asgi(reverse(async_name), headers, clients, requests))
+                self.report(name, 'WSGI', wsgi)
+                self.report(name, 'ASGI', asgi)
+
+    def get_user(self, value):
+        lookup = {'pk': value} if value.isdigit() else {'username': value}
+        try:
+            return User.objects.get(**lookup)
+        except User.DoesNotExist:
+            raise CommandError(f'User "{value}" does not exist')
+
+    def run_wsgi(self, path, headers, clients, requests):
+        """One thread per client, as a threaded WSGI server would serve them"""
+        def client_run():
+            client = Client()
+            try:
+                return [self.timed(lambda: client.get(path, headers=headers)) for _ in range(requests)]
+            finally:
+                connections.close_all()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as executor:
+            results = [result for run in executor.map(lambda _: client_run(), range(clients)) for result in run]
+        return results, time.perf_counter() - started
+
+    async def run_asgi(self, path, headers, clients, requests):
+        """All clients on one event loop, as an ASGI server would serve them"""
+        async def client_run():
+            client = AsyncClient()
+            results = []
+            for _ in range(requests):
+                started = time.perf_counter()
+                response = await client.get(path, headers=headers)
+                results.append((response.status_code, time.perf_counter() - started))
+            return results
+
+        started = time.perf_counter()
+        runs = await asyncio.gather(*(client_run() for _ in range(clients)))
+        return [result for run in runs for result in run], time.perf_counter() - started
+
+    def timed(self, request):
+        started = time.perf_counter()
+        response = request()
+        return response.status_code, time.perf_counter() - started
+
+    def report(self, name, mode, run):
+        results, elapsed = run
+        latencies = sorted(latency for _, latency in results)
+        errors = sum(1 for status_code, _ in results if status_code != 200)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        self.stdout.write(
+            f'{name:<11} {mode}  {len(results) / elapsed:8.1f} req/s  '
+            f'p50 {statistics.median(latencies) * 1000:7.1f} ms  p95 {p95 * 1000:7.1f} ms  '
+            f'{len(results)} requests in {elapsed:.2f}s'
+        )
+        if errors:
+            self.stdout.write(self.style.WARNING(f'{name:<11} {mode}  {errors} non-200 responses'))
@@ -0,0 +1,114 @@
+import re
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from tracker.recurring import process_due_batch
+
+# Literals in captured SQL, so repeats of one statement count as one
+LITERAL_RE = re.compile(r"'[^']*'|\b\d+\b")
+
+
+class Command(BaseCommand):
+    help = (
+        "Print the database query plan of every query the hot paths run: the "
+        "rollup totals, the monthly report's daily breakdown, the filtered and "
+        "cursor-paged transaction lists, search, the dashboard and the scheduler scan"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', required=True, help='Username or id to run the hot paths as')
+        parser.add_argument('--category', help="Category for the filtered list (default the user's first)")
+        parser.add_argument('--search', default='payee 42', help='Search term for the search path')
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='Run EXPLAIN ANALYZE (PostgreSQL only; executes the queries)',
+        )
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        self.verbosity = options['verbosity']
+        if options['analyze'] and connection.vendor != 'postgresql':
+            raise CommandError('--analyze needs PostgreSQL')
+        explain_options = {'analyze': True, 'buffers': True} if options['analyze'] else {}
+        self.explain_prefix = connection.ops.explain_query_prefix(**explain_options)
+
+        today = timezone.localdate()
+        category = options['category'] or (
+            user.transactions.values_list('category', flat=True).order_by('category').first()
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        transactions = reverse('transaction-list')
+        list_filters = {
+            'category': category,
+            'start_date': (today - timedelta(days=365)).isoformat(),
+            'end_date': today.isoformat(),
+        }
+
+        def cursor_page():
+            first = client.get(transactions, {'pagination': 'cursor'}).data
+            if first.get('next'):
+                client.get(first['next'])
+
+        hot_paths = [
+            ('balance: rollup totals', lambda: client.get(reverse('balance'))),
+            ('monthly report: rollup summary, daily breakdown, envelopes',
+             lambda: client.get(reverse('monthly_report'))),
+            ('transactions: filtered list', lambda: client.get(transactions, list_filters)),
+            ('transactions: cursor page', cursor_page),
+            ('transactions: search', lambda: client.get(transactions, {'search': options['search']})),
+            ('dashboard', lambda: client.get(reverse('dashboard'))),
+            ('scheduler: due scan', lambda: process_due_batch(today)),
+        ]
+
+        # Every request runs its queries rather than reading the response cache
+        overrides = {'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver'], 'CASHFLOW_CACHE_TIMEOUT': 0}
+        with override_settings(**overrides):
+            for name, run in hot_paths:
+                self.stdout.write(self.style.MIGRATE_HEADING(name))
+                try:
+                    self.explain_path(run)
+                except DatabaseError as exc:
+                    self.stdout.write(self.style.ERROR(f'{name} failed: {exc}'))
+
+    def explain_path(self, run):
+        """Run one hot path in a rolled back transaction and explain each distinct SELECT it issued"""
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as captured:
+                run()
+            selects = [query['sql'] for query in captured.captured_queries if query['sql'].startswith('SELECT')]
+            runs = Counter(LITERAL_RE.sub('?', sql) for sql in selects)
+            explained = set()
+            for sql in selects:
+                statement = LITERAL_RE.sub('?', sql)
+                if statement in explained:
+                    continue
+                explained.add(statement)
+                with connection.cursor() as cursor:
+                    cursor.execute(f'{self.explain_prefix} {sql}')
+                    plan = '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+                if self.verbosity > 1:
+                    self.stdout.write(sql)
+                if runs[statement] > 1:
+                    self.stdout.write(f'(run {runs[statement]} times, first shown)')
+                self.stdout.write(plan)
+                self.stdout.write('')
+            transaction.set_rollback(True)
+
+    def get_user(self, value):
+        lookup = {'pk': value} if value.isdigit() else {'username': value}
+        try:
+            return User.objects.get(**lookup)
+        except User.DoesNotExist:
+            raise CommandError(f'User "{value}" does not exist')
@@ -0,0 +1,25 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from tracker.ledger import rebuild_monthly_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the monthly rollups, balance checkpoints and envelope spent counters from the transaction table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', help='Only rebuild for this username (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        users = None
+        if options['user']:
+            users = User.objects.filter(username__in=options['user'])
+
+        started = time.monotonic()
+        created = rebuild_monthly_rollups(users=users, batch_size=options['batch_size'])
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {created} rollup rows in {elapsed:.2f}s'))
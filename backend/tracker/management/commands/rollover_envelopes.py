@@ -0,0 +1,59 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.models import Envelope
+from tracker.rollover import rollover_envelopes
+
+
+class Command(BaseCommand):
+    help = "Run the monthly envelope rollover for every user (schedule it for the end of each month)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', help='Only roll over this username (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Users rolled over per database transaction')
+        parser.add_argument('--period', help='Month being closed, YYYY-MM (default: the current month)')
+        parser.add_argument('--dry-run', action='store_true', help='Report the changes without saving them')
+        parser.add_argument('--no-carry-over', action='store_true', help='Do not carry underspent amounts into next month')
+        parser.add_argument('--no-reset-overspent', action='store_true', help='Carry overspent amounts into next month as a negative amount')
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(envelopes__isnull=False).distinct().order_by('pk')
+        if options['user']:
+            users = users.filter(username__in=options['user'])
+        user_ids = list(users.values_list('pk', flat=True))
+        batch_size = options['batch_size']
+        period = None
+        if options['period']:
+            try:
+                year, month = (int(part) for part in options['period'].split('-'))
+            except ValueError:
+                raise CommandError(f"Invalid period: {options['period']}")
+            if not 1 <= month <= 12:
+                raise CommandError(f"Invalid period: {options['period']}")
+            period = (year, month)
+
+        started = time.monotonic()
+        changed = 0
+        for start in range(0, len(user_ids), batch_size):
+            changes = rollover_envelopes(
+                Envelope.objects.filter(user_id__in=user_ids[start:start + batch_size]),
+                carry_over_underspent=not options['no_carry_over'],
+                reset_overspent=not options['no_reset_overspent'],
+                dry_run=options['dry_run'],
+                period=period,
+            )
+            changed += len(changes)
+            if options['verbosity'] > 1:
+                for change in changes:
+                    self.stdout.write(
+                        f"  envelope {change['id']} ({change['category_name']}): "
+                        f"{change['remaining']} VT remaining, {change['rolled_over']} VT carried over"
+                    )
+        elapsed = time.monotonic() - started
+
+        verb = 'Would roll over' if options['dry_run'] else 'Rolled over'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {changed} envelopes for {len(user_ids)} users in {elapsed:.2f}s'
+        ))
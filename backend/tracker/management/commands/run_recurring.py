@@ -0,0 +1,59 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from tracker.recurring import process_due_batch
+
+
+class Command(BaseCommand):
+    help = "Post every due recurring transaction for all users (safe to run in several processes)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Templates locked and posted per database transaction')
+        parser.add_argument('--date', help='Post occurrences up to this date (YYYY-MM-DD, default today)')
+        parser.add_argument('--loop', action='store_true', help='Keep running, starting a new pass every --interval seconds')
+        parser.add_argument('--interval', type=int, default=300)
+
+    def handle(self, *args, **options):
+        through = None
+        if options['date']:
+            through = parse_date(options['date'])
+            if through is None:
+                raise CommandError(f"Invalid date: {options['date']}")
+
+        while True:
+            self.run_pass(through or date.today(), options['batch_size'])
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+    def run_pass(self, through, batch_size):
+        started = time.monotonic()
+        batches = templates = created = 0
+        # A template still due after its batch can't advance (for example an
+        # active one with no occurrences left); skip it for the rest of the pass
+        stuck = set()
+
+        while True:
+            due, count = process_due_batch(through, batch_size=batch_size, exclude=stuck)
+            if not due:
+                break
+            batches += 1
+            templates += len(due)
+            created += count
+            stuck.update(
+                recurring.pk for recurring in due
+                if recurring.status == 'active' and recurring.next_occurrence <= through
+            )
+
+        elapsed = time.monotonic() - started
+        rate = created / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Posted {created} transactions from {templates} templates in {batches} batches '
+            f'in {elapsed:.2f}s ({rate:.0f} transactions/s)'
+        ))
+        if stuck:
+            self.stdout.write(self.style.WARNING(f'{len(stuck)} templates could not advance: {sorted(stuck)}'))
+        return created
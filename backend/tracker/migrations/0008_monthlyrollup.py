@@ -0,0 +1,59 @@
+# Generated by Django 5.0.7 on 2026-10-17 03:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+
+def populate_rollups(apps, schema_editor):
+    Transaction = apps.get_model('tracker', 'Transaction')
+    MonthlyRollup = apps.get_model('tracker', 'MonthlyRollup')
+
+    buckets = Transaction.objects.annotate(
+        year=ExtractYear('date'),
+        month=ExtractMonth('date'),
+    ).order_by().values(
+        'user_id', 'year', 'month', 'category', 'transaction_type'
+    ).annotate(
+        total=Sum('amount'),
+        count=Count('id'),
+    )
+
+    batch = []
+    for bucket in buckets.iterator(chunk_size=1000):
+        batch.append(MonthlyRollup(**bucket))
+        if len(batch) >= 1000:
+            MonthlyRollup.objects.bulk_create(batch)
+            batch = []
+    MonthlyRollup.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0007_hot_path_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('category', models.CharField(max_length=100)),
+                ('transaction_type', models.CharField(choices=[('income', 'Income'), ('expense', 'Expense')], max_length=10)),
+                ('total', models.BigIntegerField(default=0)),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['year', 'month', 'category'],
+                'unique_together': {('user', 'year', 'month', 'category', 'transaction_type')},
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
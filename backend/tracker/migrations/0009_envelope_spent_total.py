@@ -0,0 +1,35 @@
+# Generated by Django 5.0.7 on 2026-10-17 04:00
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def populate_spent_total(apps, schema_editor):
+    Category = apps.get_model('tracker', 'Category')
+    Envelope = apps.get_model('tracker', 'Envelope')
+    Transaction = apps.get_model('tracker', 'Transaction')
+
+    category_name = Category.objects.filter(pk=OuterRef(OuterRef('category_id'))).values('name')
+    spent = Transaction.objects.filter(
+        user=OuterRef('user_id'),
+        category=Subquery(category_name),
+        transaction_type='expense'
+    ).order_by().values('user').annotate(total=Sum('amount')).values('total')
+    Envelope.objects.update(spent_total=Coalesce(Subquery(spent), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0008_monthlyrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='envelope',
+            name='spent_total',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_spent_total, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+# Trigram indexes on the expressions Django emits for ``icontains`` on
+# PostgreSQL, so substring searches on description/category use the index.
+SEARCH_INDEXES = {
+    'txn_description_trgm_idx': 'UPPER("description"::text) gin_trgm_ops',
+    'txn_category_trgm_idx': 'UPPER("category"::text) gin_trgm_ops',
+}
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, expression in SEARCH_INDEXES.items():
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON tracker_transaction USING gin ({expression})'
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in SEARCH_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0010_transaction_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
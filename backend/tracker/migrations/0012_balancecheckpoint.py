@@ -0,0 +1,58 @@
+# Generated by Django 5.0.7 on 2026-10-17 04:06
+
+import datetime
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Q, Sum
+
+
+def populate_checkpoints(apps, schema_editor):
+    MonthlyRollup = apps.get_model('tracker', 'MonthlyRollup')
+    BalanceCheckpoint = apps.get_model('tracker', 'BalanceCheckpoint')
+
+    nets = MonthlyRollup.objects.order_by('user_id', 'year', 'month').values('user_id', 'year', 'month').annotate(
+        income=Sum('total', filter=Q(transaction_type='income')),
+        expenses=Sum('total', filter=Q(transaction_type='expense')),
+    )
+
+    batch = []
+    balance = 0
+    current_user = None
+    for row in nets:
+        if row['user_id'] != current_user:
+            current_user = row['user_id']
+            balance = 0
+        balance += (row['income'] or 0) - (row['expenses'] or 0)
+        batch.append(BalanceCheckpoint(
+            user_id=row['user_id'],
+            month_start=datetime.date(row['year'], row['month'], 1),
+            balance=balance,
+        ))
+    BalanceCheckpoint.objects.bulk_create(batch, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0011_transaction_search_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month_start', models.DateField()),
+                ('balance', models.BigIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_checkpoints', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['month_start'],
+                'unique_together': {('user', 'month_start')},
+            },
+        ),
+        migrations.RunPython(populate_checkpoints, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.0.7 on 2026-10-17 04:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def seed_envelope_budgets(apps, schema_editor):
+    """Carry each envelope's single budget into a period row for the month
+    it was created, which later months inherit until a new budget is set"""
+    Envelope = apps.get_model('tracker', 'Envelope')
+    EnvelopeBudget = apps.get_model('tracker', 'EnvelopeBudget')
+
+    batch = []
+    for envelope in Envelope.objects.only('pk', 'budgeted_amount', 'created_at').iterator(chunk_size=1000):
+        created = timezone.localtime(envelope.created_at) if timezone.is_aware(envelope.created_at) else envelope.created_at
+        batch.append(EnvelopeBudget(
+            envelope_id=envelope.pk,
+            year=created.year,
+            month=created.month,
+            budgeted=envelope.budgeted_amount,
+        ))
+        if len(batch) >= 1000:
+            EnvelopeBudget.objects.bulk_create(batch)
+            batch = []
+    EnvelopeBudget.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0013_recurring_scheduler'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnvelopeBudget',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('budgeted', models.IntegerField()),
+                ('rolled_over', models.IntegerField(default=0)),
+                ('envelope', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='period_budgets', to='tracker.envelope')),
+            ],
+            options={
+                'ordering': ['year', 'month'],
+                'unique_together': {('envelope', 'year', 'month')},
+            },
+        ),
+        migrations.RunPython(seed_envelope_budgets, migrations.RunPython.noop),
+    ]
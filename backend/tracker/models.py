@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction as db_transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
 from decimal import Decimal
@@ -23,13 +23,108 @@ class Category(models.Model):
         return f"{self.name} ({self.get_transaction_type_display()})"
 
 
+class EnvelopeQuerySet(models.QuerySet):
+    def with_spending(self, year=None, month=None):
+        """Annotate one month's spent/available/remaining, percentage and budget
+        flags in a single query (the current month by default).
+
+        What an envelope has to spend in a month is the month's budget plus
+        what the rollover carried into it; see ``for_period``.
+        """
+        from django.db.models import BigIntegerField, BooleanField, Case, ExpressionWrapper, F, FloatField, Value, When
+        from django.db.models.functions import Cast
+
+        if year is None:
+            today = timezone.localdate()
+            year, month = today.year, today.month
+        return self.for_period(year, month).annotate(
+            spent=F('period_spent'),
+            available=ExpressionWrapper(
+                F('period_budgeted') + F('period_rolled_over'), output_field=BigIntegerField()
+            ),
+        ).annotate(
+            remaining=F('period_remaining'),
+            percentage=Case(
+                When(available__lte=0, then=Value(0.0)),
+                default=Cast('spent', FloatField()) * 100.0 / F('available'),
+                output_field=FloatField(),
+            ),
+            over_budget=Case(
+                When(spent__gt=F('available'), then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField(),
+            ),
+            near_limit=Case(
+                When(available__lte=0, then=Value(False)),
+                When(spent__gte=F('available') * 0.8, then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField(),
+            ),
+        )
+
+    def for_period(self, year, month):
+        """Annotate one month's budget, carried-over amount, spend and remaining
+        in a single query.
+
+        The budget comes from the month's EnvelopeBudget row, else the latest
+        earlier one, else ``budgeted_amount``; spend is the month's expense
+        rollup for the envelope's category, one indexed row.
+        """
+        from django.db.models import BigIntegerField, ExpressionWrapper, F, OuterRef, Q, Subquery, Value
+        from django.db.models.functions import Coalesce
+
+        up_to_month = EnvelopeBudget.objects.filter(envelope=OuterRef('pk')).filter(
+            Q(year__lt=year) | Q(year=year, month__lte=month)
+        )
+        this_month = up_to_month.filter(year=year, month=month)
+        spent = MonthlyRollup.objects.filter(
+            user=OuterRef('user_id'),
+            year=year,
+            month=month,
+            category=OuterRef('category__name'),
+            transaction_type='expense'
+        ).values('total')
+
+        return self.annotate(
+            period_budgeted=Coalesce(
+                Subquery(up_to_month.order_by('-year', '-month').values('budgeted')[:1]),
+                F('budgeted_amount')
+            ),
+            period_rolled_over=Coalesce(Subquery(this_month.values('rolled_over')[:1]), Value(0)),
+            period_spent=Coalesce(Subquery(spent), Value(0), output_field=BigIntegerField()),
+        ).annotate(
+            period_remaining=ExpressionWrapper(
+                F('period_budgeted') + F('period_rolled_over') - F('period_spent'),
+                output_field=BigIntegerField()
+            ),
+        )
+
+    def refresh_spent_totals(self):
+        """Recompute spent_total from the transaction table in a single UPDATE"""
+        from django.db.models import OuterRef, Subquery, Sum
+        from django.db.models.functions import Coalesce
+
+        category_name = Category.objects.filter(pk=OuterRef(OuterRef('category_id'))).values('name')
+        spent = Transaction.objects.filter(
+            user=OuterRef('user_id'),
+            category=Subquery(category_name),
+            transaction_type='expense'
+        ).order_by().values('user').annotate(total=Sum('amount')).values('total')
+        return self.update(spent_total=Coalesce(Subquery(spent), 0))
+
+
 class Envelope(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='envelopes')
     category = models.OneToOneField(Category, on_delete=models.CASCADE)
     budgeted_amount = models.IntegerField()
+    # Running total of expenses in this envelope's category, kept up to date
+    # by tracker.ledger on every transaction write
+    spent_total = models.BigIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = EnvelopeQuerySet.as_manager()
+
     class Meta:
         ordering = ['category__name']
         unique_together = ['user', 'category']
@@ -37,27 +132,68 @@ class Envelope(models.Model):
     def __str__(self):
         return f"{self.category.name} - {self.budgeted_amount} VT"
 
+    def save(self, *args, **kwargs):
+        with db_transaction.atomic():
+            super().save(*args, **kwargs)
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                # The envelope may be new or point at a different category now
+                Envelope.objects.filter(pk=self.pk).refresh_spent_totals()
+                self.spent_total = Envelope.objects.values_list('spent_total', flat=True).get(pk=self.pk)
+            if update_fields is None or 'budgeted_amount' in update_fields:
+                # The budget set now applies from this month on; earlier months keep theirs
+                today = timezone.localdate()
+                EnvelopeBudget.objects.update_or_create(
+                    envelope=self,
+                    year=today.year,
+                    month=today.month,
+                    defaults={'budgeted': self.budgeted_amount}
+                )
+            self._clear_spending()
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._clear_spending()
+
+    def _clear_spending(self):
+        """Drop month figures loaded or annotated earlier, which may be stale now"""
+        for name in ('available', 'spent', 'period_rolled_over'):
+            self.__dict__.pop(name, None)
+
+    def _load_spending(self):
+        """Load this month's figures unless ``with_spending`` annotated them"""
+        if not hasattr(self, 'available'):
+            figures = Envelope.objects.filter(pk=self.pk).with_spending().values(
+                'period_rolled_over', 'available', 'spent'
+            ).get()
+            for name, value in figures.items():
+                setattr(self, name, value)
+
     @property
     def spent_amount(self):
-        """Calculate total spent from this envelope"""
-        from django.db.models import Sum
-        return Transaction.objects.filter(
-            user=self.user,
-            category=self.category.name,
-            transaction_type='expense'
-        ).aggregate(total=Sum('amount'))['total'] or 0
+        """Amount spent from this envelope this month"""
+        self._load_spending()
+        return self.spent
+
+    @property
+    def rolled_over_amount(self):
+        """Amount the rollover carried into this month"""
+        self._load_spending()
+        return self.period_rolled_over
 
     @property
     def remaining_amount(self):
-        """Calculate remaining amount in envelope"""
-        return self.budgeted_amount - self.spent_amount
+        """This month's budget plus carry-over, less what was spent this month"""
+        self._load_spending()
+        return self.available - self.spent
 
     @property
     def percentage_used(self):
-        """Calculate percentage of budget used"""
-        if self.budgeted_amount == 0:
+        """Calculate percentage of this month's budget used"""
+        self._load_spending()
+        if self.available <= 0:
             return 0
-        return float((self.spent_amount / self.budgeted_amount) * 100)
+        return float((self.spent / self.available) * 100)
 
     @property
     def is_over_budget(self):
@@ -70,6 +206,70 @@ class Envelope(models.Model):
         return self.percentage_used >= 80
 
 
+class EnvelopeBudget(models.Model):
+    """An envelope's budget for one month, plus what the rollover carried in"""
+    envelope = models.ForeignKey(Envelope, on_delete=models.CASCADE, related_name='period_budgets')
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    budgeted = models.IntegerField()
+    rolled_over = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['year', 'month']
+        unique_together = ['envelope', 'year', 'month']
+
+    def __str__(self):
+        return f"{self.envelope.category.name} {self.year}-{self.month:02d}: {self.budgeted} VT"
+
+    @property
+    def available(self):
+        return self.budgeted + self.rolled_over
+
+
+# Fields that determine how a transaction contributes to the derived ledger tables
+LEDGER_FIELDS = ('user_id', 'date', 'category', 'transaction_type', 'amount')
+
+
+class TransactionQuerySet(models.QuerySet):
+    """Keeps the derived ledger tables in step with bulk writes.
+
+    ``bulk_create``, ``bulk_update`` and ``delete`` record their changes in
+    the same database transaction. ``update()`` is not tracked, so use
+    ``bulk_update`` to change ledger fields in bulk.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        from .ledger import apply_ledger_changes
+        with db_transaction.atomic():
+            objs = super().bulk_create(objs, *args, **kwargs)
+            apply_ledger_changes(added=[obj.ledger_entry() for obj in objs])
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        from .ledger import apply_ledger_changes
+        objs = list(objs)
+        pks = [obj.pk for obj in objs]
+        with db_transaction.atomic():
+            previous = self.model.objects.filter(pk__in=pks).select_for_update().ledger_entries()
+            rows = super().bulk_update(objs, fields, *args, **kwargs)
+            apply_ledger_changes(
+                removed=previous,
+                added=self.model.objects.filter(pk__in=pks).ledger_entries(),
+            )
+        return rows
+
+    def delete(self):
+        from .ledger import apply_ledger_changes
+        with db_transaction.atomic():
+            previous = self.select_for_update().ledger_entries()
+            result = super().delete()
+            apply_ledger_changes(removed=previous)
+        return result
+
+    def ledger_entries(self):
+        return list(self.order_by().values_list(*LEDGER_FIELDS))
+
+
 class Transaction(models.Model):
     TRANSACTION_TYPES = [
         ('income', 'Income'),
@@ -84,13 +284,67 @@ class Transaction(models.Model):
     date = models.DateField(default=timezone.now)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # The recurring template this transaction was generated from, if any
+    recurring = models.ForeignKey(
+        'RecurringTransaction',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='transactions'
+    )
+
+    objects = TransactionQuerySet.as_manager()
 
     class Meta:
         ordering = ['-date', '-created_at']
+        indexes = [
+            # Reports, balances and date-range filters: (user, type, date)
+            models.Index(fields=['user', 'transaction_type', 'date'], name='txn_user_type_date_idx'),
+            # Envelope spend lookups: (user, category, type)
+            models.Index(fields=['user', 'category', 'transaction_type'], name='txn_user_cat_type_idx'),
+            # Default list ordering for a user's transaction feed
+            models.Index(fields=['user', '-date', '-created_at'], name='txn_user_date_created_idx'),
+            # Category-filtered feeds and date ranges within a category
+            models.Index(fields=['user', 'category', '-date'], name='txn_user_cat_date_idx'),
+            # Amount range filters and ordering by amount
+            models.Index(fields=['user', 'amount'], name='txn_user_amount_idx'),
+        ]
+        constraints = [
+            # A template posts each occurrence date at most once
+            models.UniqueConstraint(fields=['recurring', 'date'], name='txn_recurring_date_uniq'),
+        ]
 
     def __str__(self):
         return f"{self.description} - {self.amount} VT ({self.transaction_type})"
 
+    def save(self, *args, **kwargs):
+        from .ledger import apply_ledger_changes
+        with db_transaction.atomic():
+            previous = []
+            if not self._state.adding and self.pk:
+                previous = Transaction.objects.filter(pk=self.pk).select_for_update().ledger_entries()
+            super().save(*args, **kwargs)
+            apply_ledger_changes(removed=previous, added=[self.ledger_entry()])
+
+    def delete(self, *args, **kwargs):
+        from .ledger import apply_ledger_changes
+        with db_transaction.atomic():
+            previous = Transaction.objects.filter(pk=self.pk).select_for_update().ledger_entries()
+            result = super().delete(*args, **kwargs)
+            apply_ledger_changes(removed=previous)
+        return result
+
+    def ledger_entry(self):
+        """This transaction's values as stored, in LEDGER_FIELDS order"""
+        return (
+            self.user_id,
+            self._meta.get_field('date').to_python(self.date),
+            self.category,
+            self.transaction_type,
+            int(self.amount),
+        )
+
     @property
     def is_income(self):
         return self.transaction_type == 'income'
@@ -100,6 +354,42 @@ class Transaction(models.Model):
         return self.transaction_type == 'expense'
 
 
+class MonthlyRollup(models.Model):
+    """Pre-aggregated transaction totals per user, month, category and type"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='monthly_rollups')
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    category = models.CharField(max_length=100)
+    transaction_type = models.CharField(max_length=10, choices=Transaction.TRANSACTION_TYPES)
+    total = models.BigIntegerField(default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['year', 'month', 'category']
+        unique_together = ['user', 'year', 'month', 'category', 'transaction_type']
+
+    def __str__(self):
+        return f"{self.year}-{self.month:02d} {self.category} ({self.transaction_type}): {self.total} VT"
+
+
+class BalanceCheckpoint(models.Model):
+    """A user's running balance at the close of a month.
+
+    Only months with transactions have a row; a month without one closes at
+    the balance of the latest earlier checkpoint.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='balance_checkpoints')
+    month_start = models.DateField()
+    balance = models.BigIntegerField(default=0)
+
+    class Meta:
+        ordering = ['month_start']
+        unique_together = ['user', 'month_start']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.month_start:%Y-%m}: {self.balance} VT"
+
+
 class SavingsGoal(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='savings_goals')
     name = models.CharField(max_length=200)
@@ -171,57 +461,38 @@ class RecurringTransaction(models.Model):
 
     class Meta:
         ordering = ['next_occurrence']
+        indexes = [
+            models.Index(fields=['user', 'status', 'next_occurrence'], name='recur_user_status_next_idx'),
+            # Overdue/upcoming scans only ever look at active templates
+            models.Index(
+                fields=['user', 'next_occurrence'],
+                condition=models.Q(status='active'),
+                name='recur_active_next_idx',
+            ),
+            # Scheduler scans for due templates across all users
+            models.Index(
+                fields=['next_occurrence'],
+                condition=models.Q(status='active'),
+                name='recur_active_due_idx',
+            ),
+        ]
         verbose_name = "Recurring Transaction"
         verbose_name_plural = "Recurring Transactions"
 
     def __str__(self):
         return f"{self.name} - {self.get_frequency_display()} ({self.transaction_type})"
 
-    def calculate_next_occurrence(self):
-        """Calculate the next occurrence date based on frequency"""
-        from datetime import timedelta, date
-        import calendar
-
-        current = self.next_occurrence or self.start_date
-        
-        if self.frequency == 'daily':
-            next_date = current + timedelta(days=1)
-        elif self.frequency == 'weekly':
-            next_date = current + timedelta(weeks=1)
-        elif self.frequency == 'biweekly':
-            next_date = current + timedelta(weeks=2)
-        elif self.frequency == 'monthly':
-            # Add one month, handling month length variations
-            year = current.year
-            month = current.month + 1
-            if month > 12:
-                month = 1
-                year += 1
-            day = min(current.day, calendar.monthrange(year, month)[1])
-            next_date = date(year, month, day)
-        elif self.frequency == 'bimonthly':
-            # Add two months
-            year = current.year
-            month = current.month + 2
-            if month > 12:
-                month = month - 12
-                year += 1
-            day = min(current.day, calendar.monthrange(year, month)[1])
-            next_date = date(year, month, day)
-        elif self.frequency == 'quarterly':
-            # Add three months
-            year = current.year
-            month = current.month + 3
-            if month > 12:
-                month = month - 12
-                year += 1
-            day = min(current.day, calendar.monthrange(year, month)[1])
-            next_date = date(year, month, day)
-        elif self.frequency == 'yearly':
-            # Add one year
-            next_date = date(current.year + 1, current.month, current.day)
+    def calculate_next_occurrence(self, periods=1, on_or_after=None):
+        """Calculate the occurrence ``periods`` steps after ``next_occurrence``,
+        or the first one on or after ``on_or_after``; None once the schedule ends"""
+        from .schedule import nearest_index, occurrence, occurrence_index
+
+        if on_or_after is None:
+            current = self.next_occurrence or self.start_date
+            k = nearest_index(self.start_date, self.frequency, current) + periods
         else:
-            next_date = current
+            k = occurrence_index(self.start_date, self.frequency, on_or_after)
+        next_date = occurrence(self.start_date, self.frequency, k)
 
         # Check if we've reached the end date or max occurrences
         if self.end_date and next_date > self.end_date:
@@ -231,30 +502,65 @@ class RecurringTransaction(models.Model):
 
         return next_date
 
+    def pending_occurrences(self, window_start, window_end, limit=None):
+        """Dates this template will still post within ``[window_start, window_end]``,
+        honouring ``end_date`` and the occurrences left under ``max_occurrences``"""
+        from .schedule import nearest_index, occurrence, occurrence_index, occurrences_between
+
+        if self.status != 'active':
+            return []
+        remaining = None
+        if self.max_occurrences:
+            remaining = self.max_occurrences - self.count_created
+            if remaining <= 0:
+                return []
+
+        dates = []
+        if window_start <= self.next_occurrence <= window_end:
+            dates.append(self.next_occurrence)
+
+        # Later dates come straight from the schedule, after the occurrence
+        # next_occurrence stands in for; the ones before the window still
+        # count against max_occurrences
+        next_k = nearest_index(self.start_date, self.frequency, self.next_occurrence) + 1
+        window_k = max(next_k, occurrence_index(self.start_date, self.frequency, window_start))
+        window_first = occurrence(self.start_date, self.frequency, window_k)
+        if remaining is not None:
+            remaining = max(remaining - 1 - (window_k - next_k), 0)
+        if limit is not None:
+            limit = max(limit - len(dates), 0)
+            remaining = limit if remaining is None else min(remaining, limit)
+
+        last = min(window_end, self.end_date) if self.end_date else window_end
+        dates.extend(occurrences_between(self.start_date, self.frequency, window_first, last, remaining))
+        return dates
+
     def create_transaction(self):
         """Create an actual transaction from this recurring template"""
-        transaction = Transaction.objects.create(
-            user=self.user,
-            description=f"{self.name} (Recurring)",
-            amount=self.amount,
-            category=self.category,
-            transaction_type=self.transaction_type,
-            date=self.next_occurrence,
-        )
-        
-        # Update recurring transaction metadata
-        self.count_created += 1
-        self.last_created = timezone.now()
-        
-        # Calculate next occurrence
-        next_date = self.calculate_next_occurrence()
-        if next_date:
-            self.next_occurrence = next_date
-        else:
-            # No more occurrences, mark as completed
-            self.status = 'completed'
-        
-        self.save()
+        with db_transaction.atomic():
+            transaction = Transaction.objects.create(
+                user=self.user,
+                recurring=self,
+                description=f"{self.name} (Recurring)",
+                amount=self.amount,
+                category=self.category,
+                transaction_type=self.transaction_type,
+                date=self.next_occurrence,
+            )
+            
+            # Update recurring transaction metadata
+            self.count_created += 1
+            self.last_created = timezone.now()
+            
+            # Calculate next occurrence
+            next_date = self.calculate_next_occurrence()
+            if next_date:
+                self.next_occurrence = next_date
+            else:
+                # No more occurrences, mark as completed
+                self.status = 'completed'
+            
+            self.save()
         return transaction
 
     @property
@@ -0,0 +1,168 @@
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connection
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, CursorPagination, PageNumberPagination, _reverse_ordering
+
+from .filters import transaction_ordering
+
+
+class TransactionCursorPagination(CursorPagination):
+    """Keyset pagination over the transaction feed.
+
+    Pages are located with a WHERE on the ordering columns instead of an
+    OFFSET, and no COUNT(*) is run, so page 1000 costs the same as page 1.
+    The cursor holds every ordering column, not just the first, so a page
+    that ends part-way through one date resumes at the next row of it.
+    """
+    ordering = ('-date', '-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_ordering(self, request, queryset, view):
+        return transaction_ordering(request.query_params)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if current_position is not None:
+            try:
+                queryset = queryset.filter(self.after_position(current_position, reverse))
+            except (DjangoValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = list(results[:self.page_size])
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def after_position(self, position, reverse):
+        """Rows strictly past ``position`` in the (possibly reversed) ordering.
+
+        ``(a, b, c) > (x, y, z)`` expands to ``a > x OR (a = x AND b > y) OR
+        (a = x AND b = y AND c > z)``, with each comparison flipped for a
+        descending column. The leading ``a >= x`` lets the index bound the scan.
+        """
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        condition = Q()
+        equal = {}
+        for order, value in zip(self.ordering, values):
+            field = order.lstrip('-')
+            lookup = 'lt' if reverse != order.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{field}__{lookup}': value})
+            equal[field] = value
+        first = self.ordering[0].lstrip('-')
+        first_lookup = 'lte' if reverse != self.ordering[0].startswith('-') else 'gte'
+        return Q(**{f'{first}__{first_lookup}': values[0]}) & condition
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for order in ordering:
+            value = getattr(instance, order.lstrip('-'))
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return json.dumps(values, separators=(',', ':'))
+
+
+def estimated_count(queryset):
+    """Row count estimate from the query planner (exact count off PostgreSQL)"""
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class TransactionPagination(BasePagination):
+    """Page-number pagination by default, cursor pagination on request.
+
+    Clients opt in with ``?pagination=cursor`` (or by sending a ``cursor``)
+    and can then ask for ``?count=estimate`` or ``?count=exact`` when a
+    total is needed. Search results ranked by relevance can't be paged by
+    cursor, so a search needs an explicit ``ordering`` to use one.
+    """
+
+    def __init__(self):
+        self.paginator = None
+        self.count = None
+        self.count_mode = None
+
+    def use_cursor(self, request):
+        mode = request.query_params.get('pagination')
+        if mode:
+            return mode == 'cursor'
+        return 'cursor' in request.query_params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_cursor(request):
+            params = request.query_params
+            if params.get('search', '').strip() and not params.get('ordering'):
+                raise ValidationError({
+                    'pagination': 'Relevance-ranked search results use page-number pagination; '
+                                  'pass an ordering to page a search by cursor.'
+                })
+            self.paginator = TransactionCursorPagination()
+            self.count_mode = request.query_params.get('count')
+            if self.count_mode == 'exact':
+                self.count = queryset.count()
+            elif self.count_mode == 'estimate':
+                self.count = estimated_count(queryset)
+        else:
+            self.paginator = PageNumberPagination()
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = self.paginator.get_paginated_response(data)
+        if self.count is not None:
+            response.data['count'] = self.count
+            response.data['count_is_estimate'] = self.count_mode == 'estimate'
+        return response
+
+    def get_schema_operation_parameters(self, view):
+        return PageNumberPagination().get_schema_operation_parameters(view)
@@ -0,0 +1,134 @@
+"""Bulk generation of recurring transactions.
+
+``catch_up`` lists every occurrence a template has missed straight from its
+date rule (see ``tracker.schedule``), then writes all the new transactions
+with ``bulk_create`` and all the advanced templates with one ``bulk_update``,
+inside a single database transaction. ``process_due_batch``
+does the same for a batch of due templates across all users and backs the
+``run_recurring`` scheduler command.
+
+Generated transactions point at their template, and a unique constraint on
+(template, date) guarantees an occurrence is never posted twice.
+"""
+from collections import defaultdict
+
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from .models import RecurringTransaction, Transaction
+
+TEMPLATE_FIELDS = ('next_occurrence', 'status', 'count_created', 'last_created', 'updated_at')
+# Most dates the occurrences endpoint lists at once
+MAX_OCCURRENCES = 1000
+
+
+def expand_occurrences(recurring, through, now, posted=frozenset()):
+    """Advance ``recurring`` past every occurrence on or before ``through``.
+
+    Returns the unsaved transactions for those occurrences, leaving out the
+    dates in ``posted`` that already have one; the template is updated in
+    memory only.
+    """
+    dates = recurring.pending_occurrences(recurring.next_occurrence, through)
+    transactions = [
+        Transaction(
+            user=recurring.user,
+            recurring=recurring,
+            description=f"{recurring.name} (Recurring)",
+            amount=recurring.amount,
+            category=recurring.category,
+            transaction_type=recurring.transaction_type,
+            date=day,
+        )
+        for day in dates
+        if day not in posted
+    ]
+    if dates:
+        recurring.next_occurrence = dates[-1]
+        recurring.count_created += len(transactions)
+        recurring.last_created = now
+        next_date = recurring.calculate_next_occurrence()
+        if next_date:
+            recurring.next_occurrence = next_date
+        else:
+            # No more occurrences, mark as completed
+            recurring.status = 'completed'
+    recurring.updated_at = now
+    return transactions
+
+
+def post_occurrences(due, through, batch_size=1000):
+    """Expand and save the occurrences of already-locked ``due`` templates"""
+    now = timezone.now()
+    # Dates the templates already have a transaction on, for example one an
+    # edit moved there; posting them again would break txn_recurring_date_uniq
+    posted = defaultdict(set)
+    if due:
+        existing = Transaction.objects.filter(
+            recurring__in=due,
+            date__gte=min(recurring.next_occurrence for recurring in due),
+            date__lte=through,
+        ).values_list('recurring_id', 'date')
+        for recurring_id, day in existing:
+            posted[recurring_id].add(day)
+
+    pending = []
+    for recurring in due:
+        pending.extend(expand_occurrences(recurring, through, now, posted[recurring.pk]))
+
+    created = []
+    for start in range(0, len(pending), batch_size):
+        created.extend(Transaction.objects.bulk_create(pending[start:start + batch_size]))
+    RecurringTransaction.objects.bulk_update(due, TEMPLATE_FIELDS, batch_size=batch_size)
+    return created
+
+
+def catch_up(templates, through, batch_size=1000):
+    """Create all occurrences due on or before ``through`` for ``templates``.
+
+    The active, due templates are locked for the duration so concurrent
+    catch-ups cannot post the same occurrence twice. Returns the created
+    transactions.
+    """
+    with transaction.atomic():
+        due = list(
+            templates.filter(status='active', next_occurrence__lte=through)
+            .select_related('user')
+            .select_for_update(of=('self',))
+            .order_by('pk')
+        )
+        return post_occurrences(due, through, batch_size)
+
+
+def process_due_batch(through, batch_size=500, exclude=()):
+    """Post the occurrences of up to ``batch_size`` due templates of any user.
+
+    Templates locked by another worker are skipped rather than waited on, so
+    several workers can drain the queue side by side. If the batch fails on
+    a database error, its templates are retried one savepoint each so a
+    single bad template cannot block the others; the ones that still fail
+    are left unchanged. Returns the processed templates and the number of
+    transactions created.
+    """
+    with transaction.atomic():
+        due = list(
+            RecurringTransaction.objects.filter(status='active', next_occurrence__lte=through)
+            .exclude(pk__in=exclude)
+            .select_related('user')
+            .select_for_update(of=('self',), skip_locked=True)
+            .order_by('next_occurrence', 'pk')[:batch_size]
+        )
+        try:
+            with transaction.atomic():
+                created = post_occurrences(due, through)
+        except DatabaseError:
+            created = []
+            for recurring in due:
+                # Undo the in-memory advance of the rolled back attempt
+                recurring.refresh_from_db(fields=TEMPLATE_FIELDS)
+                try:
+                    with transaction.atomic():
+                        created.extend(post_occurrences([recurring], through))
+                except DatabaseError:
+                    recurring.refresh_from_db(fields=TEMPLATE_FIELDS)
+    return due, len(created)
@@ -0,0 +1,506 @@
+"""Report builders used by the report views.
+
+Totals and category figures come from the MonthlyRollup table, so a report
+reads a few rows per month and category however long the user's history is.
+Only the daily breakdown of a monthly report touches raw transactions, with
+one grouped query over that month's date range.
+"""
+import calendar
+from bisect import bisect_left
+from datetime import date, timedelta
+from functools import reduce
+from operator import or_
+
+from django.db.models import Count, Q, Sum
+from django.utils.dateparse import parse_date
+
+from .models import BalanceCheckpoint, Envelope, MonthlyRollup, Transaction
+
+
+def month_bounds(year, month):
+    """Return the [start, end) date range covering a calendar month"""
+    start = date(year, month, 1)
+    end = start + timedelta(days=calendar.monthrange(year, month)[1])
+    return start, end
+
+
+def summarize_rollups(rows):
+    """Income/expense totals, row count and per-category expense from rollup rows"""
+    summary = {'income': 0, 'expenses': 0, 'transaction_count': 0, 'categories': {}}
+    for row in rows:
+        summary['transaction_count'] += row['count']
+        if row['transaction_type'] == 'income':
+            summary['income'] += row['total']
+        else:
+            summary['expenses'] += row['total']
+            amount, count = summary['categories'].get(row['category'], (0, 0))
+            summary['categories'][row['category']] = (amount + row['total'], count + row['count'])
+    return summary
+
+
+def monthly_daily_totals(transactions):
+    """Map each date to its (income, expenses) using one grouped query"""
+    rows = transactions.order_by().values('date').annotate(
+        income=Sum('amount', filter=Q(transaction_type='income')),
+        expenses=Sum('amount', filter=Q(transaction_type='expense')),
+    )
+    return {row['date']: (row['income'] or 0, row['expenses'] or 0) for row in rows}
+
+
+def yearly_buckets(user, year):
+    """Amount and row count per (month, category, type) from the rollup table"""
+    return list(
+        MonthlyRollup.objects.filter(user=user, year=year).values(
+            'month', 'category', 'transaction_type', 'total', 'count'
+        )
+    )
+
+
+def account_totals(user, today):
+    """Lifetime and current-month income/expense totals in one query.
+
+    Reads the monthly rollups, where the current month is an equality match
+    on the indexed (user, year, month) key rather than a date extraction.
+    """
+    this_month = Q(year=today.year, month=today.month)
+    totals = MonthlyRollup.objects.filter(user=user).aggregate(
+        total_income=Sum('total', filter=Q(transaction_type='income')),
+        total_expenses=Sum('total', filter=Q(transaction_type='expense')),
+        monthly_income=Sum('total', filter=this_month & Q(transaction_type='income')),
+        monthly_expenses=Sum('total', filter=this_month & Q(transaction_type='expense')),
+    )
+    return {key: value or 0 for key, value in totals.items()}
+
+
+def allocated_total(user):
+    """Total budgeted across the user's envelopes"""
+    return Envelope.objects.filter(user=user).aggregate(total=Sum('budgeted_amount'))['total'] or 0
+
+
+def balance_summary(totals):
+    """The balance endpoint's response from ``account_totals``"""
+    return {
+        'total_income': totals['total_income'],
+        'total_expenses': totals['total_expenses'],
+        'balance': totals['total_income'] - totals['total_expenses'],
+        'monthly_income': totals['monthly_income'],
+        'monthly_expenses': totals['monthly_expenses']
+    }
+
+
+def income_summary(totals, total_allocated):
+    """The income endpoint's response from ``account_totals`` and ``allocated_total``"""
+    total_income = totals['total_income']
+    return {
+        'total_income': total_income,
+        'total_allocated': total_allocated,
+        'total_spent': totals['total_expenses'],
+        # Calculate remaining to allocate
+        'remaining_to_allocate': total_income - total_allocated,
+        'allocation_percentage': (total_allocated / total_income * 100) if total_income > 0 else 0
+    }
+
+
+MAX_HISTORY_POINTS = 1000
+HISTORY_INTERVALS = ('day', 'week', 'month')
+
+
+def history_dates(start, end, interval):
+    """Dates from ``start`` to ``end`` at ``interval``; month points are month ends"""
+    if interval not in HISTORY_INTERVALS:
+        raise ValueError(f"Interval must be one of: {', '.join(HISTORY_INTERVALS)}")
+    if start > end:
+        raise ValueError('start_date must not be after end_date')
+
+    dates = []
+    day = start
+    while day < end and len(dates) <= MAX_HISTORY_POINTS:
+        if interval == 'month':
+            month_end = month_bounds(day.year, day.month)[1] - timedelta(days=1)
+            if month_end >= end:
+                break
+            dates.append(month_end)
+            day = month_end + timedelta(days=1)
+        else:
+            dates.append(day)
+            day += timedelta(days=7 if interval == 'week' else 1)
+    dates.append(end)
+    return dates
+
+
+def balance_history(user, dates):
+    """Closing balance on each of ``dates``, in two queries however many dates.
+
+    Each balance is the latest BalanceCheckpoint before the date's month plus
+    the net of that month's transactions up to the date.
+    """
+    dates = sorted(set(dates))
+    if not dates:
+        return []
+
+    checkpoints = list(
+        BalanceCheckpoint.objects.filter(user=user, month_start__lt=dates[-1].replace(day=1))
+        .order_by('month_start').values_list('month_start', 'balance')
+    )
+    checkpoint_months = [month_start for month_start, _ in checkpoints]
+
+    # The part of each month that the checkpoints don't cover yet
+    tails = {}
+    for day in dates:
+        tails[day.replace(day=1)] = day
+    tail_ranges = reduce(or_, (Q(date__gte=start, date__lte=end) for start, end in tails.items()))
+    daily_totals = monthly_daily_totals(Transaction.objects.filter(tail_ranges, user=user))
+
+    tail_days = sorted(daily_totals.items())
+    position = 0
+    current_month = None
+    history = []
+    for day in dates:
+        month_start = day.replace(day=1)
+        if month_start != current_month:
+            current_month = month_start
+            tail = 0
+            while position < len(tail_days) and tail_days[position][0] < month_start:
+                position += 1
+        while position < len(tail_days) and tail_days[position][0] <= day:
+            income, expenses = tail_days[position][1]
+            tail += income - expenses
+            position += 1
+
+        index = bisect_left(checkpoint_months, month_start)
+        closing = checkpoints[index - 1][1] if index else 0
+        history.append({'date': day.isoformat(), 'balance': float(closing + tail)})
+    return history
+
+
+def monthly_report_queries(user, year, month):
+    """The independent queries behind a monthly report, as callables by name.
+
+    ``build_monthly_report`` runs them one after another; the async report
+    view runs them concurrently.
+    """
+    start, end = month_bounds(year, month)
+    return {
+        'summary': lambda: summarize_rollups(
+            MonthlyRollup.objects.filter(user=user, year=year, month=month).values(
+                'category', 'transaction_type', 'total', 'count'
+            )
+        ),
+        'daily_totals': lambda: monthly_daily_totals(
+            Transaction.objects.filter(user=user, date__gte=start, date__lt=end)
+        ),
+        'envelopes': lambda: list(
+            Envelope.objects.filter(user=user).select_related('category').for_period(year, month)
+        ),
+    }
+
+
+def build_monthly_report(user, year, month):
+    results = {name: query() for name, query in monthly_report_queries(user, year, month).items()}
+    return assemble_monthly_report(year, month, **results)
+
+
+def assemble_monthly_report(year, month, summary, daily_totals, envelopes):
+    """The monthly report from the results of ``monthly_report_queries``"""
+    start, end = month_bounds(year, month)
+    income = summary['income']
+    expenses = summary['expenses']
+    categories = sorted(summary['categories'].items(), key=lambda item: item[1][0], reverse=True)
+
+    daily_breakdown = []
+    day = start
+    while day < end:
+        day_income, day_expenses = daily_totals.get(day, (0, 0))
+        daily_breakdown.append({
+            'date': day.isoformat(),
+            'income': float(day_income),
+            'expenses': float(day_expenses),
+            'net': float(day_income - day_expenses)
+        })
+        day += timedelta(days=1)
+
+    # Each envelope against that month's own budget and spend
+    envelope_performance = []
+    for envelope in envelopes:
+        available = envelope.period_budgeted + envelope.period_rolled_over
+        envelope_performance.append({
+            'category': envelope.category.name,
+            'budgeted': float(envelope.period_budgeted),
+            'rolled_over': float(envelope.period_rolled_over),
+            'spent': float(envelope.period_spent),
+            'remaining': float(envelope.period_remaining),
+            'percentage': float((envelope.period_spent / available * 100) if available > 0 else 0)
+        })
+
+    return {
+        'period': {
+            'year': year,
+            'month': month,
+            'month_name': start.strftime('%B %Y')
+        },
+        'summary': {
+            'income': float(income),
+            'expenses': float(expenses),
+            'net': float(income - expenses),
+            'transaction_count': summary['transaction_count']
+        },
+        'category_breakdown': [
+            {
+                'category': category,
+                'amount': float(amount),
+                'count': count,
+                'percentage': float((amount / expenses * 100) if expenses > 0 else 0)
+            }
+            for category, (amount, count) in categories
+        ],
+        'daily_breakdown': daily_breakdown,
+        'envelope_performance': envelope_performance
+    }
+
+
+def build_yearly_report(user, year):
+    months = {month: {'income': 0, 'expenses': 0, 'transaction_count': 0} for month in range(1, 13)}
+    category_trends = {}
+    category_totals = {}
+
+    for bucket in yearly_buckets(user, year):
+        month = months[bucket['month']]
+        month['transaction_count'] += bucket['count']
+        if bucket['transaction_type'] == 'income':
+            month['income'] += bucket['total']
+            continue
+
+        month['expenses'] += bucket['total']
+        category = bucket['category']
+        category_trends.setdefault(category, {})[bucket['month']] = float(bucket['total'])
+        category_totals[category] = category_totals.get(category, 0) + bucket['total']
+
+    monthly_breakdown = [
+        {
+            'month': month,
+            'month_name': date(year, month, 1).strftime('%B'),
+            'income': float(totals['income']),
+            'expenses': float(totals['expenses']),
+            'net': float(totals['income'] - totals['expenses']),
+            'transaction_count': totals['transaction_count']
+        }
+        for month, totals in months.items()
+    ]
+
+    category_trend_data = []
+    for category, monthly_data in category_trends.items():
+        trend_data = {'category': category}
+        for month in range(1, 13):
+            trend_data[f'month_{month}'] = monthly_data.get(month, 0)
+        category_trend_data.append(trend_data)
+
+    top_categories = sorted(category_totals.items(), key=lambda item: item[1], reverse=True)[:10]
+
+    total_income = sum(totals['income'] for totals in months.values())
+    total_expenses = sum(totals['expenses'] for totals in months.values())
+
+    return {
+        'period': {
+            'year': year
+        },
+        'summary': {
+            'total_income': float(total_income),
+            'total_expenses': float(total_expenses),
+            'total_net': float(total_income - total_expenses),
+            'transaction_count': sum(totals['transaction_count'] for totals in months.values())
+        },
+        'monthly_breakdown': monthly_breakdown,
+        'category_trends': category_trend_data,
+        'top_categories': [
+            {
+                'category': category,
+                'total': float(total)
+            }
+            for category, total in top_categories
+        ]
+    }
+
+
+COMPARISON_TYPES = ('weekly', 'monthly', 'quarterly', 'yearly')
+MAX_COMPARISON_PERIODS = 24
+
+
+def comparison_periods(period_type, today, count=2):
+    """The ``count`` consecutive periods ending with the one containing
+    ``today``, oldest first, as (label, start, end) with ``end`` inclusive"""
+    periods = []
+    if period_type == 'weekly':
+        week_start = today - timedelta(days=today.weekday())
+        for offset in range(count):
+            start = week_start - timedelta(weeks=offset)
+            iso_year, iso_week, _ = start.isocalendar()
+            periods.append((f"{iso_year}-W{iso_week:02d}", start, start + timedelta(days=6)))
+    elif period_type == 'yearly':
+        for offset in range(count):
+            year = today.year - offset
+            periods.append((str(year), date(year, 1, 1), date(year, 12, 31)))
+    else:
+        months = 3 if period_type == 'quarterly' else 1
+        first_month = (today.month - 1) // months * months
+        for offset in range(count):
+            year, month = divmod(today.year * 12 + first_month - offset * months, 12)
+            start = date(year, month + 1, 1)
+            end_year, end_month = divmod(year * 12 + month + months - 1, 12)
+            end = month_bounds(end_year, end_month + 1)[1] - timedelta(days=1)
+            if period_type == 'quarterly':
+                label = f"{year}-Q{month // 3 + 1}"
+            else:
+                label = f"{year}-{month + 1:02d}"
+            periods.append((label, start, end))
+    return periods[::-1]
+
+
+def requested_periods(params, today):
+    """The (period_type, periods) a comparison request asks for.
+
+    Either repeated ``range=YYYY-MM-DD:YYYY-MM-DD`` values (oldest first) or a
+    ``type`` and a number of ``periods``. Raises ValueError for bad values.
+    """
+    ranges = params.getlist('range')
+    if ranges:
+        periods = []
+        for value in ranges:
+            start_value, _, end_value = value.partition(':')
+            try:
+                start, end = parse_date(start_value), parse_date(end_value)
+            except ValueError:
+                start = end = None
+            if not start or not end or start > end:
+                raise ValueError(f'Invalid range {value!r}; use start:end with start on or before end')
+            periods.append((f'{start}..{end}', start, end))
+        if len(periods) > MAX_COMPARISON_PERIODS:
+            raise ValueError(f'At most {MAX_COMPARISON_PERIODS} periods can be compared')
+        return 'custom', periods
+
+    period_type = params.get('type', 'monthly')
+    if period_type not in COMPARISON_TYPES:
+        raise ValueError(f"type must be one of: {', '.join(COMPARISON_TYPES)}")
+    try:
+        count = int(params.get('periods', 2))
+    except ValueError:
+        count = 0
+    if count < 1:
+        raise ValueError('periods must be a positive number')
+    return period_type, comparison_periods(period_type, today, min(count, MAX_COMPARISON_PERIODS))
+
+
+def covers_whole_months(start, end):
+    return start.day == 1 and (end + timedelta(days=1)).day == 1
+
+
+def period_summaries(user, periods):
+    """Summaries like ``summarize_rollups`` for each (label, start, end) period,
+    from one conditional-aggregation query grouped by category and type.
+
+    Periods made of whole months read the rollup table; any other ranges
+    aggregate the transactions in the overall date span.
+    """
+    if all(covers_whole_months(start, end) for _, start, end in periods):
+        rows = MonthlyRollup.objects.filter(
+            user=user,
+            year__gte=min(start.year for _, start, _ in periods),
+            year__lte=max(end.year for _, _, end in periods),
+        )
+        amount, count = 'total', 'count'
+        in_period = [
+            (Q(year__gt=start.year) | Q(year=start.year, month__gte=start.month))
+            & (Q(year__lt=end.year) | Q(year=end.year, month__lte=end.month))
+            for _, start, end in periods
+        ]
+        count_aggregate = Sum
+    else:
+        rows = Transaction.objects.filter(
+            user=user,
+            date__gte=min(start for _, start, _ in periods),
+            date__lte=max(end for _, _, end in periods),
+        )
+        amount, count = 'amount', 'id'
+        in_period = [Q(date__gte=start, date__lte=end) for _, start, end in periods]
+        count_aggregate = Count
+
+    aggregates = {}
+    for index, condition in enumerate(in_period):
+        aggregates[f'total_{index}'] = Sum(amount, filter=condition)
+        aggregates[f'count_{index}'] = count_aggregate(count, filter=condition)
+    grouped = rows.order_by().values('category', 'transaction_type').annotate(**aggregates)
+
+    per_period = [[] for _ in periods]
+    for row in grouped:
+        for index in range(len(periods)):
+            if row[f'count_{index}']:
+                per_period[index].append({
+                    'category': row['category'],
+                    'transaction_type': row['transaction_type'],
+                    'total': row[f'total_{index}'] or 0,
+                    'count': row[f'count_{index}'],
+                })
+    return [summarize_rollups(period_rows) for period_rows in per_period]
+
+
+def calculate_change(current, previous):
+    if previous == 0:
+        return 0 if current == 0 else 100
+    return ((current - previous) / previous) * 100
+
+
+def period_stats(summary):
+    return {
+        'income': float(summary['income']),
+        'expenses': float(summary['expenses']),
+        'net': float(summary['income'] - summary['expenses']),
+        'transaction_count': summary['transaction_count']
+    }
+
+
+def build_comparison_report(user, period_type, periods):
+    """Compare ``periods`` (oldest first); the last two are reported as the
+    current and previous period"""
+    summaries = period_summaries(user, periods)
+    stats = [period_stats(summary) for summary in summaries]
+
+    current, previous = summaries[-1], summaries[-2] if len(summaries) > 1 else summaries[-1]
+    current_stats, prev_stats = stats[-1], stats[-2] if len(stats) > 1 else stats[-1]
+
+    category_comparison = {}
+    for category, (amount, _count) in current['categories'].items():
+        current_amount = float(amount)
+        prev_amount = float(previous['categories'].get(category, (0, 0))[0])
+        category_comparison[category] = {
+            'current': current_amount,
+            'previous': prev_amount,
+            'change': calculate_change(current_amount, prev_amount)
+        }
+
+    # Every expense category across all periods, with its amount in each
+    categories = {}
+    for summary in summaries:
+        categories.update(dict.fromkeys(summary['categories']))
+    category_periods = {
+        category: [float(summary['categories'].get(category, (0, 0))[0]) for summary in summaries]
+        for category in categories
+    }
+
+    return {
+        'period_type': period_type,
+        'current_period': periods[-1][0],
+        'previous_period': periods[-2][0] if len(periods) > 1 else None,
+        'current_stats': current_stats,
+        'previous_stats': prev_stats,
+        'changes': {
+            'income_change': calculate_change(current_stats['income'], prev_stats['income']),
+            'expenses_change': calculate_change(current_stats['expenses'], prev_stats['expenses']),
+            'net_change': calculate_change(current_stats['net'], prev_stats['net']),
+            'transaction_count_change': calculate_change(current_stats['transaction_count'], prev_stats['transaction_count'])
+        },
+        'category_comparison': category_comparison,
+        'periods': [
+            {'label': label, 'start_date': start.isoformat(), 'end_date': end.isoformat(), **period}
+            for (label, start, end), period in zip(periods, stats)
+        ],
+        'category_periods': category_periods
+    }
@@ -0,0 +1,92 @@
+"""Monthly envelope rollover.
+
+The rollover closes a month: what is left of each envelope's balance for it
+(the month's budget plus its carry-over, less the month's spend, read with
+``Envelope.objects.for_period``) is written into the next month's
+EnvelopeBudget ``rolled_over``. Budget checks and the envelope endpoints
+draw on the month's budget plus that carry-over, so the rollover is what
+moves unspent money into the next month. It costs one locked read of the
+envelopes, one read of next month's budgets and one upsert, however many
+envelopes and users are involved.
+
+The upsert stands in for a ``bulk_update`` of the envelopes: next month's
+EnvelopeBudget rows may not exist yet, and ``budgeted_amount`` keeps the
+budget the user set rather than absorbing the carry-over.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import invalidate_user
+from .models import Envelope, EnvelopeBudget
+
+
+def carried_over(remaining, carry_over_underspent=True, reset_overspent=True):
+    """Return how much of a month's remaining budget carries into the next month"""
+    if remaining > 0 and carry_over_underspent:
+        return remaining
+    if remaining < 0 and not reset_overspent:
+        return remaining
+    return 0
+
+
+def rollover_envelopes(envelopes, carry_over_underspent=True, reset_overspent=True, dry_run=False, period=None):
+    """Roll ``envelopes`` over into the month after ``period`` and return one
+    dict per envelope with its closing figures and the amount carried over.
+
+    ``period`` is the (year, month) being closed, the current month by
+    default. With ``dry_run`` nothing is saved.
+    """
+    if period is None:
+        today = timezone.localdate()
+        period = (today.year, today.month)
+    year, month = period
+    next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+    changes = []
+    next_budgets = []
+    with transaction.atomic():
+        # (user, category) order, the order every other envelope lock takes
+        locked = envelopes.select_related('category').select_for_update(of=('self',)).order_by(
+            'user_id', 'category__name'
+        )
+        envelopes = list(locked.for_period(year, month))
+        # Next month's budget, which a row set ahead of the rollover may already have
+        next_budgeted = dict(
+            Envelope.objects.filter(pk__in=[envelope.pk for envelope in envelopes])
+            .for_period(next_year, next_month).values_list('pk', 'period_budgeted')
+        )
+        for envelope in envelopes:
+            rolled_over = carried_over(envelope.period_remaining, carry_over_underspent, reset_overspent)
+            next_budgets.append(EnvelopeBudget(
+                envelope=envelope,
+                year=next_year,
+                month=next_month,
+                budgeted=next_budgeted[envelope.pk],
+                rolled_over=rolled_over,
+            ))
+            changes.append({
+                'id': envelope.id,
+                'category_name': envelope.category.name,
+                # What the envelope had to spend in the closing month and has in the next one
+                'old_budget': envelope.period_budgeted + envelope.period_rolled_over,
+                'new_budget': next_budgeted[envelope.pk] + rolled_over,
+                'budgeted': envelope.period_budgeted,
+                'spent': envelope.period_spent,
+                'remaining': envelope.period_remaining,
+                'rolled_over': rolled_over
+            })
+
+        if dry_run:
+            return changes
+        # A budget already set for next month keeps its amount; only the
+        # carried-over part is replaced
+        EnvelopeBudget.objects.bulk_create(
+            next_budgets,
+            update_conflicts=True,
+            unique_fields=['envelope', 'year', 'month'],
+            update_fields=['rolled_over'],
+        )
+        # Bulk writes skip the post_save signal that normally does this
+        for user_id in {budget.envelope.user_id for budget in next_budgets}:
+            invalidate_user(user_id)
+    return changes
@@ -0,0 +1,90 @@
+"""Date rules for recurring transactions.
+
+Occurrence ``k`` of a schedule is computed directly from the start date:
+day-based frequencies add ``k`` whole periods, and month-based ones add
+``k`` periods of months and then clamp the start date's day to the length of
+the target month. Every occurrence is anchored to the start date, so a
+template starting on the 31st falls on the last day of short months and is
+back on the 31st afterwards, and a yearly template starting on February 29th
+falls on February 28th outside leap years.
+
+A stored ``next_occurrence`` off this schedule (an edited date, or one that
+drifted under the old step-by-step calculation) stands in for its nearest
+scheduled occurrence, so moving a date never posts a period twice or skips
+one.
+"""
+import calendar
+from datetime import date, timedelta
+
+# frequency -> (unit, periods per step)
+FREQUENCY_STEPS = {
+    'daily': ('days', 1),
+    'weekly': ('days', 7),
+    'biweekly': ('days', 14),
+    'monthly': ('months', 1),
+    'bimonthly': ('months', 2),
+    'quarterly': ('months', 3),
+    'yearly': ('months', 12),
+}
+
+
+def frequency_step(frequency):
+    try:
+        return FREQUENCY_STEPS[frequency]
+    except KeyError:
+        raise ValueError(f'Unknown frequency: {frequency}')
+
+
+def add_months(start, months):
+    """``start`` moved by ``months``, with the day clamped to the month length"""
+    month_index = start.year * 12 + start.month - 1 + months
+    year, month = divmod(month_index, 12)
+    month += 1
+    return date(year, month, min(start.day, calendar.monthrange(year, month)[1]))
+
+
+def occurrence(start, frequency, k):
+    """The ``k``-th occurrence (0-based) of a schedule starting on ``start``"""
+    unit, step = frequency_step(frequency)
+    if unit == 'days':
+        return start + timedelta(days=k * step)
+    return add_months(start, k * step)
+
+
+def occurrence_index(start, frequency, on_or_after):
+    """Index of the first occurrence on or after ``on_or_after``"""
+    if on_or_after <= start:
+        return 0
+    unit, step = frequency_step(frequency)
+    if unit == 'days':
+        return -(-(on_or_after - start).days // step)
+
+    # Months elapsed gives the index to within one; clamping can only make an
+    # occurrence earlier, so at most one step forward is needed
+    months = (on_or_after.year - start.year) * 12 + on_or_after.month - start.month
+    k = months // step
+    if occurrence(start, frequency, k) < on_or_after:
+        k += 1
+    return k
+
+
+def nearest_index(start, frequency, day):
+    """Index of the occurrence closest to ``day``, the earlier one on a tie"""
+    k = occurrence_index(start, frequency, day)
+    if k and day - occurrence(start, frequency, k - 1) <= occurrence(start, frequency, k) - day:
+        return k - 1
+    return k
+
+
+def occurrences_between(start, frequency, window_start, window_end, limit=None):
+    """Every occurrence in ``[window_start, window_end]``, at most ``limit`` of them"""
+    first = occurrence_index(start, frequency, window_start)
+    dates = []
+    k = first
+    while limit is None or len(dates) < limit:
+        day = occurrence(start, frequency, k)
+        if day > window_end:
+            break
+        dates.append(day)
+        k += 1
+    return dates
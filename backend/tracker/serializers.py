@@ -1,6 +1,9 @@
 from rest_framework import serializers
+from rest_framework.exceptions import NotFound
 from django.contrib.auth.models import User
+from .budgets import lock_envelopes
 from .models import Transaction, Category, Envelope, SavingsGoal, RecurringTransaction
+from django.db import transaction
 from django.utils import timezone
 from django.db.models import Sum
 
@@ -40,10 +43,12 @@ class EnvelopeSerializer(serializers.ModelSerializer):
     percentage_used = serializers.FloatField(read_only=True)
     is_over_budget = serializers.BooleanField(read_only=True)
     is_near_limit = serializers.BooleanField(read_only=True)
+    rolled_over_amount = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Envelope
-        fields = '__all__'
+        # Lifetime counter; spent_amount is the current month's spend
+        exclude = ('spent_total',)
         read_only_fields = ('user',)
 
     def validate_budgeted_amount(self, value):
@@ -67,8 +72,19 @@ class EnvelopeSerializer(serializers.ModelSerializer):
         return data
 
 
+RECURRING_DATE_TAKEN = 'The recurring transaction already has a transaction on this date.'
+
+
+def recurring_date_taken(recurring_id, date, exclude=()):
+    """Whether another transaction of the template is already on ``date``"""
+    return Transaction.objects.filter(recurring_id=recurring_id, date=date).exclude(pk__in=exclude).exists()
+
+
 class TransactionSerializer(serializers.ModelSerializer):
     user = serializers.ReadOnlyField(source='user.username')
+    # Declared so the (recurring, date) constraint doesn't make DRF give it
+    # the model's timezone.now default; the model default still applies
+    date = serializers.DateField(required=False)
     envelope_remaining = serializers.SerializerMethodField()
 
     class Meta:
@@ -79,6 +95,11 @@ class TransactionSerializer(serializers.ModelSerializer):
     def get_envelope_remaining(self, obj):
         """Get remaining amount in envelope for this transaction's category"""
         if obj.transaction_type == 'expense':
+            # List views preload every envelope's remaining amount once per request
+            envelope_remaining = self.context.get('envelope_remaining')
+            if envelope_remaining is not None:
+                remaining = envelope_remaining.get(obj.category)
+                return float(remaining) if remaining is not None else None
             try:
                 envelope = Envelope.objects.get(user=obj.user, category__name=obj.category)
                 return float(envelope.remaining_amount)
@@ -92,40 +113,72 @@ class TransactionSerializer(serializers.ModelSerializer):
         return value
 
     def validate(self, data):
-        """Validate envelope budget for expense transactions"""
-        user = self.context['request'].user
-        category_name = data.get('category')
-        transaction_type = data.get('transaction_type')
-        amount = data.get('amount')
+        """Keep a generated transaction off the dates its template already posted.
+
+        The batch endpoint checks the whole batch at once instead, since its
+        other operations can free or take the same dates.
+        """
+        recurring_id = getattr(self.instance, 'recurring_id', None)
+        if recurring_id and 'date' in data and not self.context.get('batch'):
+            if recurring_date_taken(recurring_id, data['date'], exclude=[self.instance.pk]):
+                raise serializers.ValidationError({'date': RECURRING_DATE_TAKEN})
+        return data
 
-        if transaction_type == 'expense' and category_name:
-            try:
-                category = Category.objects.get(user=user, name=category_name)
-                envelope = Envelope.objects.get(user=user, category=category)
-                
-                # Check if this is an update operation
-                if self.instance:
-                    # For updates, we need to consider the original amount
-                    original_amount = self.instance.amount
-                    amount_difference = amount - original_amount
-                    if envelope.remaining_amount - amount_difference < 0:
-                        raise serializers.ValidationError({
-                            'amount': f'Not enough money left in {category_name} envelope. Available: VT {envelope.remaining_amount}'
-                        })
-                else:
-                    # For new transactions
-                    if envelope.remaining_amount - amount < 0:
-                        raise serializers.ValidationError({
-                            'amount': f'Not enough money left in {category_name} envelope. Available: VT {envelope.remaining_amount}'
-                        })
-            except Category.DoesNotExist:
-                # No category means no envelope validation needed
-                pass
-            except Envelope.DoesNotExist:
-                # No envelope for this category, no validation needed
-                pass
+    def create(self, validated_data):
+        with transaction.atomic():
+            self.check_envelope_budget(validated_data)
+            return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        with transaction.atomic():
+            # The instance from get_object() was read before any lock; re-read
+            # it under the row lock (envelopes first, as batches do) so the
+            # budget check and the save start from the stored values
+            lock_envelopes(self.context['request'].user)
+            instance = Transaction.objects.select_for_update().filter(pk=instance.pk).first()
+            if instance is None:
+                raise NotFound()
+            self.check_envelope_budget(validated_data, instance)
+            return super().update(instance, validated_data)
+
+    def check_envelope_budget(self, validated_data, instance=None):
+        """Lock the target envelope and make sure this write does not overdraw
+        its balance for the month of the transaction's date.
+
+        Must run inside the atomic block that performs the write so the lock
+        is held until the month's expense rollup has been updated.
+        """
+        values = {
+            field: validated_data.get(field, getattr(instance, field, None))
+            for field in ('category', 'transaction_type', 'amount', 'date')
+        }
+        if values['transaction_type'] != 'expense' or not values['category']:
+            return
 
-        return data
+        user = self.context['request'].user
+        envelopes = Envelope.objects.filter(user=user, category__name=values['category'])
+        envelope_id = envelopes.select_for_update().values_list('pk', flat=True).first()
+        if envelope_id is None:
+            # No envelope for this category, no validation needed
+            return
+
+        # Read after the lock is granted, so the month's spend includes every
+        # write that committed while this one waited
+        day = values['date'] or timezone.localdate()
+        remaining = Envelope.objects.filter(pk=envelope_id).for_period(day.year, day.month).values_list(
+            'period_remaining', flat=True
+        ).get()
+
+        amount = values['amount']
+        if (instance and instance.transaction_type == 'expense' and instance.category == values['category']
+                and (instance.date.year, instance.date.month) == (day.year, day.month)):
+            # For updates within the same envelope and month, only the difference is newly spent
+            amount -= instance.amount
+
+        if remaining - amount < 0:
+            raise serializers.ValidationError({
+                'amount': f'Not enough money left in {values["category"]} envelope. Available: VT {remaining}'
+            })
 
 
 class BalanceSerializer(serializers.Serializer):
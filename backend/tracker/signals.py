@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import invalidate_user
+from .models import Category, Envelope, RecurringTransaction, SavingsGoal
+
+# Transaction writes invalidate through tracker.ledger, which also sees bulk writes
+
+
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Envelope)
+@receiver([post_save, post_delete], sender=SavingsGoal)
+@receiver([post_save, post_delete], sender=RecurringTransaction)
+def invalidate_user_cache(sender, instance, **kwargs):
+    invalidate_user(instance.user_id)
+
+
+@receiver(post_save, sender=Category)
+def refresh_envelope_spending(sender, instance, created, **kwargs):
+    # Envelope spend is matched by category name, so a rename changes it
+    if not created:
+        Envelope.objects.filter(category=instance).refresh_spent_totals()
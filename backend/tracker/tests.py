@@ -1,3 +1,1574 @@
-from django.test import TestCase
+import codecs
+import csv
+import gzip
+import json
+import random
+import threading
+import time
+from base64 import b64decode, b64encode
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import F
+from django.http import QueryDict
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import cache as response_cache
+from .async_views import QUERY_WORKERS, close_query_connections, gather_queries
+from .exports import buffered
+from .filters import TRANSACTION_ORDERINGS
+from .imports import read_ofx
+from .ledger import ROLLUP_KEY, rebuild_monthly_rollups
+from .models import (
+    BalanceCheckpoint, Category, Envelope, EnvelopeBudget, MonthlyRollup, RecurringTransaction, SavingsGoal,
+    Transaction
+)
+from .recurring import process_due_batch
+from .reports import MAX_COMPARISON_PERIODS, comparison_periods, requested_periods
+from .schedule import nearest_index, occurrence, occurrence_index, occurrences_between
+from .serializers import TransactionSerializer
+
+
+class RecurringCatchUpTests(TestCase):
+    def setUp(self):
+        self.today = date.today()
+        self.user = User.objects.create_user('alice', password='password')
+        self.other = User.objects.create_user('bob', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def make_template(self, user, start):
+        return RecurringTransaction.objects.create(
+            user=user, name='Rent', amount=100, category='Housing', transaction_type='expense',
+            frequency='daily', start_date=start, next_occurrence=start,
+        )
+
+    def move_posted_onto_next_occurrence(self):
+        """Post one occurrence and edit its date onto the template's next one"""
+        recurring = self.make_template(self.user, self.today - timedelta(days=10))
+        posted = recurring.create_transaction()
+        response = self.client.patch(
+            f'/api/transactions/{posted.pk}/', {'date': recurring.next_occurrence.isoformat()}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return recurring
+
+    def assertPostedOnce(self, recurring, through):
+        recurring.refresh_from_db()
+        dates = list(recurring.transactions.values_list('date', flat=True))
+        self.assertEqual(len(dates), len(set(dates)))
+        self.assertEqual(recurring.count_created, len(dates))
+        self.assertGreater(recurring.next_occurrence, through)
+
+    def test_process_overdue_skips_dates_already_posted(self):
+        recurring = self.move_posted_onto_next_occurrence()
+
+        response = self.client.post('/api/recurring-transactions/process_overdue/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['transactions']), 8)
+        self.assertPostedOnce(recurring, self.today - timedelta(days=1))
+
+    def test_run_recurring_is_not_blocked_by_one_template(self):
+        recurring = self.move_posted_onto_next_occurrence()
+        other = self.make_template(self.other, self.today - timedelta(days=5))
+
+        call_command('run_recurring', stdout=StringIO())
+
+        self.assertPostedOnce(recurring, self.today)
+        self.assertEqual(Transaction.objects.filter(user=self.other).count(), 6)
+        self.assertPostedOnce(other, self.today)
+
+
+class LedgerLockOrderTests(TestCase):
+    """A scheduler batch spanning many users and categories updates the
+    ledger with a fixed number of queries, locking rows in one order"""
+    through = date(2026, 3, 20)
+
+    def add_users(self, count):
+        for number in range(User.objects.count(), count):
+            user = User.objects.create_user(f'user{number}', password='password')
+            # Created in reverse, so primary key order differs from category order
+            for name in ('Rent', 'Food'):
+                category = Category.objects.create(user=user, name=name)
+                Envelope.objects.create(user=user, category=category, budgeted_amount=10 ** 9)
+            # A checkpoint in February, so the batch both shifts and creates checkpoints
+            Transaction.objects.create(
+                user=user, description='Opening', amount=1000, category='Salary',
+                transaction_type='income', date=date(2026, 2, 1),
+            )
+            for name, transaction_type, start in (
+                    ('Food', 'expense', date(2026, 1, 25)), ('Rent', 'expense', date(2026, 3, 1)),
+                    ('Salary', 'income', date(2025, 12, 31))):
+                RecurringTransaction.objects.create(
+                    user=user, name=name, amount=10, category=name, transaction_type=transaction_type,
+                    frequency='monthly', start_date=start, next_occurrence=start,
+                )
+
+    def run_batch(self):
+        RecurringTransaction.objects.update(next_occurrence=F('start_date'), count_created=0)
+        Transaction.objects.exclude(description='Opening').delete()
+        with CaptureQueriesContext(connection) as captured:
+            process_due_batch(self.through)
+        return [query['sql'] for query in captured.captured_queries]
+
+    def assertMatchesRebuild(self):
+        def state():
+            # A month whose changes net to zero needs no checkpoint, so compare
+            # every month's closing balance rather than the rows
+            checkpoints = sorted(BalanceCheckpoint.objects.values_list('user_id', 'month_start', 'balance'))
+            closing = {
+                (user_id, month): ([0] + [
+                    balance for owner, month_start, balance in checkpoints if owner == user_id and month_start <= month
+                ])[-1]
+                for user_id in User.objects.values_list('pk', flat=True)
+                for month in (date(2025, 12, 1), date(2026, 1, 1), date(2026, 2, 1), date(2026, 3, 1))
+            }
+            return (
+                set(MonthlyRollup.objects.values_list(*ROLLUP_KEY, 'total', 'count')),
+                dict(Envelope.objects.values_list('pk', 'spent_total')),
+                closing,
+            )
+
+        maintained = state()
+        rebuild_monthly_rollups()
+        self.assertEqual(maintained, state())
+
+    def test_query_count_does_not_grow_with_users_or_categories(self):
+        self.add_users(2)
+        few = self.run_batch()
+        self.assertMatchesRebuild()
+        self.add_users(8)
+        many = self.run_batch()
+        self.assertMatchesRebuild()
+        # Three salaries, two food and one rent payment each, across four months
+        self.assertEqual(Transaction.objects.exclude(description='Opening').count(), 8 * 6)
+        self.assertEqual(len(many), len(few), '\n'.join(many))
+
+    def test_envelopes_then_rollups_then_users_are_locked_in_order(self):
+        self.add_users(3)
+        queries = self.run_batch()
+
+        def position(prefix):
+            [index] = [index for index, sql in enumerate(queries) if sql.startswith(prefix)]
+            return index
+
+        envelopes = position('SELECT "tracker_envelope"."id", "tracker_envelope"."user_id", "tracker_category"."name"')
+        rollups = position('SELECT "tracker_monthlyrollup"."id"')
+        users = position('SELECT "auth_user"."id" FROM "auth_user"')
+        self.assertLess(envelopes, rollups)
+        self.assertLess(rollups, users)
+        self.assertIn('ORDER BY "tracker_envelope"."user_id" ASC, "tracker_category"."name" ASC', queries[envelopes])
+        self.assertIn('ORDER BY "tracker_monthlyrollup"."id" ASC', queries[rollups])
+        self.assertIn('ORDER BY "auth_user"."id" ASC', queries[users])
+
+
+class RecurringDateConflictTests(TestCase):
+    """A generated transaction can't be moved onto a date its template already posted"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        start = date.today() - timedelta(days=3)
+        recurring = RecurringTransaction.objects.create(
+            user=self.user, name='Rent', amount=100, category='Housing', transaction_type='income',
+            frequency='daily', start_date=start, next_occurrence=start,
+        )
+        self.first = recurring.create_transaction()
+        self.second = recurring.create_transaction()
+
+    def batch(self, operations):
+        return self.client.post('/api/transactions/batch/', {'operations': operations}, format='json')
+
+    def test_update_onto_a_sibling_date_is_a_field_error(self):
+        response = self.client.patch(
+            f'/api/transactions/{self.second.pk}/', {'date': self.first.date.isoformat()}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('date', response.data)
+
+        response = self.client.patch(
+            f'/api/transactions/{self.second.pk}/', {'date': self.second.date.isoformat()}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_batch_move_onto_a_sibling_date_is_a_field_error(self):
+        response = self.batch([{'op': 'update', 'id': self.second.pk, 'data': {'date': self.first.date.isoformat()}}])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('date', response.data['results'][0]['errors'])
+
+        # Two rows of the batch can't both take a free date either
+        free = (self.second.date + timedelta(days=5)).isoformat()
+        response = self.batch([
+            {'op': 'update', 'id': self.first.pk, 'data': {'date': free}},
+            {'op': 'update', 'id': self.second.pk, 'data': {'date': free}},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['results'][0]['status'], 'not_applied')
+        self.assertIn('date', response.data['results'][1]['errors'])
+
+    def test_batch_can_take_a_date_it_frees(self):
+        first_date, second_date = self.first.date, self.second.date
+        response = self.batch([
+            {'op': 'delete', 'id': self.first.pk},
+            {'op': 'update', 'id': self.second.pk, 'data': {'date': first_date.isoformat()}},
+        ])
+        self.assertEqual(response.status_code, 200)
+
+        response = self.batch([
+            {'op': 'create', 'data': {
+                'description': 'Other', 'amount': 5, 'category': 'Housing',
+                'transaction_type': 'income', 'date': second_date.isoformat(),
+            }},
+            {'op': 'update', 'id': self.second.pk, 'data': {'date': second_date.isoformat()}},
+        ])
+        self.assertEqual(response.status_code, 200)
+
+
+class TransactionImportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, amounts):
+        lines = ['date,description,category,amount,type']
+        lines += [f'2026-01-{day:02d},Row {day},Food,"{amount}",income' for day, amount in enumerate(amounts, 1)]
+        csv_file = SimpleUploadedFile('statement.csv', '\n'.join(lines).encode(), content_type='text/csv')
+        return self.client.post('/api/transactions/import/', {'file': csv_file}, format='multipart')
+
+    def test_invalid_amounts_are_row_errors(self):
+        response = self.upload(['12', 'nan', 'inf', '-inf', '99999999999', '12.7', '12,50', '', 'abc'])
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual([error['row'] for error in response.data['errors']], list(range(3, 11)))
+        self.assertTrue(all('amount' in error['errors'] for error in response.data['errors']))
+
+    def test_whole_amounts_with_separators_are_accepted(self):
+        response = self.upload(['1,250', '12.00', '2147483647'])
+
+        self.assertEqual(response.data['errors'], [])
+        self.assertEqual(
+            sorted(Transaction.objects.filter(user=self.user).values_list('amount', flat=True)),
+            [12, 1250, 2147483647]
+        )
+
+
+class OfxImportTests(TestCase):
+    sgml_header = 'OFXHEADER:100\nDATA:OFXSGML\nVERSION:102\nSECURITY:NONE\nENCODING:{encoding}\nCHARSET:{charset}\n\n'
+    xml_header = '<?xml version="1.0" encoding="{encoding}"?>\n<?OFX OFXHEADER="200" VERSION="220"?>\n'
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def statement(self, header, names, xml=False):
+        rows = []
+        for day, name in enumerate(names, 1):
+            amount = -12 * day if day % 2 else 100
+            if xml:
+                rows.append(
+                    f'<STMTTRN><TRNTYPE>DEBIT</TRNTYPE><DTPOSTED>202601{day:02d}120000</DTPOSTED>'
+                    f'<TRNAMT>{amount}</TRNAMT><NAME>{name}</NAME></STMTTRN>'
+                )
+            else:
+                rows.append(
+                    f'<STMTTRN>\n<TRNTYPE>DEBIT\n<DTPOSTED>202601{day:02d}\n<TRNAMT>{amount}\n<NAME>{name}\n</STMTTRN>'
+                )
+        return header + '<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>\n' + '\n'.join(rows) + \
+            '\n</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n'
+
+    def read(self, content, chunk_size=None):
+        # Read in chunks like an upload spooled to disk, which arrives 64 KB at a time
+        upload = File(BytesIO(content))
+        if chunk_size:
+            upload.DEFAULT_CHUNK_SIZE = chunk_size
+        return [values['description'] for _, values in read_ofx(upload, 'Bank')]
+
+    def test_characters_split_across_chunks_decode_intact(self):
+        names = ['Café Olé', 'Crème brûlée', 'Zoë € 5']
+        content = self.statement(self.sgml_header.format(encoding='UTF-8', charset='NONE'), names).encode()
+        for chunk_size in range(1, 40):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(self.read(content, chunk_size), names)
+
+    def test_declared_character_sets(self):
+        names = ['Café', 'Crème']
+        cases = [
+            (self.sgml_header.format(encoding='USASCII', charset='1252'), False, 'cp1252'),
+            (self.sgml_header.format(encoding='USASCII', charset='ISO-8859-1'), False, 'latin-1'),
+            (self.xml_header.format(encoding='ISO-8859-1'), True, 'latin-1'),
+            (self.xml_header.format(encoding='windows-1252'), True, 'cp1252'),
+        ]
+        for header, xml, codec in cases:
+            with self.subTest(header=header):
+                self.assertEqual(self.read(self.statement(header, names, xml).encode(codec), 3), names)
+
+    def test_undeclared_files_and_byte_order_marks_read_as_unicode(self):
+        names = ['Café']
+        self.assertEqual(self.read(self.statement('', names, xml=True).encode()), names)
+        self.assertEqual(self.read(codecs.BOM_UTF8 + self.statement('', names, xml=True).encode()), names)
+        self.assertEqual(self.read(self.statement('', names, xml=True).encode('utf-16')), names)
+
+    def test_upload_creates_expenses_and_income(self):
+        content = self.statement(self.sgml_header.format(encoding='USASCII', charset='1252'), ['Café', 'Salary'])
+        upload = SimpleUploadedFile('statement.ofx', content.encode('cp1252'))
+        response = self.client.post(
+            '/api/transactions/import/', {'file': upload, 'default_category': 'Bank'}, format='multipart'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            list(Transaction.objects.filter(user=self.user).order_by('date').values_list(
+                'description', 'amount', 'transaction_type', 'category', 'date'
+            )),
+            [('Café', 12, 'expense', 'Bank', date(2026, 1, 1)), ('Salary', 100, 'income', 'Bank', date(2026, 1, 2))]
+        )
+
+    def test_unknown_character_set_is_rejected(self):
+        content = self.statement(self.sgml_header.format(encoding='USASCII', charset='KLINGON'), ['Café'])
+        upload = SimpleUploadedFile('statement.ofx', content.encode())
+        response = self.client.post('/api/transactions/import/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('KLINGON', response.data['error'])
+        self.assertFalse(Transaction.objects.exists())
+
+
+class RolloverCommandTests(TestCase):
+    def setUp(self):
+        self.users = [User.objects.create_user(name, password='password') for name in ('alice', 'bob', 'carol')]
+        for user in self.users:
+            self.add_envelopes(user, 2)
+
+    def add_envelopes(self, user, count):
+        for number in range(Envelope.objects.filter(user=user).count(), count):
+            category = Category.objects.create(user=user, name=f'Category {number}')
+            envelope = Envelope.objects.create(user=user, category=category, budgeted_amount=1000)
+            # The budget applied from January; spend 100 in January and 300 in February
+            EnvelopeBudget.objects.filter(envelope=envelope).update(year=2026, month=1)
+            for day, amount in ((date(2026, 1, 5), 100), (date(2026, 2, 5), 300)):
+                Transaction.objects.create(
+                    user=user, description='Spend', amount=amount, category=category.name,
+                    transaction_type='expense', date=day,
+                )
+
+    def rollover(self, *args):
+        out = StringIO()
+        call_command('rollover_envelopes', *args, stdout=out)
+        return out.getvalue()
+
+    def carried(self, year, month):
+        return sorted(EnvelopeBudget.objects.filter(year=year, month=month).values_list('rolled_over', flat=True))
+
+    def test_period_closes_that_month(self):
+        output = self.rollover('--period', '2026-01')
+        self.assertIn('Rolled over 6 envelopes for 3 users', output)
+        self.assertEqual(self.carried(2026, 2), [900] * 6)
+
+        # February had its budget plus the carry-over, less February's spend
+        self.rollover('--period', '2026-02')
+        self.assertEqual(self.carried(2026, 3), [1600] * 6)
+        # Rolling over again replaces the carry-over rather than adding to it
+        self.rollover('--period', '2026-02')
+        self.assertEqual(self.carried(2026, 3), [1600] * 6)
+        self.assertEqual(set(EnvelopeBudget.objects.filter(year=2026, month=3).values_list('budgeted', flat=True)), {1000})
+
+    def test_dry_run_saves_nothing(self):
+        output = self.rollover('--period', '2026-01', '--dry-run', '-v', '2')
+        self.assertIn('Would roll over 6 envelopes for 3 users', output)
+        self.assertEqual(output.count('900 VT remaining, 900 VT carried over'), 6)
+        self.assertEqual(self.carried(2026, 2), [])
+
+    def test_users_and_flags(self):
+        self.rollover('--period', '2026-01', '--user', 'bob', '--no-carry-over')
+        self.assertEqual(self.carried(2026, 2), [0, 0])
+        self.assertEqual(set(EnvelopeBudget.objects.filter(year=2026, month=2).values_list(
+            'envelope__user__username', flat=True
+        )), {'bob'})
+
+        Transaction.objects.filter(date__month=1).update(amount=1500)
+        rebuild_monthly_rollups()
+        self.rollover('--period', '2026-01', '--no-reset-overspent')
+        self.assertEqual(self.carried(2026, 2), [-500] * 6)
+
+    def test_invalid_period(self):
+        for period in ('2026', '2026-13', 'January'):
+            with self.subTest(period), self.assertRaises(CommandError):
+                self.rollover('--period', period)
+
+    def test_each_batch_costs_the_same_queries_however_many_envelopes(self):
+        def queries(*args):
+            with CaptureQueriesContext(connection) as captured:
+                self.rollover('--period', '2026-01', *args)
+            return len(captured)
+
+        two_batches = queries('--batch-size', '2')
+        three_batches = queries('--batch-size', '1')
+        for user in self.users:
+            self.add_envelopes(user, 6)
+        self.assertEqual(queries('--batch-size', '2'), two_batches)
+        self.assertEqual(queries('--batch-size', '1'), three_batches)
+        self.assertEqual(self.carried(2026, 2), [900] * 18)
+        self.assertGreater(three_batches, two_batches)
+
+
+class ScheduleTests(SimpleTestCase):
+    def template(self, start, frequency='monthly', **fields):
+        fields.setdefault('next_occurrence', start)
+        return RecurringTransaction(start_date=start, frequency=frequency, **fields)
+
+    def test_month_end_clamps_and_recovers(self):
+        self.assertEqual(
+            occurrences_between(date(2026, 1, 31), 'monthly', date(2026, 1, 1), date(2026, 5, 31)),
+            [date(2026, 1, 31), date(2026, 2, 28), date(2026, 3, 31), date(2026, 4, 30), date(2026, 5, 31)]
+        )
+        self.assertEqual(occurrence(date(2025, 11, 30), 'quarterly', 1), date(2026, 2, 28))
+
+    def test_february_29(self):
+        self.assertEqual(
+            occurrences_between(date(2024, 2, 29), 'yearly', date(2024, 1, 1), date(2028, 12, 31)),
+            [date(2024, 2, 29), date(2025, 2, 28), date(2026, 2, 28), date(2027, 2, 28), date(2028, 2, 29)]
+        )
+
+    def test_occurrence_index_is_first_occurrence_on_or_after(self):
+        for start, frequency in [(date(2026, 1, 31), 'monthly'), (date(2024, 2, 29), 'yearly'),
+                                 (date(2026, 1, 1), 'biweekly'), (date(2025, 8, 31), 'bimonthly')]:
+            self.assertEqual(occurrence_index(start, frequency, start - timedelta(days=30)), 0)
+            for k in range(1, 30):
+                day = occurrence(start, frequency, k)
+                self.assertEqual(occurrence_index(start, frequency, day), k)
+                self.assertEqual(occurrence_index(start, frequency, day - timedelta(days=1)), k)
+                self.assertEqual(occurrence_index(start, frequency, day + timedelta(days=1)), k + 1)
+
+    def test_off_schedule_next_occurrence_replaces_its_nearest_occurrence(self):
+        drifted = self.template(date(2026, 1, 31), next_occurrence=date(2026, 3, 28))
+        self.assertEqual(
+            drifted.pending_occurrences(date(2026, 3, 1), date(2026, 5, 31)),
+            [date(2026, 3, 28), date(2026, 4, 30), date(2026, 5, 31)]
+        )
+        self.assertEqual(drifted.calculate_next_occurrence(), date(2026, 4, 30))
+
+        delayed = self.template(date(2026, 1, 1), next_occurrence=date(2026, 1, 5))
+        self.assertEqual(nearest_index(date(2026, 1, 1), 'monthly', date(2026, 1, 5)), 0)
+        self.assertEqual(delayed.calculate_next_occurrence(), date(2026, 2, 1))
+
+    def test_max_occurrences_counts_posted_and_skipped_dates(self):
+        recurring = self.template(date(2026, 1, 1), max_occurrences=5, count_created=2,
+                                  next_occurrence=date(2026, 3, 1))
+        # Three left: March plus April and May
+        self.assertEqual(
+            recurring.pending_occurrences(date(2026, 1, 1), date(2026, 12, 31)),
+            [date(2026, 3, 1), date(2026, 4, 1), date(2026, 5, 1)]
+        )
+        # Occurrences before the window still use up the allowance
+        self.assertEqual(
+            recurring.pending_occurrences(date(2026, 4, 15), date(2026, 12, 31)),
+            [date(2026, 5, 1)]
+        )
+        recurring.count_created = 5
+        self.assertEqual(recurring.pending_occurrences(date(2026, 1, 1), date(2026, 12, 31)), [])
+        self.assertIsNone(recurring.calculate_next_occurrence())
+
+    def test_end_date_stops_the_schedule(self):
+        recurring = self.template(date(2026, 1, 31), end_date=date(2026, 4, 29))
+        self.assertEqual(
+            recurring.pending_occurrences(date(2026, 1, 1), date(2026, 12, 31)),
+            [date(2026, 1, 31), date(2026, 2, 28), date(2026, 3, 31)]
+        )
+
+
+class EnvelopeRolloverTests(TestCase):
+    def setUp(self):
+        self.today = date.today()
+        self.user = User.objects.create_user('alice', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(user=self.user, name='Food')
+        self.envelope = Envelope.objects.create(user=self.user, category=category, budgeted_amount=1000)
+        self.spend(300)
+
+    def spend(self, amount, day=None):
+        return self.client.post('/api/transactions/', {
+            'description': 'Groceries', 'amount': amount, 'category': 'Food',
+            'transaction_type': 'expense', 'date': (day or self.today).isoformat(),
+        }, format='json')
+
+    def next_month(self):
+        return date(self.today.year + self.today.month // 12, self.today.month % 12 + 1, 1)
+
+    def test_rollover_keeps_the_envelope_budget_and_carries_the_remainder(self):
+        response = self.client.post('/api/monthly-rollover/', {}, format='json')
+        self.assertEqual(response.status_code, 200)
+        change = response.data['updated_envelopes'][0]
+        self.assertEqual(change['rolled_over'], 700)
+        self.assertEqual((change['old_budget'], change['new_budget'], change['remaining']), (1000, 1700, 700))
+
+        self.envelope.refresh_from_db()
+        self.assertEqual(self.envelope.budgeted_amount, 1000)
+        this_month = EnvelopeBudget.objects.get(
+            envelope=self.envelope, year=self.today.year, month=self.today.month
+        )
+        self.assertEqual(this_month.budgeted, 1000)
+
+        # The list shows this month, which the rollover into next month leaves alone
+        listed = self.client.get('/api/envelopes/').data
+        listed = listed.get('results', listed)[0]
+        self.assertEqual(
+            (listed['budgeted_amount'], listed['spent_amount'], listed['remaining_amount']), (1000, 300, 700)
+        )
+
+        next_month = self.next_month()
+        period = self.client.get(
+            '/api/envelopes/period/', {'year': next_month.year, 'month': next_month.month}
+        ).data['envelopes'][0]
+        self.assertEqual((period['budgeted'], period['rolled_over']), (1000, 700))
+
+        # The unspent amount is still there to spend
+        self.assertEqual(self.spend(500).status_code, 201)
+
+    def test_refresh_reloads_the_month_figures(self):
+        self.assertEqual((self.envelope.spent_amount, self.envelope.remaining_amount), (300, 700))
+        self.spend(200)
+        self.envelope.refresh_from_db()
+        self.assertEqual((self.envelope.spent_amount, self.envelope.remaining_amount), (500, 500))
+
+    def test_next_month_can_spend_its_budget_plus_the_carry_over(self):
+        self.client.post('/api/monthly-rollover/', {}, format='json')
+        next_month = self.next_month()
+
+        response = self.spend(1701, next_month)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Available: VT 1700', str(response.data))
+
+        self.assertEqual(self.spend(1700, next_month).status_code, 201)
+        self.assertEqual(self.spend(1, next_month).status_code, 400)
+        # This month's balance is separate from next month's
+        self.assertEqual(self.spend(700).status_code, 201)
+        self.assertEqual(self.spend(1).status_code, 400)
+
+    def test_without_a_rollover_a_month_gets_only_its_budget(self):
+        next_month = self.next_month()
+        self.assertEqual(self.spend(1001, next_month).status_code, 400)
+        self.assertEqual(self.spend(1000, next_month).status_code, 201)
+
+    def test_moving_an_expense_to_another_month_checks_that_month(self):
+        self.client.post('/api/monthly-rollover/', {}, format='json')
+        expense = Transaction.objects.get(user=self.user)
+        next_month = self.next_month()
+        self.assertEqual(self.spend(1500, next_month).status_code, 201)
+
+        # Next month has 200 left, so the 300 expense does not fit there
+        response = self.client.patch(
+            f'/api/transactions/{expense.pk}/', {'date': next_month.isoformat()}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.client.patch(f'/api/transactions/{expense.pk}/', {'amount': 1000}, format='json')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.patch(f'/api/transactions/{expense.pk}/', {'amount': 1001}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class TransactionSearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for day, description in enumerate(['Amazon', 'Amazon Prime order', 'Books from amazon.com'], 1):
+            Transaction.objects.create(
+                user=self.user, description=description, amount=10, category='Shopping',
+                transaction_type='income', date=date(2026, 1, 10 - day),
+            )
+
+    def test_search_ranks_exact_match_first(self):
+        response = self.client.get('/api/transactions/', {'search': 'amazon'})
+        self.assertEqual(response.data['results'][0]['description'], 'Amazon')
+        self.assertEqual(response.data['count'], 3)
+
+    def test_cursor_pagination_needs_an_ordering_for_search(self):
+        response = self.client.get('/api/transactions/', {'search': 'amazon', 'pagination': 'cursor'})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get(
+            '/api/transactions/', {'search': 'amazon', 'pagination': 'cursor', 'ordering': 'date'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row['description'] for row in response.data['results']],
+            ['Books from amazon.com', 'Amazon Prime order', 'Amazon']
+        )
+
+
+class TransactionFilterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add(self, day, amount, category='Salary'):
+        return Transaction.objects.create(
+            user=self.user, description='Row', amount=amount, category=category,
+            transaction_type='income', date=day,
+        )
+
+    def ids(self, params):
+        response = self.client.get('/api/transactions/', params)
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data['results']]
+
+    def test_invalid_parameters_are_rejected(self):
+        for name, value in (
+            ('start_date', '2026-02-30'), ('start_date', '2026-13-01'), ('end_date', 'yesterday'),
+            ('min_amount', 'ten'), ('max_amount', '1.5'), ('transaction_type', 'transfer'),
+            ('ordering', 'description'),
+        ):
+            with self.subTest(name=name, value=value):
+                response = self.client.get('/api/transactions/', {name: value})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(name, response.data)
+
+    def test_date_amount_and_category_filters(self):
+        self.add(date(2026, 1, 31), 100)
+        february = self.add(date(2026, 2, 1), 200, 'Gifts')
+        self.add(date(2026, 2, 28), 300, 'Bonus')
+        self.add(date(2026, 3, 1), 400)
+        self.assertEqual(self.ids({
+            'start_date': '2026-02-01', 'end_date': '2026-02-28', 'max_amount': '250',
+        }), [february.pk])
+        self.assertEqual(len(self.ids({'category': ['Gifts', 'Bonus'], 'min_amount': '200'})), 2)
+        # Empty values are ignored rather than rejected
+        self.assertEqual(len(self.ids({'start_date': '', 'min_amount': '', 'category': ''})), 4)
+
+    def test_every_ordering_breaks_ties_by_id(self):
+        rows = [self.add(date(2026, 1, 1), 50) for _ in range(25)]
+        Transaction.objects.filter(user=self.user).update(created_at=rows[0].created_at)
+        ascending = sorted(row.pk for row in rows)
+        for ordering in TRANSACTION_ORDERINGS:
+            with self.subTest(ordering=ordering):
+                ids = self.ids({'ordering': ordering}) + self.ids({'ordering': ordering, 'page': 2})
+                self.assertEqual(ids, ascending[::-1] if ordering.startswith('-') else ascending)
+
+
+class TransactionCursorTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        # Seven rows on one date, three of them created at the same instant,
+        # with repeated amounts, so pages end inside each tie
+        for number, (day, amount) in enumerate([(2, 10), (2, 20), (2, 10), (2, 30), (2, 10), (2, 20), (2, 10), (1, 20), (3, 10)]):
+            Transaction.objects.create(
+                user=self.user, description=f'Row {number}', amount=amount, category='Salary',
+                transaction_type='income', date=date(2026, 1, day),
+            )
+        tied = Transaction.objects.filter(date=date(2026, 1, 2)).order_by('id')
+        instant = tied[0].created_at
+        Transaction.objects.filter(pk__in=[row.pk for row in tied[:3]]).update(created_at=instant)
+
+    def expected(self, ordering):
+        return list(
+            Transaction.objects.filter(user=self.user).order_by(*TRANSACTION_ORDERINGS[ordering])
+            .values_list('id', flat=True)
+        )
+
+    def walk(self, ordering, page_size):
+        """Follow next links from the first page, then previous links back"""
+        forward, pages = [], []
+        page = self.client.get('/api/transactions/', {
+            'pagination': 'cursor', 'ordering': ordering, 'page_size': page_size
+        }).data
+        while True:
+            pages.append([row['id'] for row in page['results']])
+            forward += pages[-1]
+            if not page['next']:
+                break
+            page = self.client.get(page['next']).data
+        backward = [pages[-1]]
+        while page['previous']:
+            page = self.client.get(page['previous']).data
+            backward.append([row['id'] for row in page['results']])
+        return forward, pages, backward
+
+    def test_pages_split_inside_a_date_without_skipping_or_repeating(self):
+        for ordering in TRANSACTION_ORDERINGS:
+            for page_size in (1, 2, 3, 4):
+                with self.subTest(ordering=ordering, page_size=page_size):
+                    forward, pages, backward = self.walk(ordering, page_size)
+                    self.assertEqual(forward, self.expected(ordering))
+                    self.assertEqual(backward, pages[::-1])
+
+    def test_cursor_holds_every_ordering_column_and_no_offset(self):
+        page = self.client.get('/api/transactions/', {'pagination': 'cursor', 'page_size': 2}).data
+        cursor = parse_qs(urlparse(page['next']).query)['cursor'][0]
+        fields = parse_qs(b64decode(cursor.encode()).decode())
+        self.assertNotIn('o', fields)
+        last = Transaction.objects.get(pk=page['results'][-1]['id'])
+        self.assertEqual(
+            json.loads(fields['p'][0]), [last.date.isoformat(), last.created_at.isoformat(), last.id]
+        )
+
+    def test_malformed_cursor_is_not_found(self):
+        for position in ('not json', '["2026-01-02"]', '["not a date", "2026-01-02T00:00:00+00:00", 1]'):
+            cursor = b64encode(urlencode({'p': position}).encode()).decode()
+            response = self.client.get('/api/transactions/', {'pagination': 'cursor', 'cursor': cursor})
+            self.assertEqual(response.status_code, 404, position)
+
+
+class EnvelopeCounterTests(TestCase):
+    def setUp(self):
+        self.today = date.today()
+        self.user = User.objects.create_user('alice', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.envelopes = {
+            name: Envelope.objects.create(
+                user=self.user, category=Category.objects.create(user=self.user, name=name), budgeted_amount=1000
+            )
+            for name in ('Food', 'Rent')
+        }
+
+    def expense(self, amount, category='Food'):
+        return Transaction.objects.create(
+            user=self.user, description='Expense', amount=amount, category=category,
+            transaction_type='expense', date=self.today,
+        )
+
+    def assertCountersMatch(self):
+        for name, envelope in self.envelopes.items():
+            spent = sum(
+                Transaction.objects.filter(user=self.user, category=name, transaction_type='expense')
+                .values_list('amount', flat=True)
+            )
+            envelope.refresh_from_db()
+            self.assertEqual(envelope.spent_total, spent, name)
+            self.assertEqual(envelope.spent_amount, spent, name)
+
+    def stale_update(self, stale, data):
+        """Update through a serializer holding ``stale``, as a PATCH whose
+        get_object() ran before another request's write would"""
+        serializer = TransactionSerializer(
+            stale, data=data, partial=True, context={'request': SimpleNamespace(user=self.user)}
+        )
+        serializer.is_valid(raise_exception=True)
+        return serializer.save()
+
+    def test_update_delete_and_category_move_keep_the_counters(self):
+        first, second = self.expense(300), self.expense(200)
+        url = f'/api/transactions/{first.pk}/'
+        self.assertEqual(self.client.patch(url, {'amount': 500}, format='json').status_code, 200)
+        self.assertCountersMatch()
+        self.assertEqual(self.client.patch(url, {'category': 'Rent'}, format='json').status_code, 200)
+        self.assertCountersMatch()
+        self.assertEqual(self.client.patch(url, {'transaction_type': 'income'}, format='json').status_code, 200)
+        self.assertCountersMatch()
+        self.assertEqual(self.client.delete(f'/api/transactions/{second.pk}/').status_code, 204)
+        self.assertCountersMatch()
+
+    def test_category_move_is_checked_against_the_target_envelope(self):
+        moved = self.expense(600)
+        self.expense(500, 'Rent')
+        response = self.client.patch(f'/api/transactions/{moved.pk}/', {'category': 'Rent'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Available: VT 500', str(response.data))
+        self.assertCountersMatch()
+
+    def test_update_checks_the_stored_amount_not_a_stale_copy(self):
+        row = self.expense(900)
+        stale = Transaction.objects.get(pk=row.pk)
+        # Another request lowers the row and spends the freed amount
+        self.client.patch(f'/api/transactions/{row.pk}/', {'amount': 100}, format='json')
+        self.expense(800)
+
+        # Only 100 is left; against the stale 900 the raise to 1000 would look free
+        with self.assertRaises(serializers.ValidationError):
+            self.stale_update(stale, {'amount': 1000})
+        self.assertCountersMatch()
+
+    def test_update_does_not_write_back_stale_fields(self):
+        row = self.expense(300)
+        stale = Transaction.objects.get(pk=row.pk)
+        self.client.patch(f'/api/transactions/{row.pk}/', {'amount': 900, 'category': 'Rent'}, format='json')
+
+        updated = self.stale_update(stale, {'description': 'Groceries'})
+        self.assertEqual((updated.amount, updated.category, updated.description), (900, 'Rent', 'Groceries'))
+        row.refresh_from_db()
+        self.assertEqual((row.amount, row.category), (900, 'Rent'))
+        self.assertCountersMatch()
+
+
+@override_settings(CASHFLOW_CACHE_TIMEOUT=0)
+class AsyncEndpointTests(TransactionTestCase):
+    """The async views answer like their sync versions. Their queries run on
+    the worker pool's own connections, so the data has to be committed."""
+    endpoints = {
+        'balance': ('/api/balance/', '/api/async/balance/'),
+        'income': ('/api/income/', '/api/async/income/'),
+        'dashboard': ('/api/dashboard/', '/api/async/dashboard/'),
+        'monthly': ('/api/reports/monthly/', '/api/async/reports/monthly/'),
+        'yearly': ('/api/reports/yearly/', '/api/async/reports/yearly/'),
+        'comparison': ('/api/reports/comparison/', '/api/async/reports/comparison/'),
+    }
+
+    @classmethod
+    def tearDownClass(cls):
+        close_query_connections()
+        super().tearDownClass()
+
+    def setUp(self):
+        today = date.today()
+        self.user = User.objects.create_user('alice', password='password')
+        token = AccessToken.for_user(self.user)
+        self.headers = {'Authorization': f'Bearer {token}'}
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+        category = Category.objects.create(user=self.user, name='Food')
+        Envelope.objects.create(user=self.user, category=category, budgeted_amount=1000)
+        SavingsGoal.objects.create(user=self.user, name='Trip', target_amount=5000, target_date=today)
+        RecurringTransaction.objects.create(
+            user=self.user, name='Rent', description='Rent', amount=400, category='Rent', transaction_type='expense',
+            frequency='monthly', start_date=today, next_occurrence=today - timedelta(days=1),
+        )
+        for day, (amount, category, transaction_type) in enumerate(
+                [(5000, 'Salary', 'income'), (120, 'Food', 'expense'), (80, 'Food', 'expense')]):
+            Transaction.objects.create(
+                user=self.user, description='Row', amount=amount, category=category,
+                transaction_type=transaction_type, date=today.replace(day=1) + timedelta(days=day),
+            )
+
+    def test_async_endpoints_match_the_sync_ones(self):
+        for name, (sync_path, async_path) in self.endpoints.items():
+            with self.subTest(name):
+                expected = self.client.get(sync_path)
+                response = async_to_sync(AsyncClient().get)(async_path, headers=self.headers)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), expected.json())
+
+    def test_dashboard_sections(self):
+        response = async_to_sync(AsyncClient().get)(
+            '/api/async/dashboard/', {'sections': 'balance,overdue'}, **self.headers
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()), {'balance', 'overdue'})
+        self.assertEqual([row['description'] for row in response.json()['overdue']], ['Rent'])
+
+        response = async_to_sync(AsyncClient().get)(
+            '/api/async/dashboard/', {'sections': 'balance,nope'}, **self.headers
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('nope', response.json()['error'])
+
+    def test_invalid_parameters_and_missing_credentials(self):
+        response = async_to_sync(AsyncClient().get)(
+            '/api/async/reports/comparison/', {'type': 'decade'}, **self.headers
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(async_to_sync(AsyncClient().get)('/api/async/dashboard/').status_code, 401)
+
+    def test_queries_share_a_bounded_pool_of_connections(self):
+        def query():
+            time.sleep(0.01)
+            list(User.objects.all())
+            return threading.get_ident(), id(connection.connection)
+
+        first = async_to_sync(gather_queries)({number: query for number in range(QUERY_WORKERS * 3)})
+        second = async_to_sync(gather_queries)({number: query for number in range(QUERY_WORKERS * 3)})
+        threads = {thread for thread, _ in [*first.values(), *second.values()]}
+        self.assertLessEqual(len(threads), QUERY_WORKERS)
+        # Each worker thread connected once and reused the connection for every later query
+        by_thread = {}
+        for thread, connection_id in [*first.values(), *second.values()]:
+            by_thread.setdefault(thread, set()).add(connection_id)
+        self.assertTrue(all(len(ids) == 1 for ids in by_thread.values()), by_thread)
+
+
+class TransactionBatchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.first, self.second = [
+            Transaction.objects.create(
+                user=self.user, description=f'Row {number}', amount=10, category='Salary',
+                transaction_type='income', date=date(2026, 1, number),
+            )
+            for number in (1, 2)
+        ]
+
+    def test_updates_only_write_the_fields_each_operation_sent(self):
+        operations = [
+            {'op': 'update', 'id': self.first.pk, 'data': {'amount': 25}},
+            {'op': 'update', 'id': self.second.pk, 'data': {'description': 'Renamed'}},
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/transactions/batch/', {'operations': operations}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        description_updates = [
+            query['sql'] for query in queries
+            if query['sql'].startswith('UPDATE "tracker_transaction"') and '"description"' in query['sql']
+        ]
+        self.assertEqual(len(description_updates), 1)
+        self.assertNotIn(f'= {self.first.pk})', description_updates[0])
+
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual((self.first.description, self.first.amount), ('Row 1', 25))
+        self.assertEqual((self.second.description, self.second.amount), ('Renamed', 10))
+
+
+class BalanceHistoryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.dates = [date(2026, 1, 31), date(2026, 2, 14), date(2026, 2, 28), date(2026, 3, 31), date(2026, 4, 30)]
+
+    def add(self, day, amount, transaction_type='income'):
+        return Transaction.objects.create(
+            user=self.user, description='Row', amount=amount, category='Salary',
+            transaction_type=transaction_type, date=day,
+        )
+
+    def assertHistoryMatchesTransactions(self):
+        response = self.client.get('/api/balance/history/', {'date': [day.isoformat() for day in self.dates]})
+        self.assertEqual(response.status_code, 200)
+        expected = []
+        for day in self.dates:
+            balance = 0
+            for transaction in Transaction.objects.filter(user=self.user, date__lte=day):
+                balance += transaction.amount if transaction.transaction_type == 'income' else -transaction.amount
+            expected.append({'date': day.isoformat(), 'balance': float(balance)})
+        self.assertEqual(response.data['history'], expected)
+
+    def test_backdated_and_cross_month_edits(self):
+        self.add(date(2026, 1, 10), 1000)
+        march = self.add(date(2026, 3, 5), 300, 'expense')
+        self.assertHistoryMatchesTransactions()
+
+        # Backdated into a month before every checkpoint
+        self.add(date(2025, 12, 20), 50)
+        self.assertHistoryMatchesTransactions()
+
+        # Moved back across months, then changed in amount and type
+        march.date = date(2026, 2, 10)
+        march.save()
+        self.assertHistoryMatchesTransactions()
+        march.amount, march.transaction_type = 120, 'income'
+        march.save()
+        self.assertHistoryMatchesTransactions()
+
+        # Moved forward past the last requested date, then deleted
+        march.date = date(2026, 5, 2)
+        march.save()
+        self.assertHistoryMatchesTransactions()
+        march.delete()
+        self.assertHistoryMatchesTransactions()
+
+    def test_edit_through_the_api_within_the_month_of_a_requested_date(self):
+        transaction = self.add(date(2026, 2, 20), 400)
+        self.assertHistoryMatchesTransactions()
+        response = self.client.patch(f'/api/transactions/{transaction.pk}/', {'date': '2026-02-01'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertHistoryMatchesTransactions()
+
+
+class LedgerInvariantTests(TestCase):
+    """The incrementally maintained ledger tables match a rebuild from scratch"""
+    categories = ('Food', 'Rent', 'Salary')
+    months = [date(2025, 11, 1), date(2025, 12, 1), date(2026, 1, 1), date(2026, 2, 1), date(2026, 3, 1)]
+
+    def setUp(self):
+        self.random = random.Random(5)
+        self.users = [User.objects.create_user(name, password='password') for name in ('alice', 'bob')]
+        for user in self.users:
+            for name in self.categories[:2]:
+                category = Category.objects.create(user=user, name=name)
+                Envelope.objects.create(user=user, category=category, budgeted_amount=10 ** 9)
+
+    def random_fields(self):
+        return {
+            'user': self.random.choice(self.users),
+            'category': self.random.choice(self.categories),
+            'transaction_type': self.random.choice(['income', 'expense']),
+            'amount': self.random.randint(1, 5000),
+            'date': self.random.choice(self.months) + timedelta(days=self.random.randint(0, 27)),
+        }
+
+    def new_transaction(self):
+        return Transaction(description='Random', **self.random_fields())
+
+    def change(self, transaction):
+        """Change one to three ledger fields; return the names of the fields changed"""
+        fields = self.random_fields()
+        names = self.random.sample(sorted(fields), self.random.randint(1, 3))
+        for name in names:
+            setattr(transaction, name, fields[name])
+        return names
+
+    def random_operation(self):
+        existing = list(Transaction.objects.all())
+        operation = self.random.choice(['create', 'update', 'delete', 'bulk_create', 'bulk_update', 'bulk_delete'])
+        if operation not in ('create', 'bulk_create') and not existing:
+            operation = 'create'
+
+        if operation == 'create':
+            self.new_transaction().save()
+        elif operation == 'update':
+            transaction = self.random.choice(existing)
+            self.change(transaction)
+            transaction.save()
+        elif operation == 'delete':
+            self.random.choice(existing).delete()
+        elif operation == 'bulk_create':
+            Transaction.objects.bulk_create([self.new_transaction() for _ in range(self.random.randint(1, 5))])
+        elif operation == 'bulk_update':
+            transactions = self.random.sample(existing, min(len(existing), self.random.randint(1, 5)))
+            fields = set()
+            for transaction in transactions:
+                fields.update(self.change(transaction))
+            Transaction.objects.bulk_update(transactions, sorted(fields))
+        else:
+            picked = self.random.sample(existing, min(len(existing), self.random.randint(1, 5)))
+            Transaction.objects.filter(pk__in=[transaction.pk for transaction in picked]).delete()
+
+    def ledger_state(self):
+        rollups = set(MonthlyRollup.objects.values_list(*ROLLUP_KEY, 'total', 'count'))
+        spent = dict(Envelope.objects.values_list('pk', 'spent_total'))
+        # Only months with transactions need a checkpoint, so compare the
+        # closing balance of every month rather than the rows themselves
+        closing = {}
+        for user in self.users:
+            checkpoints = list(BalanceCheckpoint.objects.filter(user=user).values_list('month_start', 'balance'))
+            for month in self.months:
+                earlier = [balance for month_start, balance in checkpoints if month_start <= month]
+                closing[(user.pk, month)] = earlier[-1] if earlier else 0
+        return rollups, spent, closing
+
+    def test_random_writes_match_a_rebuild(self):
+        for _ in range(300):
+            self.random_operation()
+        maintained = self.ledger_state()
+
+        rebuild_monthly_rollups()
+
+        self.assertEqual(maintained, self.ledger_state())
+        self.assertTrue(maintained[0])
+
+
+@override_settings(CASHFLOW_CACHE_TIMEOUT=0)
+class QueryCountTests(TestCase):
+    """Endpoints documented to run a constant number of queries"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.today = date.today()
+
+    def add_data(self, count):
+        for number in range(count):
+            category = Category.objects.create(user=self.user, name=f'Category {count}.{number}')
+            Envelope.objects.create(user=self.user, category=category, budgeted_amount=1000)
+            Transaction.objects.create(
+                user=self.user, description=f'Row {number}', amount=10, category=category.name,
+                transaction_type='expense', date=self.today,
+            )
+            RecurringTransaction.objects.create(
+                user=self.user, name=f'Bill {number}', amount=100, category=category.name,
+                transaction_type='expense', frequency='monthly', start_date=self.today,
+                next_occurrence=self.today + timedelta(days=number),
+            )
+            SavingsGoal.objects.create(
+                user=self.user, name=f'Goal {number}', target_amount=1000, target_date=self.today
+            )
+
+    def assertConstantQueries(self, num, path, params=None, **extra):
+        for count in (1, 9):
+            self.add_data(count)
+            with self.assertNumQueries(num):
+                response = self.client.get(path, params, **extra)
+            self.assertEqual(response.status_code, 200)
+
+    def test_envelope_list(self):
+        self.assertConstantQueries(2, '/api/envelopes/')
+
+    def test_envelope_summary(self):
+        self.assertConstantQueries(1, '/api/envelopes/summary/')
+
+    def test_transaction_list_page(self):
+        # Count, page and the envelope balances
+        self.assertConstantQueries(3, '/api/transactions/')
+
+    def test_dashboard(self):
+        # The token's user lookup, the rollup totals, envelopes, recurring
+        # templates and savings goals
+        self.client.force_authenticate(None)
+        token = AccessToken.for_user(self.user)
+        self.assertConstantQueries(5, '/api/dashboard/', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user('alice', password='password')
+        self.bob = User.objects.create_user('bob', password='password')
+        self.client = APIClient()
+
+    def get_balance(self, user):
+        self.client.force_authenticate(user)
+        response = self.client.get('/api/balance/')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def add(self, user, amount):
+        self.client.force_authenticate(user)
+        response = self.client.post('/api/transactions/', {
+            'description': 'Pay', 'amount': amount, 'category': 'Salary',
+            'transaction_type': 'income', 'date': date.today().isoformat(),
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_write_invalidates_only_that_users_responses(self):
+        self.assertEqual(self.get_balance(self.alice)['balance'], 0)
+        self.get_balance(self.bob)
+        bob_version = response_cache.get_data_version(self.bob.pk)
+        alice_version = response_cache.get_data_version(self.alice.pk)
+        response_cache.reset_cache_stats()
+
+        self.add(self.alice, 250)
+        self.assertGreater(response_cache.get_data_version(self.alice.pk), alice_version)
+        self.assertEqual(response_cache.get_data_version(self.bob.pk), bob_version)
+
+        # Bob's cached response is still served; Alice's is recomputed
+        self.get_balance(self.bob)
+        self.assertEqual(self.get_balance(self.alice)['balance'], 250)
+        stats = response_cache.cache_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_invalidate_bumps_again_on_commit(self):
+        version = response_cache.get_data_version(self.alice.pk)
+        with self.captureOnCommitCallbacks() as callbacks:
+            response_cache.invalidate_user(self.alice.pk)
+            self.assertEqual(response_cache.get_data_version(self.alice.pk), version + 1)
+            # A read inside the transaction caches under the bumped version
+            key = response_cache.response_cache_key('balance_view', self.alice.pk, QueryDict())
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        self.assertEqual(response_cache.get_data_version(self.alice.pk), version + 2)
+        self.assertNotEqual(response_cache.response_cache_key('balance_view', self.alice.pk, QueryDict()), key)
+
+    def test_evicted_version_is_reseeded_past_old_entries(self):
+        version = response_cache.get_data_version(self.alice.pk)
+        cache.delete(response_cache._version_key(self.alice.pk))
+        self.assertGreater(response_cache.get_data_version(self.alice.pk), version)
+
+    def test_cache_stats_view(self):
+        self.client.force_authenticate(self.alice)
+        self.assertEqual(self.client.get('/api/cache-stats/').status_code, 403)
+
+        response_cache.reset_cache_stats()
+        self.get_balance(self.alice)
+        self.get_balance(self.alice)
+        self.get_balance(self.alice)
+        staff = User.objects.create_user('admin', password='password', is_staff=True)
+        self.client.force_authenticate(staff)
+        response = self.client.get('/api/cache-stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['hits'], 2)
+        self.assertEqual(response.data['misses'], 1)
+        self.assertAlmostEqual(response.data['hit_rate'], 200 / 3)
+
+        response_cache.reset_cache_stats()
+        self.assertEqual(response_cache.cache_stats()['hit_rate'], 0)
+
+
+class TransactionExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for day, description, amount, transaction_type in (
+            (date(2026, 1, 31), 'Rent, January', 500, 'expense'),
+            (date(2026, 2, 1), 'Salary "Feb"', 2000, 'income'),
+            (date(2026, 2, 28), 'Groceries', 80, 'expense'),
+            (date(2026, 3, 1), 'Salary', 2000, 'income'),
+        ):
+            Transaction.objects.create(
+                user=self.user, description=description, amount=amount, transaction_type=transaction_type,
+                category='Salary' if transaction_type == 'income' else 'Living', date=day,
+            )
+        other = User.objects.create_user('bob', password='password')
+        Transaction.objects.create(
+            user=other, description='Not mine', amount=1, category='Living', transaction_type='expense',
+            date=date(2026, 2, 15),
+        )
+
+    def export(self, params=None, **extra):
+        response = self.client.get('/api/export/', params, **extra)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_csv_streams_every_row_newest_first(self):
+        response, body = self.export({'format': 'csv'})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertTrue(response['Content-Disposition'].startswith('attachment; filename="transactions_'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(list(csv.reader(StringIO(body.decode()))), [
+            ['Date', 'Description', 'Category', 'Amount', 'Type'],
+            ['2026-03-01', 'Salary', 'Salary', '2000', 'income'],
+            ['2026-02-28', 'Groceries', 'Living', '80', 'expense'],
+            ['2026-02-01', 'Salary "Feb"', 'Salary', '2000', 'income'],
+            ['2026-01-31', 'Rent, January', 'Living', '500', 'expense'],
+        ])
+
+    def test_gzip_round_trip(self):
+        plain = self.export({'format': 'csv'})[1]
+        response, body = self.export({'format': 'csv'}, HTTP_ACCEPT_ENCODING='br, gzip;q=0.8')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(body), plain)
+
+    def test_date_range(self):
+        body = self.export({'format': 'csv', 'start_date': '2026-02-01', 'end_date': '2026-02-28'})[1]
+        rows = list(csv.reader(StringIO(body.decode())))[1:]
+        self.assertEqual([row[0] for row in rows], ['2026-02-28', '2026-02-01'])
+
+        response = self.client.get('/api/export/', {'format': 'csv', 'start_date': '2026-02-30'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('start_date', response.data)
+
+    def test_json_array(self):
+        response, body = self.export({'format': 'json', 'type': 'income'})
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(body), [
+            {'date': '2026-03-01', 'description': 'Salary', 'category': 'Salary', 'amount': 2000.0, 'type': 'income'},
+            {'date': '2026-02-01', 'description': 'Salary "Feb"', 'category': 'Salary', 'amount': 2000.0,
+             'type': 'income'},
+        ])
+        self.assertEqual(json.loads(self.export({'format': 'json', 'start_date': '2027-01-01'})[1]), [])
+
+    def test_ndjson_gzip_with_category_and_date_filters(self):
+        response, body = self.export(
+            {'format': 'ndjson', 'category': 'Living', 'end_date': '2026-02-28'}, HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in gzip.decompress(body).decode().splitlines()]
+        self.assertEqual([(row['date'], row['description']) for row in rows], [
+            ('2026-02-28', 'Groceries'), ('2026-01-31', 'Rent, January'),
+        ])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get('/api/export/', {'format': 'xml'}).status_code, 400)
+        response = self.client.get('/api/export/', {'format': 'json', 'type': 'transfer'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('transaction_type', response.data)
+
+    def test_buffered_chunks(self):
+        pieces = [f'{number:04d}\n' for number in range(100)]
+        chunks = list(buffered(iter(pieces), size=64))
+        self.assertEqual(b''.join(chunks), ''.join(pieces).encode())
+        self.assertEqual(len(chunks), 8)
+        self.assertTrue(all(len(chunk) >= 64 for chunk in chunks[:-1]))
+
+
+class ComparisonPeriodTests(SimpleTestCase):
+    def test_period_types(self):
+        today = date(2026, 3, 4)
+        self.assertEqual(comparison_periods('weekly', today), [
+            ('2026-W09', date(2026, 2, 23), date(2026, 3, 1)),
+            ('2026-W10', date(2026, 3, 2), date(2026, 3, 8)),
+        ])
+        self.assertEqual(comparison_periods('monthly', today, 3), [
+            ('2026-01', date(2026, 1, 1), date(2026, 1, 31)),
+            ('2026-02', date(2026, 2, 1), date(2026, 2, 28)),
+            ('2026-03', date(2026, 3, 1), date(2026, 3, 31)),
+        ])
+        self.assertEqual(comparison_periods('quarterly', today), [
+            ('2025-Q4', date(2025, 10, 1), date(2025, 12, 31)),
+            ('2026-Q1', date(2026, 1, 1), date(2026, 3, 31)),
+        ])
+        self.assertEqual(comparison_periods('yearly', today, 1), [('2026', date(2026, 1, 1), date(2026, 12, 31))])
+
+    def test_boundaries(self):
+        # First and last days of a month, quarter and year, a leap February
+        # and an ISO week belonging to the previous year
+        for period_type, today, index, expected in (
+            ('monthly', date(2024, 3, 1), 0, ('2024-02', date(2024, 2, 1), date(2024, 2, 29))),
+            ('monthly', date(2026, 1, 31), 0, ('2025-12', date(2025, 12, 1), date(2025, 12, 31))),
+            ('quarterly', date(2026, 12, 31), -1, ('2026-Q4', date(2026, 10, 1), date(2026, 12, 31))),
+            ('quarterly', date(2026, 4, 1), 0, ('2026-Q1', date(2026, 1, 1), date(2026, 3, 31))),
+            ('yearly', date(2026, 1, 1), 0, ('2025', date(2025, 1, 1), date(2025, 12, 31))),
+            ('weekly', date(2027, 1, 1), -1, ('2026-W53', date(2026, 12, 28), date(2027, 1, 3))),
+        ):
+            with self.subTest(period_type=period_type, today=today):
+                self.assertEqual(comparison_periods(period_type, today)[index], expected)
+
+        periods = comparison_periods('monthly', date(2026, 3, 15), MAX_COMPARISON_PERIODS)
+        for (_, _, end), (_, start, _) in zip(periods, periods[1:]):
+            self.assertEqual(end + timedelta(days=1), start)
+
+    def test_requested_periods(self):
+        today = date(2026, 3, 4)
+        self.assertEqual(requested_periods(QueryDict(), today), ('monthly', comparison_periods('monthly', today)))
+        period_type, periods = requested_periods(QueryDict('type=quarterly&periods=4'), today)
+        self.assertEqual((period_type, [label for label, _, _ in periods]), (
+            'quarterly', ['2025-Q2', '2025-Q3', '2025-Q4', '2026-Q1']
+        ))
+        # Counts beyond the limit are capped
+        self.assertEqual(len(requested_periods(QueryDict('periods=500'), today)[1]), MAX_COMPARISON_PERIODS)
+
+        query = QueryDict('range=2026-01-15:2026-02-14&range=2026-02-15:2026-02-15')
+        self.assertEqual(requested_periods(query, today), (
+            'custom', [
+                ('2026-01-15..2026-02-14', date(2026, 1, 15), date(2026, 2, 14)),
+                ('2026-02-15..2026-02-15', date(2026, 2, 15), date(2026, 2, 15)),
+            ]
+        ))
+
+    def test_invalid_requests(self):
+        today = date(2026, 3, 4)
+        too_many = '&'.join(['range=2026-01-01:2026-01-31'] * (MAX_COMPARISON_PERIODS + 1))
+        for query in (
+            'type=daily', 'periods=0', 'periods=-2', 'periods=two', 'range=2026-02-01',
+            'range=2026-02-10:2026-02-01', 'range=2026-02-30:2026-03-01', 'range=:', too_many,
+        ):
+            with self.subTest(query=query[:40]):
+                with self.assertRaises(ValueError):
+                    requested_periods(QueryDict(query), today)
+
+
+class ComparisonReportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for day, amount, transaction_type, category in (
+            (date(2026, 1, 31), 100, 'expense', 'Food'),
+            (date(2026, 2, 1), 1000, 'income', 'Salary'),
+            (date(2026, 2, 14), 40, 'expense', 'Food'),
+            (date(2026, 2, 28), 60, 'expense', 'Rent'),
+            (date(2026, 3, 1), 5, 'expense', 'Food'),
+        ):
+            Transaction.objects.create(
+                user=self.user, description='Row', amount=amount, category=category,
+                transaction_type=transaction_type, date=day,
+            )
+
+    def expected_stats(self, start, end):
+        rows = Transaction.objects.filter(user=self.user, date__gte=start, date__lte=end)
+        income = sum(row.amount for row in rows if row.transaction_type == 'income')
+        expenses = sum(row.amount for row in rows if row.transaction_type == 'expense')
+        return {
+            'income': float(income), 'expenses': float(expenses), 'net': float(income - expenses),
+            'transaction_count': len(rows),
+        }
+
+    def assertPeriodsMatchTransactions(self, params):
+        response = self.client.get('/api/reports/comparison/', params)
+        self.assertEqual(response.status_code, 200)
+        for period in response.data['periods']:
+            stats = {key: period[key] for key in ('income', 'expenses', 'net', 'transaction_count')}
+            start, end = date.fromisoformat(period['start_date']), date.fromisoformat(period['end_date'])
+            self.assertEqual(stats, self.expected_stats(start, end), period['label'])
+        return response.data
+
+    def test_whole_months_and_partial_ranges(self):
+        # Whole months are read from the rollups, the others from transactions
+        data = self.assertPeriodsMatchTransactions({'range': ['2026-01-01:2026-01-31', '2026-02-01:2026-02-28']})
+        self.assertEqual(data['category_comparison']['Food'], {'current': 40.0, 'previous': 100.0, 'change': -60.0})
+        self.assertPeriodsMatchTransactions({'range': ['2026-01-31:2026-02-13', '2026-02-14:2026-03-01']})
+        self.assertPeriodsMatchTransactions({'range': ['2026-02-28:2026-02-28', '2026-01-01:2026-03-31']})
+
+    def test_invalid_parameters(self):
+        for params in ({'type': 'daily'}, {'periods': 'two'}, {'range': '2026-03-01:2026-02-01'}):
+            with self.subTest(params=params):
+                response = self.client.get('/api/reports/comparison/', params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.data)
+
+
+class ReportRollupParityTests(TestCase):
+    """The rollup-based reports match the same reports rebuilt from raw transactions"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('alice', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        other = User.objects.create_user('bob', password='password')
+        Transaction.objects.create(
+            user=other, description='Not mine', amount=999, category='Food', transaction_type='expense',
+            date=date(2026, 2, 10),
+        )
+
+        rows = []
+        for number in range(60):
+            day = date(2025, 12, 1) + timedelta(days=number * 2)
+            rows.append(self.add(
+                day, 3 + number * 7, 'income' if number % 5 == 0 else 'expense',
+                ('Salary' if number % 5 == 0 else ('Food', 'Rent', 'Fuel', 'Fun')[number % 4]),
+            ))
+        # Edits through the API and the ORM: moved across months and years,
+        # retyped, recategorised, bulk-created and deleted
+        self.client.patch(f'/api/transactions/{rows[3].pk}/', {'date': '2026-03-31'}, format='json')
+        self.client.patch(f'/api/transactions/{rows[7].pk}/', {'transaction_type': 'income'}, format='json')
+        rows[11].category, rows[11].date = 'Gifts', date(2025, 12, 31)
+        rows[11].save()
+        rows[20].delete()
+        self.client.delete(f'/api/transactions/{rows[21].pk}/')
+        Transaction.objects.bulk_create([
+            Transaction(user=self.user, description='Bulk', amount=1000 + number, category='Bonus',
+                        transaction_type='income', date=date(2026, 2, number + 1))
+            for number in range(3)
+        ])
+
+    def add(self, day, amount, transaction_type, category):
+        return Transaction.objects.create(
+            user=self.user, description='Row', amount=amount, category=category,
+            transaction_type=transaction_type, date=day,
+        )
+
+    def monthly_reports(self):
+        responses = [
+            self.client.get('/api/reports/monthly/', {'year': year, 'month': month})
+            for year, month in ((2025, 12), (2026, 1), (2026, 2), (2026, 3), (2026, 4))
+        ]
+        for response in responses:
+            self.assertEqual(response.status_code, 200)
+        return [response.data for response in responses]
+
+    def rebuild(self):
+        MonthlyRollup.objects.filter(user=self.user).delete()
+        rebuild_monthly_rollups()
+
+    def test_monthly_reports_match_a_rebuild(self):
+        before = self.monthly_reports()
+        self.rebuild()
+        self.assertEqual(self.monthly_reports(), before)
+
+    def test_monthly_summary_matches_transactions(self):
+        for year, month in ((2025, 12), (2026, 2), (2026, 3)):
+            rows = Transaction.objects.filter(user=self.user, date__year=year, date__month=month)
+            expenses = {}
+            for row in rows.filter(transaction_type='expense'):
+                amount, count = expenses.get(row.category, (0, 0))
+                expenses[row.category] = (amount + row.amount, count + 1)
+            income = sum(row.amount for row in rows.filter(transaction_type='income'))
+            total = sum(amount for amount, _ in expenses.values())
+
+            data = self.client.get('/api/reports/monthly/', {'year': year, 'month': month}).data
+            self.assertEqual(data['summary'], {
+                'income': float(income), 'expenses': float(total), 'net': float(income - total),
+                'transaction_count': rows.count(),
+            })
+            self.assertEqual(
+                {row['category']: (row['amount'], row['count']) for row in data['category_breakdown']},
+                {category: (float(amount), count) for category, (amount, count) in expenses.items()},
+            )
+
+    def test_yearly_reports_match_a_rebuild(self):
+        def yearly_reports():
+            return [self.client.get('/api/reports/yearly/', {'year': year}).data for year in (2025, 2026)]
+
+        before = yearly_reports()
+        self.rebuild()
+        self.assertEqual(yearly_reports(), before)
+
+    def test_yearly_totals_match_transactions(self):
+        data = self.client.get('/api/reports/yearly/', {'year': 2026}).data
+        rows = Transaction.objects.filter(user=self.user, date__year=2026)
+        for month in data['monthly_breakdown']:
+            in_month = [row for row in rows if row.date.month == month['month']]
+            income = sum(row.amount for row in in_month if row.transaction_type == 'income')
+            expenses = sum(row.amount for row in in_month if row.transaction_type == 'expense')
+            self.assertEqual(
+                (month['income'], month['expenses'], month['transaction_count']),
+                (float(income), float(expenses), len(in_month)),
+            )
+
+        totals = {}
+        for row in rows.filter(transaction_type='expense'):
+            totals[row.category] = totals.get(row.category, 0) + row.amount
+        self.assertEqual(
+            data['top_categories'],
+            [{'category': category, 'total': float(total)}
+             for category, total in sorted(totals.items(), key=lambda item: item[1], reverse=True)],
+        )
+        self.assertEqual(data['summary']['transaction_count'], rows.count())
+
+
+class EnvelopeSpendingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.today = timezone.localdate()
+        last_month = self.today.replace(day=1) - timedelta(days=1)
+        other = User.objects.create_user('bob', password='password')
+
+        # Budget, this month's expenses: over budget, exactly 80%, just under
+        # 80% and untouched
+        for name, budget, spent in (('Food', 100, 150), ('Rent', 500, 400), ('Fuel', 1000, 799), ('Fun', 50, 0)):
+            category = Category.objects.create(user=self.user, name=name)
+            Envelope.objects.create(user=self.user, category=category, budgeted_amount=budget)
+            if spent:
+                self.add(self.user, spent, name)
+        # Left out of this month's spend
+        self.add(self.user, 70, 'Fun', day=last_month)
+        self.add(self.user, 1000, 'Fun', transaction_type='income')
+        self.add(other, 40, 'Fun')
+
+    def add(self, user, amount, category, transaction_type='expense', day=None):
+        Transaction.objects.create(
+            user=user, description='Row', amount=amount, category=category,
+            transaction_type=transaction_type, date=day or self.today,
+        )
+
+    def test_annotations(self):
+        envelopes = {
+            envelope.category.name: envelope
+            for envelope in Envelope.objects.filter(user=self.user).select_related('category').with_spending()
+        }
+        self.assertEqual(
+            {
+                name: (envelope.spent, envelope.remaining, envelope.over_budget, envelope.near_limit)
+                for name, envelope in envelopes.items()
+            },
+            {
+                'Food': (150, -50, True, True), 'Rent': (400, 100, False, True),
+                'Fuel': (799, 201, False, False), 'Fun': (0, 50, False, False),
+            },
+        )
+        self.assertAlmostEqual(envelopes['Food'].percentage, 150.0)
+        self.assertAlmostEqual(envelopes['Fuel'].percentage, 79.9)
+
+    def test_list_and_summary(self):
+        listed = {row['category_name']: row for row in self.client.get('/api/envelopes/').data['results']}
+        self.assertEqual(listed['Rent']['spent_amount'], 400)
+        self.assertTrue(listed['Rent']['is_near_limit'])
+        self.assertEqual(listed['Fun']['remaining_amount'], 50)
+
+        summary = self.client.get('/api/envelopes/summary/').data
+        self.assertEqual(
+            {key: value for key, value in summary.items() if key != 'envelopes'},
+            {
+                'total_envelopes': 4, 'total_budgeted': 1650, 'total_spent': 1349, 'total_remaining': 301,
+                'over_budget_count': 1, 'near_limit_count': 1,
+            },
+        )
 
-# Create your tests here.
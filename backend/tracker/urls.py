@@ -1,11 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from . import async_views
 from .views import (
     TransactionViewSet, CategoryViewSet, EnvelopeViewSet, RegisterView, 
-    balance_view, income_view, monthly_rollover_view, SavingsGoalViewSet, 
+    balance_view, balance_history_view, dashboard_view, income_view, monthly_rollover_view, SavingsGoalViewSet, 
     RecurringTransactionViewSet, monthly_report, yearly_report, 
-    comparison_report, export_data
+    comparison_report, ExportDataView, cache_stats_view
 )
 
 router = DefaultRouter()
@@ -20,11 +21,21 @@ urlpatterns = [
     path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('balance/', balance_view, name='balance'),
+    path('balance/history/', balance_history_view, name='balance_history'),
     path('income/', income_view, name='income'),
+    path('dashboard/', dashboard_view, name='dashboard'),
     path('monthly-rollover/', monthly_rollover_view, name='monthly_rollover'),
     path('reports/monthly/', monthly_report, name='monthly_report'),
     path('reports/yearly/', yearly_report, name='yearly_report'),
     path('reports/comparison/', comparison_report, name='comparison_report'),
-    path('export/', export_data, name='export_data'),
+    path('export/', ExportDataView.as_view(), name='export_data'),
+    # Async versions of the report and dashboard endpoints, for ASGI deployments
+    path('async/balance/', async_views.balance_view, name='balance_async'),
+    path('async/income/', async_views.income_view, name='income_async'),
+    path('async/dashboard/', async_views.dashboard_view, name='dashboard_async'),
+    path('async/reports/monthly/', async_views.monthly_report, name='monthly_report_async'),
+    path('async/reports/yearly/', async_views.yearly_report, name='yearly_report_async'),
+    path('async/reports/comparison/', async_views.comparison_report, name='comparison_report_async'),
+    path('cache-stats/', cache_stats_view, name='cache_stats'),
     path('', include(router.urls)),
 ]
@@ -1,15 +1,31 @@
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import api_view, permission_classes, action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.views import APIView
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework_simplejwt.views import TokenObtainPairView
 from django.contrib.auth.models import User
-from django.db.models import Sum, Q, F, Count
 from django.utils import timezone
 from django.db import transaction
 from datetime import datetime, timedelta
 from decimal import Decimal
 from .models import Transaction, Category, Envelope, SavingsGoal, RecurringTransaction
+from .batch import MAX_OPERATIONS, run_batch
+from .budgets import EnvelopeBudgets, lock_envelopes
+from .cache import cache_stats, cached_per_user
+from .dashboard import build_dashboard, envelope_summary, requested_sections
+from .exports import ExportContentNegotiation, csv_lines, json_array, ndjson_lines, streaming_response
+from .filters import date_param, filter_transactions, search_transactions, transaction_ordering
+from .imports import ImportFormatError, import_transactions, read_csv, read_ofx
+from .pagination import TransactionPagination
+from .recurring import MAX_OCCURRENCES, catch_up
+from .reports import (
+    MAX_HISTORY_POINTS, account_totals, allocated_total, balance_history, balance_summary,
+    build_comparison_report, build_monthly_report, build_yearly_report, history_dates, income_summary,
+    requested_periods
+)
+from .rollover import rollover_envelopes
 from .serializers import (
     UserSerializer, TransactionSerializer, 
     CategorySerializer, BalanceSerializer, EnvelopeSerializer, SavingsGoalSerializer, RecurringTransactionSerializer
@@ -30,13 +46,79 @@ class RegisterView(viewsets.ModelViewSet):
 class TransactionViewSet(viewsets.ModelViewSet):
     serializer_class = TransactionSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = TransactionPagination
 
     def get_queryset(self):
-        return Transaction.objects.filter(user=self.request.user)
+        queryset = Transaction.objects.filter(user=self.request.user).select_related('user')
+        if self.action == 'list':
+            params = self.request.query_params
+            queryset = filter_transactions(queryset, params)
+            ordering = transaction_ordering(params)
+            search = params.get('search', '').strip()
+            if search:
+                queryset = search_transactions(queryset, search)
+                # Best matches first unless the client picked an ordering
+                if not params.get('ordering'):
+                    ordering = ('-search_rank',) + ordering
+            queryset = queryset.order_by(*ordering)
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action == 'list':
+            context['envelope_remaining'] = EnvelopeBudgets(self.request.user).remaining
+        return context
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    def perform_destroy(self, instance):
+        # Envelopes before the transaction row, the order updates and batches lock in
+        with transaction.atomic():
+            lock_envelopes(self.request.user)
+            instance.delete()
+
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """Apply a list of create/update/delete operations atomically"""
+        operations = request.data.get('operations') if isinstance(request.data, dict) else None
+        if not isinstance(operations, list) or not operations:
+            return Response({'error': 'Provide a non-empty "operations" list'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(operations) > MAX_OPERATIONS:
+            return Response(
+                {'error': f'A batch may contain at most {MAX_OPERATIONS} operations'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        applied, results = run_batch(request, operations)
+        return Response(
+            {'applied': applied, 'results': results},
+            status=status.HTTP_200_OK if applied else status.HTTP_400_BAD_REQUEST
+        )
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_file(self, request):
+        """Import transactions from an uploaded CSV or OFX file"""
+        uploaded_file = request.FILES.get('file')
+        if not uploaded_file:
+            return Response({'error': 'Upload a file in the "file" field'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        file_format = request.data.get('file_format') or uploaded_file.name.rsplit('.', 1)[-1].lower()
+        if file_format == 'csv':
+            rows = read_csv(uploaded_file)
+        elif file_format in ('ofx', 'qfx'):
+            rows = read_ofx(uploaded_file, request.data.get('default_category') or 'Uncategorized')
+        else:
+            return Response({'error': 'Unsupported file format'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+        try:
+            report = import_transactions(request.user, rows, dry_run=dry_run)
+        except ImportFormatError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(report, status=status.HTTP_201_CREATED if report['created'] else status.HTTP_200_OK)
+
 
 class CategoryViewSet(viewsets.ModelViewSet):
     serializer_class = CategorySerializer
@@ -61,7 +143,7 @@ class EnvelopeViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Envelope.objects.filter(user=self.request.user).select_related('category')
+        return Envelope.objects.filter(user=self.request.user).select_related('category').with_spending()
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -69,105 +151,101 @@ class EnvelopeViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def summary(self, request):
         """Get envelope summary statistics"""
-        envelopes = self.get_queryset()
+        # Evaluate once; every figure reads the annotations on these rows
+        envelopes = list(self.get_queryset())
         
-        total_budgeted = sum(envelope.budgeted_amount for envelope in envelopes)
-        total_spent = sum(envelope.spent_amount for envelope in envelopes)
-        total_remaining = sum(envelope.remaining_amount for envelope in envelopes)
+        return Response(envelope_summary(envelopes, self.get_serializer_context()))
+
+    @action(detail=False, methods=['get'])
+    def period(self, request):
+        """Get each envelope's budget, carried-over amount and spend for one month"""
+        today = timezone.localdate()
+        try:
+            year = int(request.query_params.get('year', today.year))
+            month = int(request.query_params.get('month', today.month))
+        except ValueError:
+            return Response({'error': 'year and month must be numbers'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= month <= 12:
+            return Response({'error': 'month must be between 1 and 12'}, status=status.HTTP_400_BAD_REQUEST)
         
-        over_budget_count = sum(1 for envelope in envelopes if envelope.is_over_budget)
-        near_limit_count = sum(1 for envelope in envelopes if envelope.is_near_limit and not envelope.is_over_budget)
+        envelopes = Envelope.objects.filter(user=request.user).select_related('category').for_period(year, month)
         
         return Response({
-            'total_envelopes': envelopes.count(),
-            'total_budgeted': total_budgeted,
-            'total_spent': total_spent,
-            'total_remaining': total_remaining,
-            'over_budget_count': over_budget_count,
-            'near_limit_count': near_limit_count,
-            'envelopes': EnvelopeSerializer(envelopes, many=True, context={'request': request}).data
+            'year': year,
+            'month': month,
+            'envelopes': [
+                {
+                    'id': envelope.id,
+                    'category': envelope.category_id,
+                    'category_name': envelope.category.name,
+                    'budgeted': envelope.period_budgeted,
+                    'rolled_over': envelope.period_rolled_over,
+                    'spent': envelope.period_spent,
+                    'remaining': envelope.period_remaining,
+                }
+                for envelope in envelopes
+            ]
         })
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cached_per_user
 def balance_view(request):
     """Get user's current balance and monthly totals"""
-    user = request.user
-    
-    # Calculate total income and expenses
-    total_income = Transaction.objects.filter(
-        user=user, 
-        transaction_type='income'
-    ).aggregate(total=Sum('amount'))['total'] or 0
-    
-    total_expenses = Transaction.objects.filter(
-        user=user, 
-        transaction_type='expense'
-    ).aggregate(total=Sum('amount'))['total'] or 0
-    
-    balance = total_income - total_expenses
-    
-    # Calculate monthly income and expenses
-    current_month = timezone.now().month
-    current_year = timezone.now().year
-    
-    monthly_income = Transaction.objects.filter(
-        user=user,
-        transaction_type='income',
-        date__month=current_month,
-        date__year=current_year
-    ).aggregate(total=Sum('amount'))['total'] or 0
-    
-    monthly_expenses = Transaction.objects.filter(
-        user=user,
-        transaction_type='expense',
-        date__month=current_month,
-        date__year=current_year
-    ).aggregate(total=Sum('amount'))['total'] or 0
+    return Response(balance_summary(account_totals(request.user, timezone.localdate())))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@cached_per_user
+def balance_history_view(request):
+    """Running balance on given dates, or over a range at a day/week/month interval"""
+    params = request.query_params
+    try:
+        if params.getlist('date'):
+            dates = [date_param({'date': value}, 'date') for value in params.getlist('date')]
+        else:
+            today = timezone.localdate()
+            end_date = date_param(params, 'end_date') or today
+            start_date = date_param(params, 'start_date') or (end_date - timedelta(days=365))
+            dates = history_dates(start_date, end_date, params.get('interval', 'month'))
+    except ValueError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    if len(dates) > MAX_HISTORY_POINTS:
+        return Response(
+            {'error': f'Too many points requested (maximum {MAX_HISTORY_POINTS})'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     
-    return Response({
-        'total_income': total_income,
-        'total_expenses': total_expenses,
-        'balance': balance,
-        'monthly_income': monthly_income,
-        'monthly_expenses': monthly_expenses
-    })
+    return Response({'history': balance_history(request.user, dates)})
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cached_per_user
 def income_view(request):
     """Get total income and allocated amounts for envelope budgeting"""
     user = request.user
+    totals = account_totals(user, timezone.localdate())
     
-    # Get total income (excluding income allocations to avoid double counting)
-    total_income = Transaction.objects.filter(
-        user=user,
-        transaction_type='income'
-    ).aggregate(total=Sum('amount'))['total'] or 0
-    
-    # Get total allocated to envelopes
-    total_allocated = Envelope.objects.filter(
-        user=user
-    ).aggregate(total=Sum('budgeted_amount'))['total'] or 0
-    
-    # Get total spent from envelopes
-    total_spent = Transaction.objects.filter(
-        user=user,
-        transaction_type='expense'
-    ).aggregate(total=Sum('amount'))['total'] or 0
-    
-    # Calculate remaining to allocate
-    remaining_to_allocate = total_income - total_allocated
-    
-    return Response({
-        'total_income': total_income,
-        'total_allocated': total_allocated,
-        'total_spent': total_spent,
-        'remaining_to_allocate': remaining_to_allocate,
-        'allocation_percentage': (total_allocated / total_income * 100) if total_income > 0 else 0
-    })
+    return Response(income_summary(totals, allocated_total(user)))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@cached_per_user
+def dashboard_view(request):
+    """Balance, income, envelope summary, upcoming and overdue recurring
+    transactions and savings goals in one response; ``sections`` (comma
+    separated or repeated) limits it to the ones named"""
+    try:
+        sections = requested_sections(request.GET)
+    except ValueError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(build_dashboard(request, sections))
 
 
 @api_view(['POST'])
@@ -181,35 +259,11 @@ def monthly_rollover_view(request):
     carry_over_underspent = rollover_data.get('carry_over_underspent', True)
     reset_overspent = rollover_data.get('reset_overspent', True)
     
-    updated_envelopes = []
-    
-    for envelope in Envelope.objects.filter(user=user):
-        current_budget = float(envelope.budgeted_amount)
-        spent_amount = float(envelope.spent_amount)
-        remaining = current_budget - spent_amount
-        
-        new_budget = current_budget
-        
-        if remaining > 0 and carry_over_underspent:
-            # Carry over underspent amount
-            new_budget = spent_amount  # Reset to spent amount, remaining becomes new budget
-        elif remaining < 0 and reset_overspent:
-            # Reset overspent envelopes to 0
-            new_budget = 0
-        else:
-            # Keep current budget
-            new_budget = current_budget
-        
-        if new_budget != current_budget:
-            envelope.budgeted_amount = new_budget
-            envelope.save()
-            updated_envelopes.append({
-                'id': envelope.id,
-                'category_name': envelope.category.name,
-                'old_budget': current_budget,
-                'new_budget': new_budget,
-                'remaining': remaining
-            })
+    updated_envelopes = rollover_envelopes(
+        Envelope.objects.filter(user=user),
+        carry_over_underspent=carry_over_underspent,
+        reset_overspent=reset_overspent
+    )
     
     return Response({
         'message': 'Monthly rollover completed',
@@ -243,19 +297,20 @@ class SavingsGoalViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Update goal current amount
-        goal.current_amount += amount
-        goal.save()
-        
-        # Create a transaction record for the contribution
-        Transaction.objects.create(
-            user=request.user,
-            description=f"Contribution to {goal.name}",
-            amount=amount,
-            category='Savings Goal',
-            transaction_type='expense',
-            date=timezone.now().date()
-        )
+        with transaction.atomic():
+            # Update goal current amount
+            goal.current_amount += amount
+            goal.save()
+            
+            # Create a transaction record for the contribution
+            Transaction.objects.create(
+                user=request.user,
+                description=f"Contribution to {goal.name}",
+                amount=amount,
+                category='Savings Goal',
+                transaction_type='expense',
+                date=timezone.now().date()
+            )
         
         serializer = self.get_serializer(goal)
         return Response(serializer.data)
@@ -288,10 +343,25 @@ class RecurringTransactionViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['post'])
     def skip_next(self, request, pk=None):
-        """Skip the next occurrence and move to the following one"""
+        """Skip the next occurrence, the next ``count`` occurrences, or every
+        occurrence before ``until``"""
         recurring = self.get_object()
+        params = request.data or request.query_params
+        
+        until = date_param(params, 'until')
+        try:
+            count = int(params.get('count', 1))
+        except (TypeError, ValueError):
+            count = 0
+        if count < 1:
+            return Response({'error': 'count must be a positive whole number'}, status=status.HTTP_400_BAD_REQUEST)
+        if until and until <= recurring.next_occurrence:
+            return Response(
+                {'error': f'until must be after the next occurrence ({recurring.next_occurrence})'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        next_date = recurring.calculate_next_occurrence()
+        next_date = recurring.calculate_next_occurrence(periods=count, on_or_after=until)
         if next_date:
             recurring.next_occurrence = next_date
             recurring.save()
@@ -303,6 +373,18 @@ class RecurringTransactionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+    @action(detail=True, methods=['get'])
+    def occurrences(self, request, pk=None):
+        """List the dates this template will post between start_date and end_date"""
+        from datetime import date, timedelta
+        
+        recurring = self.get_object()
+        start_date = date_param(request.query_params, 'start_date') or date.today()
+        end_date = date_param(request.query_params, 'end_date') or (start_date + timedelta(days=365))
+        
+        dates = recurring.pending_occurrences(start_date, end_date, limit=MAX_OCCURRENCES)
+        return Response({'occurrences': [day.isoformat() for day in dates]})
+
     @action(detail=False, methods=['get'])
     def upcoming(self, request):
         """Get upcoming recurring transactions for the next 30 days"""
@@ -332,21 +414,15 @@ class RecurringTransactionViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['post'])
     def process_overdue(self, request):
-        """Process all overdue recurring transactions"""
-        from datetime import date
-        
-        overdue = self.get_queryset().filter(
-            next_occurrence__lt=date.today(),
-            status='active'
-        )
+        """Create every missed occurrence of the user's overdue recurring transactions"""
+        from datetime import date, timedelta
         
-        created_transactions = []
-        for recurring in overdue:
-            try:
-                transaction = recurring.create_transaction()
-                created_transactions.append(TransactionSerializer(transaction).data)
-            except Exception as e:
-                continue  # Skip problematic transactions
+        created = catch_up(self.get_queryset(), through=date.today() - timedelta(days=1))
+        created_transactions = TransactionSerializer(
+            created,
+            many=True,
+            context={'envelope_remaining': EnvelopeBudgets(request.user).remaining}
+        ).data
         
         return Response({
             'message': f'Processed {len(created_transactions)} overdue transactions',
@@ -356,355 +432,77 @@ class RecurringTransactionViewSet(viewsets.ModelViewSet):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cached_per_user
 def monthly_report(request):
     """Generate monthly financial report"""
     year = int(request.GET.get('year', timezone.now().year))
     month = int(request.GET.get('month', timezone.now().month))
     
-    # Get all transactions for the month
-    transactions = Transaction.objects.filter(
-        user=request.user,
-        date__year=year,
-        date__month=month
-    ).order_by('date')
-    
-    # Calculate totals
-    income = transactions.filter(transaction_type='income').aggregate(
-        total=Sum('amount')
-    )['total'] or 0
-    
-    expenses = transactions.filter(transaction_type='expense').aggregate(
-        total=Sum('amount')
-    )['total'] or 0
-    
-    net = income - expenses
-    
-    # Category breakdown
-    category_breakdown = transactions.filter(transaction_type='expense').values('category').annotate(
-        amount=Sum('amount'),
-        count=Count('id')
-    ).order_by('-amount')
-    
-    # Daily breakdown
-    daily_breakdown = []
-    for day in range(1, 32):
-        try:
-            date = timezone.datetime(year, month, day).date()
-            day_income = transactions.filter(
-                date=date, transaction_type='income'
-            ).aggregate(total=Sum('amount'))['total'] or 0
-            
-            day_expenses = transactions.filter(
-                date=date, transaction_type='expense'
-            ).aggregate(total=Sum('amount'))['total'] or 0
-            
-            daily_breakdown.append({
-                'date': date.isoformat(),
-                'income': float(day_income),
-                'expenses': float(day_expenses),
-                'net': float(day_income - day_expenses)
-            })
-        except ValueError:
-            break  # Invalid date for this month
-    
-    # Envelope performance
-    envelopes = Envelope.objects.filter(user=request.user)
-    envelope_performance = []
-    for envelope in envelopes:
-        spent = transactions.filter(category=envelope.category.name).aggregate(
-            total=Sum('amount')
-        )['total'] or 0
-        
-        envelope_performance.append({
-            'category': envelope.category.name,
-            'budgeted': float(envelope.budgeted_amount),
-            'spent': float(spent),
-            'remaining': float(envelope.budgeted_amount - spent),
-            'percentage': float((spent / envelope.budgeted_amount * 100) if envelope.budgeted_amount > 0 else 0)
-        })
-    
-    return Response({
-        'period': {
-            'year': year,
-            'month': month,
-            'month_name': timezone.datetime(year, month, 1).strftime('%B %Y')
-        },
-        'summary': {
-            'income': float(income),
-            'expenses': float(expenses),
-            'net': float(net),
-            'transaction_count': transactions.count()
-        },
-        'category_breakdown': [
-            {
-                'category': item['category'],
-                'amount': float(item['amount']),
-                'count': item['count'],
-                'percentage': float((item['amount'] / expenses * 100) if expenses > 0 else 0)
-            }
-            for item in category_breakdown
-        ],
-        'daily_breakdown': daily_breakdown,
-        'envelope_performance': envelope_performance
-    })
+    return Response(build_monthly_report(request.user, year, month))
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cached_per_user
 def yearly_report(request):
     """Generate yearly financial report"""
     year = int(request.GET.get('year', timezone.now().year))
     
-    # Get all transactions for the year
-    transactions = Transaction.objects.filter(
-        user=request.user,
-        date__year=year
-    ).order_by('date')
-    
-    # Monthly breakdown
-    monthly_breakdown = []
-    for month in range(1, 13):
-        month_transactions = transactions.filter(date__month=month)
-        
-        income = month_transactions.filter(transaction_type='income').aggregate(
-            total=Sum('amount')
-        )['total'] or 0
-        
-        expenses = month_transactions.filter(transaction_type='expense').aggregate(
-            total=Sum('amount')
-        )['total'] or 0
-        
-        monthly_breakdown.append({
-            'month': month,
-            'month_name': timezone.datetime(year, month, 1).strftime('%B'),
-            'income': float(income),
-            'expenses': float(expenses),
-            'net': float(income - expenses),
-            'transaction_count': month_transactions.count()
-        })
-    
-    # Category trends
-    category_trends = {}
-    for transaction in transactions.filter(transaction_type='expense'):
-        category = transaction.category
-        if category not in category_trends:
-            category_trends[category] = {}
-        
-        month = transaction.date.month
-        if month not in category_trends[category]:
-            category_trends[category][month] = 0
-        category_trends[category][month] += float(transaction.amount)
-    
-    # Convert to list format
-    category_trend_data = []
-    for category, monthly_data in category_trends.items():
-        trend_data = {'category': category}
-        for month in range(1, 13):
-            trend_data[f'month_{month}'] = monthly_data.get(month, 0)
-        category_trend_data.append(trend_data)
-    
-    # Top categories
-    top_categories = transactions.filter(transaction_type='expense').values('category').annotate(
-        total=Sum('amount')
-    ).order_by('-total')[:10]
-    
-    return Response({
-        'period': {
-            'year': year
-        },
-        'summary': {
-            'total_income': float(transactions.filter(transaction_type='income').aggregate(total=Sum('amount'))['total'] or 0),
-            'total_expenses': float(transactions.filter(transaction_type='expense').aggregate(total=Sum('amount'))['total'] or 0),
-            'total_net': float(
-                (transactions.filter(transaction_type='income').aggregate(total=Sum('amount'))['total'] or 0) -
-                (transactions.filter(transaction_type='expense').aggregate(total=Sum('amount'))['total'] or 0)
-            ),
-            'transaction_count': transactions.count()
-        },
-        'monthly_breakdown': monthly_breakdown,
-        'category_trends': category_trend_data,
-        'top_categories': [
-            {
-                'category': item['category'],
-                'total': float(item['total'])
-            }
-            for item in top_categories
-        ]
-    })
+    return Response(build_yearly_report(request.user, year))
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cached_per_user
 def comparison_report(request):
-    """Compare current period with previous period"""
-    period_type = request.GET.get('type', 'monthly')  # monthly or yearly
-    current_date = timezone.now()
+    """Compare the current period with earlier ones, or any date ranges given as
+    ``range=YYYY-MM-DD:YYYY-MM-DD`` (repeatable, oldest first)"""
+    try:
+        period_type, periods = requested_periods(request.GET, timezone.localdate())
+    except ValueError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
     
-    if period_type == 'monthly':
-        # Current month
-        current_year = current_date.year
-        current_month = current_date.month
-        
-        # Previous month
-        if current_month == 1:
-            prev_year = current_year - 1
-            prev_month = 12
-        else:
-            prev_year = current_year
-            prev_month = current_month - 1
-        
-        # Get data for both periods
-        current_transactions = Transaction.objects.filter(
-            user=request.user,
-            date__year=current_year,
-            date__month=current_month
-        )
-        
-        prev_transactions = Transaction.objects.filter(
-            user=request.user,
-            date__year=prev_year,
-            date__month=prev_month
-        )
-        
-        current_period = f"{current_year}-{current_month:02d}"
-        prev_period = f"{prev_year}-{prev_month:02d}"
-        
-    else:  # yearly
-        current_year = current_date.year
-        prev_year = current_year - 1
-        
-        current_transactions = Transaction.objects.filter(
-            user=request.user,
-            date__year=current_year
-        )
-        
-        prev_transactions = Transaction.objects.filter(
-            user=request.user,
-            date__year=prev_year
-        )
-        
-        current_period = str(current_year)
-        prev_period = str(prev_year)
-    
-    def calculate_period_stats(transactions):
-        income = transactions.filter(transaction_type='income').aggregate(
-            total=Sum('amount')
-        )['total'] or 0
-        
-        expenses = transactions.filter(transaction_type='expense').aggregate(
-            total=Sum('amount')
-        )['total'] or 0
-        
-        return {
-            'income': float(income),
-            'expenses': float(expenses),
-            'net': float(income - expenses),
-            'transaction_count': transactions.count()
-        }
-    
-    current_stats = calculate_period_stats(current_transactions)
-    prev_stats = calculate_period_stats(prev_transactions)
-    
-    # Calculate percentage changes
-    def calculate_change(current, previous):
-        if previous == 0:
-            return 0 if current == 0 else 100
-        return ((current - previous) / previous) * 100
-    
-    # Category comparison
-    current_categories = current_transactions.filter(transaction_type='expense').values('category').annotate(
-        total=Sum('amount')
-    )
-    
-    prev_categories = prev_transactions.filter(transaction_type='expense').values('category').annotate(
-        total=Sum('amount')
-    )
-    
-    category_comparison = {}
-    for cat in current_categories:
-        category = cat['category']
-        current_amount = float(cat['total'])
-        prev_amount = 0
-        
-        for prev_cat in prev_categories:
-            if prev_cat['category'] == category:
-                prev_amount = float(prev_cat['total'])
-                break
-        
-        category_comparison[category] = {
-            'current': current_amount,
-            'previous': prev_amount,
-            'change': calculate_change(current_amount, prev_amount)
-        }
-    
-    return Response({
-        'period_type': period_type,
-        'current_period': current_period,
-        'previous_period': prev_period,
-        'current_stats': current_stats,
-        'previous_stats': prev_stats,
-        'changes': {
-            'income_change': calculate_change(current_stats['income'], prev_stats['income']),
-            'expenses_change': calculate_change(current_stats['expenses'], prev_stats['expenses']),
-            'net_change': calculate_change(current_stats['net'], prev_stats['net']),
-            'transaction_count_change': calculate_change(current_stats['transaction_count'], prev_stats['transaction_count'])
-        },
-        'category_comparison': category_comparison
-    })
+    return Response(build_comparison_report(request.user, period_type, periods))
 
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def export_data(request):
+class ExportDataView(APIView):
     """Export transaction data in various formats"""
-    export_format = request.GET.get('format', 'csv')
-    start_date = request.GET.get('start_date')
-    end_date = request.GET.get('end_date')
-    
-    transactions = Transaction.objects.filter(user=request.user)
-    
-    if start_date:
-        transactions = transactions.filter(date__gte=start_date)
-    if end_date:
-        transactions = transactions.filter(date__lte=end_date)
-    
-    transactions = transactions.order_by('-date')
-    
-    if export_format == 'csv':
-        import csv
-        from django.http import HttpResponse
-        
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="transactions_{timezone.now().date()}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow(['Date', 'Description', 'Category', 'Amount', 'Type'])
-        
-        for transaction in transactions:
-            writer.writerow([
-                transaction.date,
-                transaction.description,
-                transaction.category,
-                transaction.amount,
-                transaction.transaction_type
-            ])
+    permission_classes = [IsAuthenticated]
+    # ``format`` selects the export format, so keep DRF from treating it as a renderer override
+    content_negotiation_class = ExportContentNegotiation
+
+    def get(self, request):
+        export_format = request.GET.get('format', 'csv')
+        transactions = filter_transactions(
+            Transaction.objects.filter(user=request.user),
+            request.GET
+        ).order_by('-date')
+        
+        if export_format == 'csv':
+            return streaming_response(
+                request,
+                csv_lines(transactions),
+                content_type='text/csv',
+                filename=f'transactions_{timezone.now().date()}.csv'
+            )
         
-        return response
-    
-    elif export_format == 'json':
-        from django.http import JsonResponse
+        elif export_format == 'json':
+            return streaming_response(request, json_array(transactions), content_type='application/json')
         
-        data = []
-        for transaction in transactions:
-            data.append({
-                'date': transaction.date.isoformat(),
-                'description': transaction.description,
-                'category': transaction.category,
-                'amount': float(transaction.amount),
-                'type': transaction.transaction_type
-            })
+        elif export_format == 'ndjson':
+            return streaming_response(
+                request,
+                ndjson_lines(transactions),
+                content_type='application/x-ndjson',
+                filename=f'transactions_{timezone.now().date()}.ndjson'
+            )
         
-        return JsonResponse(data, safe=False)
-    
-    else:
-        return Response({'error': 'Unsupported format'}, status=400)
+        else:
+            return Response({'error': 'Unsupported format'}, status=400)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def cache_stats_view(request):
+    """Report response cache hit/miss counters"""
+    return Response(cache_stats())
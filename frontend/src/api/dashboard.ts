@@ -0,0 +1,37 @@
+import api from './index';
+import type { EnvelopeSummary } from './envelopes';
+import type { RecurringTransaction } from './recurringTransactions';
+import type { SavingsGoal } from './savingsGoals';
+
+export type DashboardSection = 'balance' | 'income' | 'envelopes' | 'upcoming' | 'overdue' | 'savings_goals';
+
+export interface Dashboard {
+  balance?: {
+    total_income: number;
+    total_expenses: number;
+    balance: number;
+    monthly_income: number;
+    monthly_expenses: number;
+  };
+  income?: {
+    total_income: number;
+    total_allocated: number;
+    total_spent: number;
+    remaining_to_allocate: number;
+    allocation_percentage: number;
+  };
+  envelopes?: EnvelopeSummary;
+  upcoming?: RecurringTransaction[];
+  overdue?: RecurringTransaction[];
+  savings_goals?: SavingsGoal[];
+}
+
+export const dashboardAPI = {
+  // Every section by default; only the requested sections are returned
+  getDashboard: async (sections?: DashboardSection[]): Promise<Dashboard> => {
+    const response = await api.get('/dashboard/', {
+      params: sections?.length ? { sections: sections.join(',') } : undefined,
+    });
+    return response.data;
+  },
+};
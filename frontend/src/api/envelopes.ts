@@ -6,6 +6,7 @@ export interface Envelope {
   category: number;
   category_name: string;
   budgeted_amount: string;
+  rolled_over_amount: string;
   spent_amount: string;
   remaining_amount: string;
   percentage_used: number;
@@ -61,11 +61,22 @@ export const recurringTransactionsAPI = {
     return response.data;
   },
 
-  skipNextOccurrence: async (id: number): Promise<RecurringTransaction> => {
-    const response = await api.post(`/recurring-transactions/${id}/skip_next/`);
+  skipNextOccurrence: async (
+    id: number,
+    options: { count?: number; until?: string } = {}
+  ): Promise<RecurringTransaction> => {
+    const response = await api.post(`/recurring-transactions/${id}/skip_next/`, options);
     return response.data;
   },
 
+  getOccurrences: async (
+    id: number,
+    params: { start_date?: string; end_date?: string } = {}
+  ): Promise<string[]> => {
+    const response = await api.get(`/recurring-transactions/${id}/occurrences/`, { params });
+    return response.data.occurrences;
+  },
+
   getUpcomingTransactions: async (): Promise<RecurringTransaction[]> => {
     const response = await api.get('/recurring-transactions/upcoming/');
     return response.data;
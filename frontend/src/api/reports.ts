@@ -61,10 +61,12 @@ export interface YearlyReport {
   }>;
 }
 
+export type ComparisonPeriodType = 'weekly' | 'monthly' | 'quarterly' | 'yearly';
+
 export interface ComparisonReport {
-  period_type: 'monthly' | 'yearly';
+  period_type: ComparisonPeriodType | 'custom';
   current_period: string;
-  previous_period: string;
+  previous_period: string | null;
   current_stats: {
     income: number;
     expenses: number;
@@ -90,6 +92,18 @@ export interface ComparisonReport {
       change: number;
     };
   };
+  periods: Array<{
+    label: string;
+    start_date: string;
+    end_date: string;
+    income: number;
+    expenses: number;
+    net: number;
+    transaction_count: number;
+  }>;
+  category_periods: {
+    [category: string]: number[];
+  };
 }
 
 export const reportsAPI = {
@@ -110,8 +124,20 @@ export const reportsAPI = {
     return response.data;
   },
 
-  getComparisonReport: async (type: 'monthly' | 'yearly' = 'monthly'): Promise<ComparisonReport> => {
-    const response = await api.get(`/reports/comparison/?type=${type}`);
+  getComparisonReport: async (
+    type: ComparisonPeriodType = 'monthly',
+    periods = 2
+  ): Promise<ComparisonReport> => {
+    const response = await api.get(`/reports/comparison/?type=${type}&periods=${periods}`);
+    return response.data;
+  },
+
+  // ranges are [startDate, endDate] pairs, oldest first
+  getRangeComparisonReport: async (ranges: Array<[string, string]>): Promise<ComparisonReport> => {
+    const params = new URLSearchParams();
+    ranges.forEach(([start, end]) => params.append('range', `${start}:${end}`));
+
+    const response = await api.get(`/reports/comparison/?${params.toString()}`);
     return response.data;
   },
 
@@ -1,9 +1,37 @@
 import api from './index';
 import type { Transaction } from '../types';
 
+export type TransactionOperation =
+  | { op: 'create'; data: Partial<Transaction> }
+  | { op: 'update'; id: number; data: Partial<Transaction> }
+  | { op: 'delete'; id: number };
+
+export interface TransactionOperationResult {
+  index: number;
+  op: TransactionOperation['op'] | null;
+  status: 'created' | 'updated' | 'deleted' | 'error' | 'not_applied';
+  id?: number;
+  data?: Transaction;
+  errors?: Record<string, unknown>;
+}
+
+export interface TransactionFilters {
+  start_date?: string;
+  end_date?: string;
+  transaction_type?: 'income' | 'expense';
+  category?: string[];
+  min_amount?: number;
+  max_amount?: number;
+  search?: string;
+  ordering?: 'date' | '-date' | 'amount' | '-amount' | 'created_at' | '-created_at';
+}
+
 export const transactionsAPI = {
-  getTransactions: async (): Promise<Transaction[]> => {
-    const response = await api.get('/transactions/');
+  getTransactions: async (filters: TransactionFilters = {}): Promise<Transaction[]> => {
+    const response = await api.get('/transactions/', {
+      params: filters,
+      paramsSerializer: { indexes: null },
+    });
     return response.data.results || response.data;
   },
 
@@ -21,8 +49,24 @@ export const transactionsAPI = {
     await api.delete(`/transactions/${id}/`);
   },
 
+  batchTransactions: async (
+    operations: TransactionOperation[]
+  ): Promise<{ applied: boolean; results: TransactionOperationResult[] }> => {
+    const response = await api.post('/transactions/batch/', { operations });
+    return response.data;
+  },
+
   getBalance: async () => {
     const response = await api.get('/balance/');
     return response.data;
   },
+
+  getBalanceHistory: async (params: {
+    start_date?: string;
+    end_date?: string;
+    interval?: 'day' | 'week' | 'month';
+  } = {}): Promise<{ date: string; balance: number }[]> => {
+    const response = await api.get('/balance/history/', { params });
+    return response.data.history;
+  },
 };
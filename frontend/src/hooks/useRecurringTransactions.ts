@@ -112,7 +112,7 @@ export const useRecurringTransactions = () => {
   });
 
   const skipNextMutation = useMutation({
-    mutationFn: recurringTransactionsAPI.skipNextOccurrence,
+    mutationFn: (id: number) => recurringTransactionsAPI.skipNextOccurrence(id),
     onSuccess: () => {
       queryClient.invalidateQueries({ queryKey: ['recurringTransactions'] });
       queryClient.invalidateQueries({ queryKey: ['upcomingRecurringTransactions'] });
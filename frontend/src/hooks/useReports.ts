@@ -1,5 +1,5 @@
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
-import { reportsAPI, type MonthlyReport, type YearlyReport, type ComparisonReport } from '../api/reports';
+import { reportsAPI, type MonthlyReport, type YearlyReport, type ComparisonReport, type ComparisonPeriodType } from '../api/reports';
 import toast from 'react-hot-toast';
 
 export const useReports = () => {
@@ -21,10 +21,10 @@ export const useReports = () => {
     });
   };
 
-  const useComparisonReport = (type: 'monthly' | 'yearly' = 'monthly') => {
+  const useComparisonReport = (type: ComparisonPeriodType = 'monthly', periods = 2) => {
     return useQuery({
-      queryKey: ['comparisonReport', type],
-      queryFn: () => reportsAPI.getComparisonReport(type),
+      queryKey: ['comparisonReport', type, periods],
+      queryFn: () => reportsAPI.getComparisonReport(type, periods),
       staleTime: 2 * 60 * 1000, // 2 minutes
     });
   };
@@ -12,7 +12,7 @@ export const useTransactions = () => {
     error,
   } = useQuery({
     queryKey: ['transactions'],
-    queryFn: transactionsAPI.getTransactions,
+    queryFn: () => transactionsAPI.getTransactions(),
     staleTime: 2 * 60 * 1000, // 2 minutes
   });
 